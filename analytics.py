@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+تحليلات المبيعات بتجميعات تُحدَّث تدريجياً
+
+- كل تعديل (بصيغة السجل) يُطرح أثر نسخته القديمة ويُضاف أثر الجديدة: O(أصناف الطلب)
+- لا يوجد طلب HTTP يعيد مسح السجل: /api/analytics يقرأ التجميعات الجاهزة فقط
+- الطلبات المؤرشفة تبقى في التجميعات: أثرها ينتقل إلى "أساس" محفوظ في ملف
+  (archive/analytics.json) فلا حاجة لقراءة الأرشيف عند التشغيل
+- rebuild يعيد الحساب من الصفر (المخزن الحي + كل أقسام الأرشيف) للاسترجاع
+
+الإيراد ومتوسط الفاتورة من الطلبات المكتملة (كما في لوحة الإدارة)، وعدّ الأصناف
+من كل الطلبات غير الملغاة. اليوم والساعة من createdAt بتوقيت UTC.
+"""
+
+import json
+import math
+import os
+import threading
+from collections import namedtuple
+
+from order_store import created_at
+
+TOP_ITEMS = 10
+
+# أثر طلب واحد في التجميعات
+Contribution = namedtuple('Contribution', 'day hour table completed total items counted')
+
+
+def _number(value):
+    """رقم كما هو، أو تحويل النص؛ ما لا يُحوَّل (أو NaN/inf) يُحسب صفراً"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        number = value
+    else:
+        try:
+            number = float(value or 0)
+        except (TypeError, ValueError):
+            return 0
+    return number if math.isfinite(number) else 0
+
+
+def contribution(order):
+    """الأرقام تُحوَّل هنا: قيمة نصية من العميل لا تفشل داخل on_commit"""
+    created = created_at(order) or ''
+    day = created[:10] if len(created) >= 10 else None
+    try:
+        hour = int(created[11:13]) if len(created) >= 13 else None
+    except ValueError:
+        hour = None
+    status = order.get('status')
+    items = tuple(
+        (item.get('id'), item.get('name'), item.get('category'),
+         _number(item.get('quantity', 1)), _number(item.get('price', 0)))
+        for item in order.get('items') or () if isinstance(item, dict)
+    )
+    return Contribution(day, hour, order.get('tableId'), status == 'completed', _number(order.get('total')), items,
+                        status != 'cancelled')
+
+
+def _bump(counter, key, amount):
+    value = counter.get(key, 0) + amount
+    if abs(value) < 1e-9:
+        counter.pop(key, None)
+    else:
+        counter[key] = value
+
+
+class Aggregates:
+    """عدّادات قابلة للجمع والطرح"""
+
+    FIELDS = ('revenue_by_day', 'orders_by_day', 'revenue_by_hour', 'category_qty', 'category_revenue',
+              'item_qty', 'item_revenue', 'table_completed')
+
+    def __init__(self):
+        self.orders = 0
+        self.completed = 0
+        self.revenue = 0.0
+        self.revenue_by_day = {}
+        self.orders_by_day = {}
+        self.revenue_by_hour = {}
+        self.category_qty = {}
+        self.category_revenue = {}
+        self.item_qty = {}  # item_id -> quantity
+        self.item_revenue = {}
+        self.item_info = {}  # item_id -> (name, category) آخر ما شوهد
+        self.table_completed = {}
+
+    def add(self, c, sign=1):
+        if not c.counted:
+            return
+        self.orders += sign
+        if c.day:
+            _bump(self.orders_by_day, c.day, sign)
+        if c.completed:
+            self.completed += sign
+            self.revenue += sign * c.total
+            if c.day:
+                _bump(self.revenue_by_day, c.day, sign * c.total)
+            if c.hour is not None:
+                _bump(self.revenue_by_hour, c.hour, sign * c.total)
+            if c.table is not None:
+                _bump(self.table_completed, c.table, sign)
+        for item_id, name, category, qty, price in c.items:
+            _bump(self.category_qty, category, sign * qty)
+            _bump(self.category_revenue, category, sign * qty * price)
+            _bump(self.item_qty, item_id, sign * qty)
+            _bump(self.item_revenue, item_id, sign * qty * price)
+            if sign > 0:
+                self.item_info[item_id] = (name, category)
+
+    def merge(self, other):
+        self.orders += other.orders
+        self.completed += other.completed
+        self.revenue += other.revenue
+        for field in self.FIELDS:
+            mine = getattr(self, field)
+            for key, value in getattr(other, field).items():
+                _bump(mine, key, value)
+        for key, info in other.item_info.items():
+            self.item_info.setdefault(key, info)
+
+    def to_dict(self):
+        # مفاتيح JSON نصية؛ نحفظ الأزواج لاسترجاع الأنواع الأصلية (أرقام المعرفات)
+        data = {'orders': self.orders, 'completed': self.completed, 'revenue': self.revenue,
+                'item_info': [[k, list(v)] for k, v in self.item_info.items()]}
+        for field in self.FIELDS:
+            data[field] = [[k, v] for k, v in getattr(self, field).items()]
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        agg = cls()
+        agg.orders = data.get('orders', 0)
+        agg.completed = data.get('completed', 0)
+        agg.revenue = data.get('revenue', 0.0)
+        agg.item_info = {k: tuple(v) for k, v in data.get('item_info', [])}
+        for field in cls.FIELDS:
+            setattr(agg, field, {k: v for k, v in data.get(field, [])})
+        return agg
+
+
+class SalesAnalytics:
+    def __init__(self, base_path=None):
+        self.base_path = base_path
+        self.lock = threading.Lock()
+        self._totals = Aggregates()  # الأساس المؤرشف + الطلبات الحية
+        self._base = Aggregates()  # أثر الطلبات المؤرشفة فقط (يُحفظ في base_path)
+        self._live = {}  # order_id -> Contribution للطلبات في المخزن الحي
+        self.rebuilds = 0
+
+    # ------------------------------------------
+    # التحميل وإعادة البناء
+    # ------------------------------------------
+    def load(self, store):
+        """الأساس من الملف + أثر الطلبات الحية (المخزن الساخن فقط)"""
+        base = Aggregates()
+        if self.base_path and os.path.exists(self.base_path):
+            try:
+                with open(self.base_path, 'r', encoding='utf-8') as f:
+                    base = Aggregates.from_dict(json.load(f))
+            except (json.JSONDecodeError, IOError, TypeError, ValueError) as e:
+                print(f'⚠️ خطأ في قراءة أساس التحليلات (استخدم rebuild): {e}')
+        self._reset(base, store)
+
+    def rebuild(self, store, archived_orders):
+        """إعادة الحساب من الصفر: كل الأرشيف (بثاً) + المخزن الحي، ثم حفظ الأساس"""
+        base = Aggregates()
+        for order in archived_orders:
+            base.add(contribution(order))
+        self._reset(base, store)
+        self._save_base()
+        self.rebuilds += 1
+
+    def export_base(self):
+        """أثر الطلبات المؤرشفة (لمزامنة نسخ العمال بعد rebuild)"""
+        with self.lock:
+            return self._base.to_dict()
+
+    def load_base(self, data, store):
+        """استبدال الأساس بما صدّرته export_base في عملية أخرى (دون قراءة أو كتابة الملف)"""
+        self._reset(Aggregates.from_dict(data), store)
+
+    def _reset(self, base, store):
+        """بناء أثر الطلبات الحية من لقطة المخزن واستبدال التجميعات
+
+        إذا تغيّر المخزن أثناء البناء نعيد المحاولة؛ التعديلات التي تُطبَّق بعد
+        الاستبدال آمنة لأن create/update/delete متساوية الأثر عند التكرار.
+        """
+        while True:
+            snap = store.snapshot()
+            live = {o.get('id'): contribution(o) for o in snap.orders}
+            totals = Aggregates()
+            totals.merge(base)
+            for c in live.values():
+                totals.add(c)
+            with self.lock:
+                if store.version != snap.version:
+                    continue
+                self._base = base
+                self._live = live
+                self._totals = totals
+                return
+
+    def _save_base(self):
+        if not self.base_path:
+            return
+        with self.lock:
+            data = self._base.to_dict()
+        os.makedirs(os.path.dirname(self.base_path) or '.', exist_ok=True)
+        temp_file = self.base_path + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_file, self.base_path)
+
+    # ------------------------------------------
+    # التحديث التدريجي
+    # ------------------------------------------
+    def apply(self, changes):
+        """تطبيق تعديلات بصيغة السجل على التجميعات"""
+        archived = False
+        with self.lock:
+            for change in changes:
+                op = change.get('op')
+                if op in ('order.create', 'order.update'):
+                    order = change['order']
+                    new = contribution(order)
+                    old = self._live.get(order.get('id'))
+                    if old is not None:
+                        self._totals.add(old, -1)
+                    self._totals.add(new)
+                    self._live[order.get('id')] = new
+                elif op == 'order.delete':
+                    old = self._live.pop(change.get('id'), None)
+                    if old is None:
+                        continue
+                    if change.get('archived'):
+                        # الطلب انتقل للأرشيف: يبقى في الإجمالي وينتقل أثره للأساس
+                        self._base.add(old)
+                        archived = True
+                    else:
+                        self._totals.add(old, -1)
+        if archived:
+            try:
+                self._save_base()
+            except (IOError, OSError) as e:
+                print(f'⚠️ خطأ في حفظ أساس التحليلات: {e}')
+
+    # ------------------------------------------
+    # التقرير
+    # ------------------------------------------
+    def report(self, table_count=None):
+        with self.lock:
+            t = self._totals
+            revenue_by_day = dict(sorted(t.revenue_by_day.items()))
+            orders_by_day = dict(sorted(t.orders_by_day.items()))
+            categories = {str(k): {'quantity': q, 'revenue': round(t.category_revenue.get(k, 0), 2)}
+                          for k, q in t.category_qty.items()}
+            items = {str(k): {'name': t.item_info.get(k, (None, None))[0],
+                              'category': t.item_info.get(k, (None, None))[1],
+                              'quantity': q, 'revenue': round(t.item_revenue.get(k, 0), 2)}
+                     for k, q in t.item_qty.items()}
+            table_completed = {str(k): v for k, v in t.table_completed.items()}
+            completed, revenue, orders = t.completed, t.revenue, t.orders
+            revenue_by_hour = [round(t.revenue_by_hour.get(h, 0), 2) for h in range(24)]
+
+        days = len(orders_by_day) or 1
+        tables = table_count or len(table_completed) or 1
+        top = sorted(items.items(), key=lambda kv: kv[1]['quantity'], reverse=True)[:TOP_ITEMS]
+        return {
+            'orders': orders,
+            'completedOrders': completed,
+            'revenue': round(revenue, 2),
+            'averageTicket': round(revenue / completed, 2) if completed else 0,
+            'revenueByDay': {d: round(v, 2) for d, v in revenue_by_day.items()},
+            'ordersByDay': orders_by_day,
+            'revenueByHour': revenue_by_hour,
+            'categories': categories,
+            'items': items,
+            'topItems': [dict(v, id=k) for k, v in top],
+            'tableTurnover': {
+                'completedByTable': table_completed,
+                'perTable': round(completed / tables, 2),
+                'perTablePerDay': round(completed / tables / days, 2)
+            }
+        }
+
+    def get_stats(self):
+        return {'live_orders': len(self._live), 'rebuilds': self.rebuilds}
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+أرشفة الطلبات المكتملة إلى تخزين بارد مقسّم حسب اليوم
+
+- خيط خلفي ينقل الطلبات المكتملة الأقدم من N ساعة من المخزن الحي إلى الأرشيف
+- ملف gzip بصيغة JSON Lines لكل يوم (حسب createdAt): archive/orders-YYYY-MM-DD.jsonl.gz
+- الإضافة لملف اليوم كعضو gzip جديد (multi-member) دون إعادة ضغط الملف
+- القراءة حسب نطاق التواريخ تفتح الأقسام المطلوبة فقط وتبث الطلبات سطراً بسطر
+- الكتابة في الأرشيف تتم قبل الحذف من المخزن وتحت أقفال الطلبات نفسها
+"""
+
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from order_store import created_at
+
+ARCHIVE_AFTER_HOURS = 24
+ARCHIVE_INTERVAL = 600  # ثواني بين كل عملية أرشفة
+ARCHIVE_BATCH = 1000  # أقصى عدد طلبات في كل معاملة أرشفة
+PARTITION_RE = re.compile(r'^orders-(\d{4}-\d{2}-\d{2})\.jsonl\.gz$')
+
+
+def iso_utc(dt):
+    """نفس صيغة createdAt في الواجهة (toISOString)"""
+    return dt.strftime('%Y-%m-%dT%H:%M:%S.') + f'{dt.microsecond // 1000:03d}Z'
+
+
+def order_day(order):
+    created = created_at(order) or ''
+    return created[:10] if len(created) >= 10 else iso_utc(datetime.now(timezone.utc))[:10]
+
+
+class OrderArchive:
+    """ملفات الأرشيف المقسّمة حسب اليوم"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()  # كاتب واحد لكل الأقسام
+
+    def partition_path(self, day):
+        return os.path.join(self.directory, f'orders-{day}.jsonl.gz')
+
+    def partitions(self, day_from=None, day_to=None):
+        """أيام الأقسام الموجودة ضمن النطاق (شامل) مرتبة تصاعدياً"""
+        if not os.path.isdir(self.directory):
+            return []
+        days = []
+        for name in os.listdir(self.directory):
+            match = PARTITION_RE.match(name)
+            if not match:
+                continue
+            day = match.group(1)
+            if (day_from and day < day_from[:10]) or (day_to and day > day_to[:10]):
+                continue
+            days.append(day)
+        return sorted(days)
+
+    def write(self, orders):
+        """إضافة الطلبات لأقسام أيامها بشكل دائم (fsync)"""
+        by_day = {}
+        for order in orders:
+            by_day.setdefault(order_day(order), []).append(order)
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            for day, day_orders in by_day.items():
+                payload = ''.join(json.dumps(o, ensure_ascii=False, separators=(',', ':')) + '\n'
+                                  for o in day_orders).encode('utf-8')
+                with open(self.partition_path(day), 'ab') as f:
+                    f.write(gzip.compress(payload))
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    def iter_orders(self, created_from=None, created_to=None):
+        """بث الطلبات المؤرشفة (الأقدم أولاً) دون تحميل الأقسام في الذاكرة
+
+        الطلب المكرر في نفس القسم (أرشفة أُعيدت بعد توقف مفاجئ) يُرسل مرة واحدة.
+        """
+        for day in self.partitions(created_from, created_to):
+            seen = set()
+            try:
+                with gzip.open(self.partition_path(day), 'rt', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            order = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        created = created_at(order) or ''
+                        if created_from and created < created_from:
+                            continue
+                        if created_to and created > created_to:
+                            continue
+                        if order.get('id') in seen:
+                            continue
+                        seen.add(order.get('id'))
+                        yield order
+            except (OSError, EOFError) as e:
+                # عضو gzip أخير مقطوع: نكتفي بما قُرئ
+                print(f'⚠️ قسم أرشيف غير مكتمل {day}: {e}')
+
+
+class Archiver:
+    """ينقل الطلبات المكتملة القديمة من OrderStore إلى OrderArchive في الخلفية"""
+
+    def __init__(self, store, archive, after_hours=ARCHIVE_AFTER_HOURS,
+                 interval=ARCHIVE_INTERVAL, batch_size=ARCHIVE_BATCH):
+        self.store = store
+        self.archive = archive
+        self.after_hours = after_hours
+        self.interval = interval
+        self.batch_size = batch_size
+        self.archived = 0
+        self.runs = 0
+        self.last_run = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def cutoff(self, now=None):
+        now = now or datetime.now(timezone.utc)
+        return iso_utc(now - timedelta(hours=self.after_hours))
+
+    def run_once(self, now=None):
+        """أرشفة كل الطلبات المستحقة على دفعات؛ تُرجع عددها"""
+        cutoff = self.cutoff(now)
+        total = 0
+        while True:
+            candidates = [o.get('id') for o in self.store.orders_by_status('completed')
+                          if self._due(o, cutoff)][:self.batch_size]
+            if not candidates:
+                break
+            moved = self._move(candidates, cutoff)
+            total += moved
+            if moved < len(candidates) or len(candidates) < self.batch_size:
+                break
+        self.archived += total
+        self.runs += 1
+        self.last_run = time.time()
+        return total
+
+    @staticmethod
+    def _due(order, cutoff):
+        """طلب بلا createdAt صالح يبقى في المخزن الحي ولا يوقف الأرشفة"""
+        try:
+            created = created_at(order)
+        except Exception as e:
+            print(f'⚠️ تجاهل طلب في الأرشفة {order.get("id")}: {e}')
+            return False
+        return created is not None and created < cutoff
+
+    def _move(self, order_ids, cutoff):
+        with self.store.transaction(orders=order_ids) as txn:
+            # إعادة التحقق تحت القفل: ربما تغيّرت الحالة منذ الاختيار
+            orders = [o for o in map(txn.get_order, order_ids)
+                      if o is not None and o.get('status') == 'completed' and self._due(o, cutoff)]
+            if orders:
+                self.archive.write(orders)
+                for order in orders:
+                    txn.delete_order(order.get('id'), archived=True)
+        return len(orders)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='order-archiver', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        # أول أرشفة عند التشغيل ثم كل interval ثانية
+        while True:
+            try:
+                count = self.run_once()
+                if count:
+                    print(f'🗄️ أرشفة {count} طلب مكتمل')
+            except Exception as e:
+                print(f'⚠️ خطأ في الأرشفة: {e}')
+            if self._stopped.wait(self.interval):
+                break
+
+    def stop(self):
+        self._stopped.set()
+
+    def get_stats(self):
+        return {
+            'archived': self.archived,
+            'runs': self.runs,
+            'last_run': self.last_run,
+            'after_hours': self.after_hours,
+            'partitions': len(self.archive.partitions())
+        }
@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+بناء الأصول: تصغير ودمج JS/CSS + أسماء ببصمة المحتوى + إعادة كتابة HTML
+
+- كل سلسلة متتالية من <script src="local.js"></script> (أو <link rel="stylesheet">)
+  في صفحة تُدمج في ملف واحد assets/<kind>.<hash>.js|css
+- التصغير محافظ: حذف التعليقات والمسافات الزائدة مع إبقاء فواصل الأسطر (ASI)،
+  والنصوص/القوالب/التعابير النمطية تُنسخ كما هي
+- الاسم يحوي بصمة المحتوى، فالملف لا يتغير أبداً: Cache-Control immutable
+- ملف يبدأ بـ "use strict" لا يُدمج مع غيره (حتى لا يصبح الملف المدمج كله strict)
+- الكتابة فقط إذا تغيّر المحتوى (mtime ثابت = كاش الملفات الثابتة لا يُبطل)
+
+يُستخدم من طابور النشر (مجلد dist لكل موقع) ومن وضع الخدمة المحلي (server.py --bundle).
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+
+ASSETS_DIR = 'assets'
+HASH_LENGTH = 10
+POLL_INTERVAL = 2.0
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+FINGERPRINT_RE = re.compile(r'(^|/)' + ASSETS_DIR + r'/[\w-]+\.[0-9a-f]{%d}\.(js|css)$' % HASH_LENGTH)
+
+SCRIPT_TAG_RE = re.compile(r'<script\s+src="([^"]+)"\s*>\s*</script>', re.I)
+STYLE_TAG_RE = re.compile(r'<link\s+(?:rel="stylesheet"\s+href="([^"]+)"|href="([^"]+)"\s+rel="stylesheet")\s*/?>',
+                          re.I)
+CSS_URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+JS_REGEX_KEYWORDS = frozenset(('return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+                               'throw', 'case', 'do', 'else', 'yield', 'await'))
+JS_TIGHT = frozenset('{}()[];,:=<>!?&|*%^~')
+
+
+def is_fingerprinted(path):
+    return bool(FINGERPRINT_RE.search(path.replace(os.sep, '/')))
+
+
+def _is_word(ch):
+    return ch.isalnum() or ch in '_$' or ord(ch) > 127
+
+
+# ==========================================
+# التصغير
+# ==========================================
+def minify_js(source):
+    """حذف التعليقات والمسافات الزائدة دون لمس النصوص والتعابير النمطية"""
+    out = []
+    i = 0
+    n = len(source)
+    templates = []  # عمق الأقواس لكل ${ مفتوح داخل قالب نصي
+    pending_space = False
+    pending_newline = False
+
+    def last_char():
+        return out[-1][-1] if out else ''
+
+    def emit(token):
+        nonlocal pending_space, pending_newline
+        prev = last_char()
+        if pending_newline and prev and prev not in '{;,':
+            out.append('\n')
+        elif pending_space and prev and prev not in JS_TIGHT and token[0] not in JS_TIGHT and prev != '\n':
+            out.append(' ')
+        pending_space = pending_newline = False
+        out.append(token)
+
+    def read_quoted(start, quote):
+        j = start + 1
+        while j < n:
+            ch = source[j]
+            if ch == '\\':
+                j += 2
+                continue
+            if ch == quote:
+                return j + 1
+            j += 1
+        return n
+
+    def read_template(start):
+        """من بعد ` (أو }) حتى ` أو ${؛ تُرجع (النهاية, فُتح تعبير؟)"""
+        j = start
+        while j < n:
+            ch = source[j]
+            if ch == '\\':
+                j += 2
+                continue
+            if ch == '`':
+                return j + 1, False
+            if ch == '$' and j + 1 < n and source[j + 1] == '{':
+                return j + 2, True
+            j += 1
+        return n, False
+
+    def regex_allowed():
+        text = ''.join(out[-3:]).rstrip(' \n')
+        if not text:
+            return True
+        prev = text[-1]
+        if prev in ')]':
+            return False
+        if text.endswith(('++', '--')):
+            return False
+        if _is_word(prev):
+            match = re.search(r'[\w$]+$', text)
+            return bool(match) and match.group(0) in JS_REGEX_KEYWORDS
+        return True
+
+    while i < n:
+        ch = source[i]
+        if ch in ' \t\r\f\v\u00a0\ufeff':
+            pending_space = True
+            i += 1
+        elif ch == '\n':
+            pending_newline = True
+            i += 1
+        elif ch == '/' and source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end < 0 else end
+        elif ch == '/' and source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            end = n if end < 0 else end + 2
+            if '\n' in source[i:end]:
+                pending_newline = True
+            else:
+                pending_space = True
+            i = end
+        elif ch in '\'"':
+            end = read_quoted(i, ch)
+            emit(source[i:end])
+            i = end
+        elif ch == '`':
+            end, opened = read_template(i + 1)
+            emit(source[i:end])
+            if opened:
+                templates.append(0)
+            i = end
+        elif ch == '{' and templates:
+            templates[-1] += 1
+            emit(ch)
+            i += 1
+        elif ch == '}' and templates and templates[-1] == 0:
+            templates.pop()
+            end, opened = read_template(i + 1)
+            emit(source[i:end])
+            if opened:
+                templates.append(0)
+            i = end
+        elif ch == '}' and templates:
+            templates[-1] -= 1
+            emit(ch)
+            i += 1
+        elif ch == '/' and regex_allowed():
+            j = i + 1
+            in_class = False
+            while j < n and source[j] != '\n':
+                c = source[j]
+                if c == '\\':
+                    j += 2
+                    continue
+                if c == '[':
+                    in_class = True
+                elif c == ']':
+                    in_class = False
+                elif c == '/' and not in_class:
+                    break
+                j += 1
+            j += 1
+            while j < n and _is_word(source[j]):
+                j += 1  # flags
+            emit(source[i:j])
+            i = j
+        elif _is_word(ch):
+            j = i + 1
+            while j < n and _is_word(source[j]):
+                j += 1
+            emit(source[i:j])
+            i = j
+        else:
+            emit(ch)
+            i += 1
+    return ''.join(out).strip() + '\n'
+
+
+def _squeeze_css(text):
+    text = re.sub(r'\s+', ' ', text)
+    return re.sub(r' ?([{};,>]) ?', r'\1', text)
+
+
+def minify_css(source):
+    """حذف التعليقات وضغط المسافات خارج النصوص"""
+    out = []
+    code = []
+    i = 0
+    n = len(source)
+    while i < n:
+        ch = source[i]
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            code.append(' ')
+        elif ch in '\'"':
+            j = i + 1
+            while j < n and source[j] != ch:
+                j += 2 if source[j] == '\\' else 1
+            out.append(_squeeze_css(''.join(code)))
+            out.append(source[i:j + 1])
+            code = []
+            i = j + 1
+        else:
+            code.append(ch)
+            i += 1
+    out.append(_squeeze_css(''.join(code)))
+    return ''.join(out).replace(';}', '}').strip() + '\n'
+
+
+def _starts_strict(source):
+    return re.match(r'\s*(?:(?://[^\n]*\n|/\*.*?\*/)\s*)*[\'"]use strict[\'"]', source, re.S) is not None
+
+
+def _rebase_css_urls(css, css_rel_dir):
+    """url() النسبية في CSS تُعاد نسبتها من مجلد الملف الأصلي إلى assets/"""
+    def repl(match):
+        quote, url = match.group(1), match.group(2).strip()
+        if re.match(r'^(?:[a-z]+:|/|#)', url, re.I):
+            return match.group(0)
+        target = os.path.normpath(os.path.join(css_rel_dir, url)).replace(os.sep, '/')
+        return f'url({quote}../{target}{quote})'
+    return CSS_URL_RE.sub(repl, css)
+
+
+# ==========================================
+# البناء
+# ==========================================
+class AssetBuilder:
+    """src_dir -> out_dir: صفحات HTML معاد كتابتها + assets/ (+ نسخ باقي الملفات مع copy_all)"""
+
+    def __init__(self, src_dir, out_dir, copy_all=False, recursive=None, poll_interval=POLL_INTERVAL):
+        self.src_dir = os.path.abspath(src_dir)
+        self.out_dir = os.path.abspath(out_dir)
+        self.copy_all = copy_all
+        self.recursive = copy_all if recursive is None else recursive
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.produced = set()  # مسارات نسبية مكتوبة في out_dir
+        self.sources = {}  # path -> (mtime_ns, size) لكل ملف قُرئ في آخر بناء
+        self.stats = {}
+        self.builds = 0
+        self._checked = 0.0
+
+    # ------------------------------------------
+    # الواجهة
+    # ------------------------------------------
+    def refresh(self):
+        """إعادة البناء إذا تغيّر أي مصدر (فحص mtime كل poll_interval على الأكثر)"""
+        if self.builds and time.monotonic() - self._checked < self.poll_interval:
+            return False
+        with self.lock:
+            if self.builds and time.monotonic() - self._checked < self.poll_interval:
+                return False
+            self._checked = time.monotonic()
+            if self.builds and not self._sources_changed():
+                return False
+            self._build_locked()
+            return True
+
+    def build(self):
+        with self.lock:
+            self._checked = time.monotonic()
+            return self._build_locked()
+
+    def resolve(self, url_path):
+        """مسار الملف المبني لمسار URL، أو None إن لم يكن من مخرجات البناء"""
+        self.refresh()
+        rel = url_path.lstrip('/')
+        if rel in self.produced:
+            return os.path.join(self.out_dir, *rel.split('/'))
+        return None
+
+    def get_stats(self):
+        return dict(self.stats, builds=self.builds, files=len(self.produced))
+
+    # ------------------------------------------
+    # التنفيذ
+    # ------------------------------------------
+    def _sources_changed(self):
+        for path, sig in self.sources.items():
+            try:
+                st = os.stat(path)
+            except OSError:
+                return True
+            if (st.st_mtime_ns, st.st_size) != sig:
+                return True
+        # صفحة HTML جديدة على المستوى الأعلى
+        return any(p not in self.sources for p in self._pages())
+
+    def _pages(self):
+        if not self.recursive:
+            return [os.path.join(self.src_dir, name) for name in sorted(os.listdir(self.src_dir))
+                    if name.endswith('.html') and os.path.isfile(os.path.join(self.src_dir, name))]
+        pages = []
+        for dirpath, dirnames, filenames in os.walk(self.src_dir):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith('.') and d != 'node_modules')
+            pages.extend(os.path.join(dirpath, f) for f in sorted(filenames) if f.endswith('.html'))
+        return pages
+
+    def _track(self, path):
+        st = os.stat(path)
+        self.sources[path] = (st.st_mtime_ns, st.st_size)
+
+    def _read(self, path):
+        self._track(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def _local(self, page_dir, url):
+        """المسار المحلي لمرجع في الصفحة، أو None (رابط خارجي/غير موجود)"""
+        if re.match(r'^(?:[a-z]+:|//)', url, re.I) or '?' in url or '#' in url:
+            return None
+        base = self.src_dir if url.startswith('/') else page_dir
+        path = os.path.normpath(os.path.join(base, url.lstrip('/')))
+        if not path.startswith(self.src_dir + os.sep) or not os.path.isfile(path):
+            return None
+        return path
+
+    def _write(self, rel, data, written):
+        path = os.path.join(self.out_dir, *rel.split('/'))
+        try:
+            with open(path, 'rb') as f:
+                same = f.read() == data
+        except OSError:
+            same = False
+        if not same:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # استبدال ذري: عمليات --workers قد تبني نفس المخرجات وتقرؤها في نفس الوقت
+            temp_path = f'{path}.{os.getpid()}.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+            self.stats['written'] += 1
+        written.add(rel)
+
+    def _bundle(self, kind, paths, cache, written):
+        """ملف assets/ واحد لمجموعة ملفات؛ يُرجع مساره النسبي"""
+        key = (kind, tuple(paths))
+        if key in cache:
+            return cache[key]
+        parts = []
+        for path in paths:
+            source = self._read(path)
+            self.stats['bytes_in'] += len(source.encode('utf-8'))
+            if kind == 'css':
+                rel_dir = os.path.relpath(os.path.dirname(path), self.src_dir)
+                parts.append(_rebase_css_urls(minify_css(source), '' if rel_dir == '.' else rel_dir))
+            else:
+                parts.append(minify_js(source))
+        data = (';\n' if kind == 'js' else '').join(parts).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+        rel = f'{ASSETS_DIR}/{kind}.{digest}.{kind}'
+        if rel not in written:
+            self._write(rel, data, written)
+            self.stats['bundles'] += 1
+            self.stats['bytes_out'] += len(data)
+        cache[key] = rel
+        return rel
+
+    def _rewrite(self, html, page_dir, cache, written):
+        """استبدال كل سلسلة متتالية من الوسوم المحلية بوسم واحد للملف المدمج"""
+        for kind, tag_re in (('js', SCRIPT_TAG_RE), ('css', STYLE_TAG_RE)):
+            pieces = []
+            pos = 0
+            run = []  # (match, path)
+
+            def flush_run():
+                nonlocal pos
+                if not run:
+                    return
+                groups = [[]]
+                for _, path in run:
+                    if kind == 'js' and _starts_strict(self._read(path)):
+                        groups.extend([[path], []])
+                    else:
+                        groups[-1].append(path)
+                tags = []
+                for group in (g for g in groups if g):
+                    rel = self._bundle(kind, group, cache, written)
+                    href = os.path.relpath(os.path.join(self.src_dir, rel), page_dir).replace(os.sep, '/')
+                    tags.append(f'<script src="{href}"></script>' if kind == 'js'
+                                else f'<link rel="stylesheet" href="{href}">')
+                pieces.append(html[pos:run[0][0].start()])
+                pieces.append('\n    '.join(tags))
+                pos = run[-1][0].end()
+                run.clear()
+
+            for match in tag_re.finditer(html):
+                path = self._local(page_dir, next(g for g in match.groups() if g))
+                if path is None:
+                    flush_run()
+                    continue
+                if run and html[run[-1][0].end():match.start()].strip():
+                    flush_run()
+                run.append((match, path))
+            flush_run()
+            pieces.append(html[pos:])
+            html = ''.join(pieces)
+        return html
+
+    def _build_locked(self):
+        started = time.perf_counter()
+        self.sources = {}
+        self.stats = {'pages': 0, 'bundles': 0, 'bytes_in': 0, 'bytes_out': 0, 'written': 0}
+        written = set()
+        cache = {}
+        os.makedirs(self.out_dir, exist_ok=True)
+        for page in self._pages():
+            html = self._read(page)
+            rewritten = self._rewrite(html, os.path.dirname(page), cache, written)
+            rel = os.path.relpath(page, self.src_dir).replace(os.sep, '/')
+            self._write(rel, rewritten.encode('utf-8'), written)
+            self.stats['pages'] += 1
+        if self.copy_all:
+            self._copy_others(written)
+        self._remove_stale(written)
+        self.produced = written
+        self.builds += 1
+        self.stats['build_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return self.out_dir
+
+    def _copy_others(self, written):
+        for dirpath, dirnames, filenames in os.walk(self.src_dir):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.') and d != 'node_modules']
+            for name in filenames:
+                if name.startswith('.'):
+                    continue
+                src = os.path.join(dirpath, name)
+                rel = os.path.relpath(src, self.src_dir).replace(os.sep, '/')
+                if rel in written:
+                    continue
+                dest = os.path.join(self.out_dir, *rel.split('/'))
+                s, d = os.stat(src), None
+                try:
+                    d = os.stat(dest)
+                except OSError:
+                    pass
+                if d is None or d.st_size != s.st_size or d.st_mtime_ns != s.st_mtime_ns:
+                    os.makedirs(os.path.dirname(dest), exist_ok=True)
+                    shutil.copy2(src, dest)
+                    self.stats['written'] += 1
+                written.add(rel)
+
+    def _remove_stale(self, written):
+        """حذف مخرجات البناء السابق التي لم تعد مطلوبة (الملفات المخفية مثل .firebaserc تبقى)"""
+        for rel in self.produced - written:
+            try:
+                os.remove(os.path.join(self.out_dir, *rel.split('/')))
+            except OSError:
+                pass
+        assets = os.path.join(self.out_dir, ASSETS_DIR)
+        if os.path.isdir(assets):
+            for name in os.listdir(assets):
+                # .tmp: كتابة جارية من عملية أخرى
+                if f'{ASSETS_DIR}/{name}' not in written and not name.endswith('.tmp'):
+                    try:
+                        os.remove(os.path.join(assets, name))
+                    except OSError:
+                        pass  # حذفته عملية أخرى
+        if self.copy_all:
+            for dirpath, _, filenames in os.walk(self.out_dir):
+                for name in filenames:
+                    rel = os.path.relpath(os.path.join(dirpath, name), self.out_dir).replace(os.sep, '/')
+                    if not name.startswith('.') and name != 'firebase.json' and rel not in written:
+                        os.remove(os.path.join(dirpath, name))
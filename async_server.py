@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+نواة سيرفر مبنية على asyncio كبديل لـ ThreadingMixIn (خيط لكل اتصال)
+
+- حلقة أحداث واحدة تملك كل الاتصالات: آلاف الاتصالات لا تعني آلاف الخيوط
+- HTTP/1.1 keep-alive حقيقي مع دعم pipelining (الردود بنفس ترتيب الطلبات)
+- نفس المسارات ونفس منطق RestaurantHandler: المعالج يعمل في ThreadPoolExecutor محدود
+- الكتابة للعميل تمر عبر الحلقة مع التحكم بالتدفق (backpressure)؛ عميل SSE البطيء
+  يُفصل عند تجاوز حد الوسيط مثل حلقة selectors في events.py
+- تأطير صارم: Content-Length غير صالح أو متعارض -> 400، و Transfer-Encoding -> 501،
+  ولا يُقرأ شيء بعد طلب سيُغلق الاتصال بعده
+"""
+
+import asyncio
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_HEADER_SIZE = 64 * 1024
+IDLE_TIMEOUT = 30  # إغلاق اتصال keep-alive الخامل (ثواني)
+
+
+def error_response(status, reason):
+    """رد خطأ بلا جسم يُغلق الاتصال بعده (أخطاء التأطير قبل الوصول للمعالج)"""
+    return (f'HTTP/1.1 {status} {reason}\r\nContent-Length: 0\r\n'
+            f'Connection: close\r\n\r\n').encode('ascii')
+
+
+class TransportWriter(io.RawIOBase):
+    """wfile للمعالج: يكتب من خيط العامل إلى transport داخل الحلقة"""
+
+    def __init__(self, protocol):
+        self.protocol = protocol
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        protocol = self.protocol
+        if protocol.closed:
+            raise BrokenPipeError('الاتصال مغلق')
+        # انتظار تفريغ ذاكرة الإرسال إذا كان العميل بطيئاً
+        protocol.can_write.wait()
+        data = bytes(data)
+        protocol.loop.call_soon_threadsafe(protocol.write, data)
+        return len(data)
+
+
+class AsyncHandlerMixin:
+    """يجعل RestaurantHandler يعمل على طلب مُجمَّع مسبقاً بدلاً من socket"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def __init__(self, raw_request, protocol, client_address, server):
+        self.raw_request = raw_request
+        self.protocol = protocol
+        self.detached = False
+        super().__init__(protocol, client_address, server)
+
+    def setup(self):
+        self.connection = self.protocol  # بدون sendfile: البث بقطع عبر wfile
+        self.rfile = io.BytesIO(self.raw_request)
+        self.wfile = io.BufferedWriter(TransportWriter(self.protocol), buffer_size=64 * 1024)
+
+    def handle(self):
+        # طلب واحد لكل استدعاء؛ keep-alive تديره الحلقة
+        self.close_connection = True
+        self.handle_one_request()
+
+    def finish(self):
+        try:
+            self.wfile.flush()
+        except (BrokenPipeError, OSError):
+            pass
+
+
+class AsyncServerAdapter:
+    """الواجهة التي يراها المعالج عبر self.server"""
+
+    def __init__(self, event_broker=None):
+        self.event_broker = event_broker
+
+    def hand_off_event_stream(self, handler, last_event_id):
+        handler.wfile.flush()
+        handler.detached = True
+        handler.protocol.start_event_stream(self.event_broker, last_event_id)
+
+
+class HTTPProtocol(asyncio.Protocol):
+    def __init__(self, server):
+        self.server = server
+        self.loop = server.loop
+        self.transport = None
+        self.buffer = bytearray()
+        self.queue = []  # (طلب, إغلاق بعده, رد خطأ جاهز) بانتظار المعالجة (pipelining)
+        self.receiving = True  # False بعد طلب سيُغلق الاتصال بعده: ما يصل لاحقاً ليس طلبات
+        self.busy = False
+        self.closed = False
+        self.streaming = False
+        self.listener = None
+        self.can_write = threading.Event()
+        self.can_write.set()
+        self.idle_handle = None
+
+    # ------------------------------------------
+    # دورة حياة الاتصال
+    # ------------------------------------------
+    def connection_made(self, transport):
+        self.transport = transport
+        self.peer = transport.get_extra_info('peername') or ('', 0)
+        self.server.connections += 1
+        self._reset_idle()
+
+    def connection_lost(self, exc):
+        self.closed = True
+        self.can_write.set()  # تحرير أي خيط ينتظر الكتابة
+        self.server.connections -= 1
+        if self.idle_handle:
+            self.idle_handle.cancel()
+        if self.listener is not None and self.server.event_broker is not None:
+            self.server.event_broker.remove_listener(self.listener)
+
+    def pause_writing(self):
+        self.can_write.clear()
+
+    def resume_writing(self):
+        self.can_write.set()
+
+    def write(self, data):
+        if not self.closed:
+            self.transport.write(data)
+
+    def _reset_idle(self):
+        if self.idle_handle:
+            self.idle_handle.cancel()
+        self.idle_handle = self.loop.call_later(IDLE_TIMEOUT, self._idle_timeout)
+
+    def _idle_timeout(self):
+        if not self.busy and not self.streaming and not self.closed:
+            self.transport.close()
+
+    # ------------------------------------------
+    # تحليل الطلبات
+    # ------------------------------------------
+    def data_received(self, data):
+        if self.streaming or not self.receiving:
+            return
+        self.buffer += data
+        self._reset_idle()
+        while True:
+            request = self._next_request()
+            if request is None:
+                break
+            self.queue.append(request)
+            if request[1]:
+                # الاتصال سيُغلق بعد هذا الطلب: الباقي (جسم مرفوض مثلاً) لا يُحلَّل كطلبات
+                self.receiving = False
+                self.buffer.clear()
+                break
+        self._dispatch()
+
+    def _next_request(self):
+        """(طلب, إغلاق بعده, رد خطأ جاهز) أو None إذا لم يكتمل طلب بعد"""
+        end = self.buffer.find(b'\r\n\r\n')
+        if end < 0:
+            if len(self.buffer) > MAX_HEADER_SIZE:
+                return b'', True, error_response(431, 'Request Header Fields Too Large')
+            return None
+        head_end = end + 4
+        lengths = set()
+        for line in bytes(self.buffer[:end]).split(b'\r\n')[1:]:
+            name, _, value = line.partition(b':')
+            name = name.strip().lower()
+            if name == b'transfer-encoding':
+                # الأجسام المجزأة غير مدعومة؛ تجاهلها يجعل الجسم يُقرأ كطلب تالٍ
+                return b'', True, error_response(501, 'Not Implemented')
+            if name == b'content-length':
+                lengths.update(v.strip() for v in value.split(b','))
+        content_length = 0
+        if lengths:
+            if len(lengths) > 1 or not all(v.isdigit() for v in lengths):
+                # غير رقمي أو سالب أو متعارض: لا يمكن معرفة حدود الطلب
+                return b'', True, error_response(400, 'Bad Request')
+            content_length = int(lengths.pop())
+        if content_length > self.server.max_body_size:
+            # المعالج سيرد بـ 413؛ لا نقرأ الجسم ونغلق الاتصال بعد الرد
+            return bytes(self.buffer[:head_end]), True, None
+        if len(self.buffer) < head_end + content_length:
+            return None
+        request = bytes(self.buffer[:head_end + content_length])
+        del self.buffer[:head_end + content_length]
+        return request, False, None
+
+    # ------------------------------------------
+    # تنفيذ المعالج
+    # ------------------------------------------
+    def _dispatch(self):
+        if self.busy or not self.queue or self.closed or self.streaming:
+            return
+        raw_request, force_close, response = self.queue.pop(0)
+        if response is not None:
+            # خطأ تأطير: يُرسل بترتيبه بعد ردود الطلبات السابقة ثم يُغلق الاتصال
+            self.transport.write(response)
+            self.transport.close()
+            return
+        self.busy = True
+        future = self.loop.run_in_executor(self.server.executor, self._run_handler, raw_request)
+        future.add_done_callback(lambda f: self._handler_done(f, force_close))
+
+    def _run_handler(self, raw_request):
+        handler = self.server.handler_class(raw_request, self, self.peer, self.server.adapter)
+        return handler
+
+    def _handler_done(self, future, force_close):
+        self.busy = False
+        self.server.requests += 1
+        try:
+            handler = future.result()
+        except Exception as e:
+            print(f'⚠️ خطأ في المعالج: {e}')
+            self.transport.close()
+            return
+        if handler.detached:
+            return
+        if force_close or handler.close_connection:
+            self.transport.close()
+            return
+        self._reset_idle()
+        self._dispatch()
+
+    def start_event_stream(self, broker, last_event_id):
+        """تحويل الاتصال إلى بث SSE؛ الحلقة تملكه ولا يُحجز أي خيط"""
+        self.streaming = True
+
+        def write(frame):
+            self.loop.call_soon_threadsafe(self._write_event, frame, broker.max_buffer)
+
+        self.listener = broker.add_listener(write, last_event_id)
+        if self.closed:
+            broker.remove_listener(self.listener)
+
+    def _write_event(self, frame, max_buffer):
+        """داخل الحلقة: العميل البطيء الذي يتجاوز max_buffer يُفصل (connection_lost يزيل المشترك)"""
+        if self.closed:
+            return
+        if self.transport.get_write_buffer_size() + len(frame) > max_buffer:
+            self.transport.abort()
+            return
+        self.transport.write(frame)
+
+
+class AsyncHTTPServer:
+    """سيرفر asyncio يستخدم نفس فئة المعالج للسيرفر المتعدد الخيوط"""
+
+    def __init__(self, host, port, handler_class, max_workers, max_body_size, event_broker=None, sock=None):
+        self.host = host
+        self.port = port
+        self.sock = sock  # socket استماع موروث (وضع --workers)
+        self.handler_class = type('Async' + handler_class.__name__, (AsyncHandlerMixin, handler_class), {})
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='async-handler')
+        self.max_body_size = max_body_size
+        self.event_broker = event_broker
+        self.adapter = AsyncServerAdapter(event_broker)
+        self.loop = None
+        self.connections = 0
+        self.requests = 0
+
+    async def serve(self, ready=None):
+        self.loop = asyncio.get_running_loop()
+        if self.sock is not None:
+            server = await self.loop.create_server(lambda: HTTPProtocol(self), sock=self.sock, backlog=1024)
+        else:
+            server = await self.loop.create_server(
+                lambda: HTTPProtocol(self), self.host, self.port, backlog=1024, reuse_address=True)
+        if ready is not None:
+            ready.set()
+        async with server:
+            await server.serve_forever()
+
+    def serve_forever(self):
+        try:
+            asyncio.run(self.serve())
+        finally:
+            self.executor.shutdown(wait=False)
+
+    def shutdown(self):
+        # asyncio.run يُنهي الحلقة عند KeyboardInterrupt؛ لا شيء إضافي
+        pass
+
+    def get_stats(self):
+        return {'mode': 'asyncio', 'connections': self.connections, 'requests': self.requests}
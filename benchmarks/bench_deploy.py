@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+طابور النشر مع firebase_stub: زمن كل مرحلة، التجهيز التدريجي، والتوازي
+
+1) نشر أول لعدة مواقع (قوالب مختلفة): كل الملفات تُنسخ
+2) نفس النشر مرة ثانية: لا نسخ، والرفع يُتخطى (البيان لم يتغير)
+3) force بعد تعديل ملف واحد: نسخ ملف واحد + رفع
+
+مجلد التجهيز مؤقت؛ مجلدات القوالب في المشروع لا تُعدَّل.
+
+التشغيل: python benchmarks/bench_deploy.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from deploy import DeployQueue  # noqa: E402
+
+STUB = f'"{sys.executable}" "{os.path.join(ROOT, "benchmarks", "firebase_stub.py")}"'
+SITES = [('site-bon', 'bon'), ('site-coffee', 'coffee-shop'), ('site-sham', 'sham-coffee'),
+         ('site-classic', 'restaurant-classic')]
+
+
+def wait(queue, jobs):
+    while any(job.snapshot()['running'] for job in jobs):
+        time.sleep(0.05)
+
+
+def run_round(queue, title, force=False):
+    started = time.perf_counter()
+    jobs = []
+    for site, template in SITES:
+        job, error = queue.submit(site, template, force=force)
+        if job is None:
+            print(f'  {site}: {error}')
+            continue
+        jobs.append(job)
+    wait(queue, jobs)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f'\n{title} ({elapsed:.0f} ms wall, parallel={queue.max_parallel})')
+    print(f"{'site':>14} | {'ok':>3} | {'files':>5} | {'copied':>6} | {'manifest':>8} | {'stage':>6} | "
+          f"{'build':>6} | {'upload':>7} | {'total':>7}")
+    for job in jobs:
+        s = job.snapshot()
+        st = s['stages']
+        print(f"{s['siteId']:>14} | {'✔' if s['success'] else '✘':>3} | {s['files'].get('total', 0):>5} | "
+              f"{s['files'].get('copied', 0):>6} | {st.get('manifest', 0):>8.1f} | {st.get('stage', 0):>6.1f} | "
+              f"{st.get('build', 0):>6.1f} | {st.get('upload', 0):>7.1f} | {st.get('total', 0):>7.1f}")
+
+
+def main():
+    os.environ.setdefault('FIREBASE_STUB_DELAY', '0.3')
+    with tempfile.TemporaryDirectory() as stage_root:
+        queue = DeployQueue(ROOT, firebase_cli=STUB, stage_root=stage_root)
+        run_round(queue, '1) first deploy')
+        run_round(queue, '2) unchanged')
+        touched = os.path.join(stage_root, 'site-bon', 'index.html')
+        # تعديل نسخة المصدر غير مسموح هنا؛ نحذف الملف المجهز ليُعاد نسخه وحده
+        os.remove(touched)
+        run_round(queue, '3) forced, one staged file missing', force=True)
+        print(f'\nstats: {queue.get_stats()}')
+        queue.executor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
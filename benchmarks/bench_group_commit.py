@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+قياس الكتابة المجمّعة (group commit) في OrderJournal تحت ضغط متزامن
+
+عدة خيوط (نوادل) تضيف طلبات في نفس اللحظة؛ نقارن أوضاع المتانة الثلاثة:
+عدد التعديلات في الثانية، عدد عمليات fsync، متوسط التعديلات لكل كتابة وزمن الرد.
+
+التشغيل: python benchmarks/bench_group_commit.py
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from journal import DURABILITY_MODES, OrderJournal  # noqa: E402
+
+WRITERS = 32
+APPENDS = 50
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run(mode):
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = OrderJournal(os.path.join(tmp, 'data.json'), durability=mode, compact_every=10 ** 9)
+        journal.load()
+        latencies = []
+        lock = threading.Lock()
+
+        def writer(n):
+            local = []
+            for i in range(APPENDS):
+                order = {'id': n * APPENDS + i, 'tableId': n % 10 + 1, 'status': 'pending',
+                         'items': [{'id': 1, 'quantity': 2}], 'total': 10}
+                started = time.perf_counter()
+                journal.append([{'op': 'order.create', 'order': order}])
+                local.append(time.perf_counter() - started)
+            with lock:
+                latencies.extend(local)
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(WRITERS)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        journal.flush()
+        elapsed = time.perf_counter() - started
+        stats = journal.get_stats()
+        journal.close()
+        total = WRITERS * APPENDS
+        print(f'{mode:>9} | {total / elapsed:>9.0f} | {stats["flushes"]:>7} | {stats["records_per_flush"]:>8} '
+              f'| {percentile(latencies, 0.5) * 1000:>7.2f} | {percentile(latencies, 0.99) * 1000:>7.2f}')
+
+
+def main():
+    print(f'writers={WRITERS} appends={APPENDS}')
+    print(f"{'mode':>9} | {'writes/s':>9} | {'fsyncs':>7} | {'per sync':>8} | {'p50 ms':>7} | {'p99 ms':>7}")
+    print('-' * 62)
+    for mode in DURABILITY_MODES:
+        run(mode)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+ذاكرة الذروة لكل طلب: send_json الكامل مقابل البث المتدفق
+
+- كامل: json.dumps + encode + gzip.compress (نسختان كاملتان من الرد في الذاكرة)
+- متدفق: iter_json + gzip_chunks + إطار chunked إلى مخرج لا يحتفظ بشيء
+
+يقيس tracemalloc ذروة التخصيص أثناء الترميز فقط (البيانات نفسها محمّلة مسبقاً).
+
+التشغيل: python benchmarks/bench_json_stream.py
+"""
+
+import gzip
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_stream import gzip_chunks, iter_json, write_chunked  # noqa: E402
+
+SIZES = [1_000, 10_000, 100_000]
+
+
+class NullWriter:
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, data):
+        self.bytes += len(data)
+
+
+def make_data(n):
+    return {
+        'orders': [{'id': i, 'tableId': i % 10 + 1, 'status': 'pending', 'total': 7.5,
+                    'createdAt': '2026-10-18T12:00:00.000Z',
+                    'items': [{'id': j, 'name': 'شاي', 'category': 'drinks', 'price': 2.5, 'quantity': 1}
+                              for j in range(3)]}
+                   for i in range(n, 0, -1)],
+        'tables': [{'id': i, 'status': 'available', 'currentOrder': None} for i in range(1, 11)]
+    }
+
+
+def full(data, out):
+    body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+    out.write(gzip.compress(body, compresslevel=6))
+
+
+def streamed(data, out):
+    write_chunked(out, gzip_chunks(iter_json(data)))
+
+
+def measure(fn, data):
+    out = NullWriter()
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn(data, out)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024, elapsed * 1000, out.bytes
+
+
+def main():
+    print(f"{'orders':>8} | {'full peak KB':>12} | {'stream peak KB':>14} | {'full ms':>8} | {'stream ms':>9}")
+    print('-' * 64)
+    for n in SIZES:
+        data = make_data(n)
+        full_peak, full_ms, _ = measure(full, data)
+        stream_peak, stream_ms, _ = measure(streamed, data)
+        print(f'{n:>8} | {full_peak:>12.0f} | {stream_peak:>14.0f} | {full_ms:>8.1f} | {stream_ms:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
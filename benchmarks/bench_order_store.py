@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+قياس زمن عمليات OrderStore من 100 إلى 100 ألف طلب
+
+الهدف: إثبات أن البحث وتغيير الحالة والحذف بزمن ثابت O(1)
+مقارنة بالمسح الخطي القديم على data['orders'].
+
+التشغيل: python benchmarks/bench_order_store.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from order_store import OrderStore  # noqa: E402
+
+SIZES = [100, 1_000, 10_000, 100_000]
+OPS = 2_000
+
+
+def make_data(n):
+    return {
+        'orders': [
+            {'id': i, 'tableId': i % 10 + 1, 'status': 'pending', 'total': 5, 'items': []}
+            for i in range(n, 0, -1)
+        ],
+        'tables': [{'id': i, 'status': 'available', 'currentOrder': None} for i in range(1, 11)]
+    }
+
+
+def per_op_us(fn, ids):
+    start = time.perf_counter()
+    for i in ids:
+        fn(i)
+    return (time.perf_counter() - start) / len(ids) * 1e6
+
+
+def linear_update(data, order_id):
+    # الطريقة القديمة في do_POST
+    for order in data['orders']:
+        if order['id'] == order_id:
+            order['status'] = 'preparing'
+            break
+
+
+def main():
+    print(f"{'orders':>8} | {'get µs':>8} | {'status µs':>9} | {'delete µs':>9} | {'linear µs':>9}")
+    print('-' * 56)
+    for n in SIZES:
+        store = OrderStore(make_data(n))
+        step = max(1, n // OPS)
+        ids = list(range(1, n + 1, step))[:OPS]
+
+        get_us = per_op_us(store.get_order, ids)
+        status_us = per_op_us(lambda i: store.update_status(i, 'preparing'), ids)
+        delete_us = per_op_us(store.delete_order, ids)
+
+        data = make_data(n)
+        linear_ids = ids[:200]
+        linear_us = per_op_us(lambda i: linear_update(data, i), linear_ids)
+
+        print(f'{n:>8} | {get_us:>8.2f} | {status_us:>9.2f} | {delete_us:>9.2f} | {linear_us:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+قياس عدد فحوصات RateLimiter في الثانية تحت تنافس 100 خيط
+
+يقارن المحدد الحالي (نافذة منزلقة تقريبية + أقفال مجزأة) بالتطبيق القديم
+(قائمة بوقت كل طلب لكل IP + قفل واحد).
+
+التشغيل: python benchmarks/bench_rate_limiter.py [--threads 100] [--checks 2000] [--ips 500]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limiter import RateLimiter  # noqa: E402
+
+
+class LegacyRateLimiter:
+    """نسخة من التطبيق السابق في server.py للمقارنة"""
+
+    def __init__(self, max_requests=200, window=60):
+        self.requests = {}
+        self.max_requests = max_requests
+        self.window = window
+        self.lock = threading.Lock()
+
+    def is_allowed(self, ip):
+        with self.lock:
+            now = time.time()
+            if ip in self.requests:
+                self.requests[ip] = [t for t in self.requests[ip] if now - t < self.window]
+            else:
+                self.requests[ip] = []
+            if len(self.requests[ip]) >= self.max_requests:
+                return False
+            self.requests[ip].append(now)
+            return True
+
+
+def run(limiter, threads, checks, ips):
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(n):
+        addresses = [f'10.{n % 250}.{i // 250}.{i % 250}' for i in range(ips // threads + 1)]
+        barrier.wait()
+        for i in range(checks):
+            limiter.is_allowed(addresses[i % len(addresses)])
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return threads * checks / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=100)
+    parser.add_argument('--checks', type=int, default=2000)
+    parser.add_argument('--ips', type=int, default=500)
+    args = parser.parse_args()
+
+    legacy = run(LegacyRateLimiter(), args.threads, args.checks, args.ips)
+    current = run(RateLimiter(), args.threads, args.checks, args.ips)
+    print(f'legacy : {legacy:12,.0f} checks/s')
+    print(f'current: {current:12,.0f} checks/s  (x{current / legacy:.1f})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+تقرير نهاية الشهر: حلقات على القواميس مقابل الأعمدة (reports.py)
+
+- naive: مرور على كل طلب وكل صنف مع تحديث عدة قواميس لكل صف
+- columns: تسطيح إلى array ثم تجميع موجّه (NumPy إن وُجد، وإلا array)
+
+يُقاس زمن التجميع وحده (بعد التسطيح) ثم الزمن الكلي من القواميس.
+
+التشغيل: python benchmarks/bench_reports.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import reports  # noqa: E402
+
+SIZES = [10_000, 100_000]
+CATEGORIES = ('appetizers', 'mains', 'drinks', 'desserts')
+
+
+def make_orders(n, seed=1):
+    rnd = random.Random(seed)
+    orders = []
+    for i in range(n):
+        items = [{'id': j, 'name': f'صنف {j}', 'category': CATEGORIES[j % 4],
+                  'price': 1.5 + j % 7, 'quantity': rnd.randint(1, 3)}
+                 for j in rnd.sample(range(60), rnd.randint(1, 5))]
+        orders.append({
+            'id': i, 'tableId': rnd.randint(1, 30), 'status': 'completed',
+            'total': sum(it['price'] * it['quantity'] for it in items),
+            'createdAt': f'2026-10-{rnd.randint(1, 31):02d}T{rnd.randint(8, 23):02d}:00:00.000Z',
+            'items': items
+        })
+    return orders
+
+
+def naive_report(orders):
+    revenue = 0.0
+    by_table, by_day, by_hour, by_category, by_item = {}, {}, {}, {}, {}
+    totals = []
+    for order in orders:
+        total = float(order.get('total') or 0)
+        created = order.get('createdAt') or ''
+        revenue += total
+        totals.append(total)
+        by_table[order.get('tableId')] = by_table.get(order.get('tableId'), 0) + total
+        by_day[created[:10]] = by_day.get(created[:10], 0) + total
+        by_hour[created[11:13]] = by_hour.get(created[11:13], 0) + total
+        for item in order.get('items') or ():
+            amount = item['quantity'] * item['price']
+            by_category[item['category']] = by_category.get(item['category'], 0) + amount
+            by_item[item['id']] = by_item.get(item['id'], 0) + item['quantity']
+    totals.sort()
+    p95 = totals[int(len(totals) * 0.95)] if totals else 0
+    return revenue, by_table, by_day, by_hour, by_category, by_item, p95
+
+
+def timed(fn, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    engine = 'numpy' if reports.np is not None else 'array'
+    print(f'engine: {engine}')
+    print(f"{'orders':>8} | {'naive ms':>9} | {'flatten ms':>10} | {'aggregate ms':>12} | {'columns total ms':>16}")
+    print('-' * 68)
+    for n in SIZES:
+        orders = make_orders(n)
+        naive_ms = timed(naive_report, orders)
+        flatten_ms = timed(reports.OrderColumns.from_orders, orders, 'day', ('completed',))
+        cols = reports.OrderColumns.from_orders(orders, 'day', ('completed',))
+        aggregate_ms = timed(reports.build_report, cols)
+        total_ms = timed(reports.generate, orders)
+        print(f'{n:>8} | {naive_ms:>9.1f} | {flatten_ms:>10.1f} | {aggregate_ms:>12.1f} | {total_ms:>16.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+مقارنة حمل بين السيرفر المتعدد الخيوط ونواة asyncio (--async)
+
+لكل وضع يُشغَّل server.py في مجلد مؤقت ثم:
+- استطلاع متزامن لـ /api/orders و /api/tables من عدة عملاء (keep-alive إن أمكن)
+- موجة إعادة اتصال: مئات الاتصالات الجديدة في نفس اللحظة
+
+التشغيل: python benchmarks/bench_server_modes.py [--clients 50] [--requests 200] [--burst 500]
+"""
+
+import argparse
+import http.client
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER = os.path.join(ROOT, 'server.py')
+
+
+def start_server(port, extra_args):
+    workdir = tempfile.mkdtemp(prefix='bench-server-')
+    shutil.copy(os.path.join(ROOT, 'restaurant_data.json'), workdir)
+    proc = subprocess.Popen(
+        [sys.executable, SERVER, '--port', str(port)] + extra_args,
+        cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('localhost', port), timeout=0.2).close()
+            return proc, workdir
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError('السيرفر لم يبدأ')
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def poll_load(port, clients, requests_per_client):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def client():
+        conn = http.client.HTTPConnection('localhost', port, timeout=30)
+        local = []
+        for i in range(requests_per_client):
+            path = '/api/orders' if i % 2 == 0 else '/api/tables'
+            start = time.perf_counter()
+            try:
+                # نفس المستطلِع يحاول إعادة استخدام الاتصال؛ HTTP/1.0 يغلقه بعد كل رد
+                conn.request('GET', path, headers={'X-Forwarded-For': f'10.0.{id(conn) % 250}.{i % 250}'})
+                resp = conn.getresponse()
+                resp.read()
+                if resp.will_close:
+                    conn.close()
+                local.append(time.perf_counter() - start)
+            except (OSError, http.client.HTTPException):
+                errors[0] += 1
+                conn.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return {
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'errors': errors[0],
+    }
+
+
+def reconnect_burst(port, count):
+    """فتح count اتصالاً دفعة واحدة (أجهزة تعود بعد انقطاع Wi-Fi)"""
+    ok = [0]
+    lock = threading.Lock()
+    barrier = threading.Barrier(count)
+
+    def client(i):
+        try:
+            barrier.wait(timeout=30)
+            conn = http.client.HTTPConnection('localhost', port, timeout=30)
+            conn.request('GET', '/api/tables', headers={'X-Forwarded-For': f'10.1.{i // 250}.{i % 250}'})
+            conn.getresponse().read()
+            conn.close()
+            with lock:
+                ok[0] += 1
+        except (OSError, http.client.HTTPException, threading.BrokenBarrierError):
+            pass
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(count)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {'ok': ok[0], 'failed': count - ok[0], 'seconds': time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--burst', type=int, default=500)
+    args = parser.parse_args()
+
+    modes = [('threads', [], 3101), ('asyncio', ['--async'], 3102)]
+    for name, extra, port in modes:
+        proc, workdir = start_server(port, extra)
+        try:
+            poll = poll_load(port, args.clients, args.requests)
+            burst = reconnect_burst(port, args.burst)
+        finally:
+            proc.terminate()
+            proc.wait()
+            shutil.rmtree(workdir, ignore_errors=True)
+        print(f"{name:>8}: {poll['rps']:8.0f} req/s  p50 {poll['p50_ms']:6.2f}ms  "
+              f"p99 {poll['p99_ms']:7.2f}ms  errors {poll['errors']}  | "
+              f"burst {burst['ok']}/{args.burst} ok in {burst['seconds']:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
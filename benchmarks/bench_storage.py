@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+مقارنة خلفيات التخزين: ملف JSON الكامل مقابل السجل (json) مقابل sqlite
+
+لكل حجم (1k، 10k، 100k طلب):
+- قراءة: تحليل الملف كاملاً (load_data القديم عند انتهاء الكاش) مقابل
+  جلب طلب بالمعرف واستعلام مفهرس (حالة + حد 50) من جداول sqlite
+- كتابة: إعادة كتابة الملف كاملاً (save_data القديم) مقابل إضافة سطر في السجل
+  مقابل معاملة sqlite؛ كلها بوضع immediate (fsync لكل تعديل)
+
+التشغيل: python benchmarks/bench_storage.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from journal import OrderJournal, write_snapshot_file  # noqa: E402
+from sqlite_storage import SQLiteStorage, connect  # noqa: E402
+
+SIZES = [1_000, 10_000, 100_000]
+STATUSES = ['pending', 'preparing', 'ready', 'completed']
+
+
+def make_order(i):
+    return {
+        'id': i, 'tableId': i % 10 + 1, 'status': STATUSES[i % 4], 'total': 12.5,
+        'createdAt': f'2026-10-{i % 28 + 1:02d}T12:00:00.000Z',
+        'items': [{'id': j, 'name': f'item {j}', 'category': 'main', 'price': 2.5, 'quantity': 1}
+                  for j in range(1, 4)]
+    }
+
+
+def make_data(n):
+    return {
+        'orders': [make_order(i) for i in range(n, 0, -1)],
+        'tables': [{'id': i, 'status': 'available', 'currentOrder': None} for i in range(1, 11)]
+    }
+
+
+def timed_ms(fn, reps):
+    start = time.perf_counter()
+    for i in range(reps):
+        fn(i)
+    return (time.perf_counter() - start) / reps * 1000
+
+
+def bench(n, tmp):
+    data = make_data(n)
+    json_path = os.path.join(tmp, f'data_{n}.json')
+    write_snapshot_file(json_path, data)
+    file_reps = 3 if n >= 100_000 else 10
+
+    def read_file(_):
+        with open(json_path, 'r', encoding='utf-8') as f:
+            json.load(f)
+
+    def rewrite_file(i):
+        data['orders'][0]['status'] = STATUSES[i % 4]
+        write_snapshot_file(json_path, data)
+
+    file_read = timed_ms(read_file, file_reps)
+    file_write = timed_ms(rewrite_file, file_reps)
+
+    journal = OrderJournal(json_path, durability='immediate', compact_every=10 ** 9)
+    journal.load()
+    journal_write = timed_ms(
+        lambda i: journal.append([{'op': 'order.update', 'order': dict(make_order(i + 1), status='ready')}]), 200)
+    journal.close()
+
+    sqlite = SQLiteStorage(os.path.join(tmp, f'data_{n}.db'), durability='immediate')
+    sqlite.write_snapshot(data)
+    sqlite.load()
+    # القراءات المفهرسة باتصال مستقل (السيرفر نفسه يقرأ من OrderStore في الذاكرة)
+    reader = connect(sqlite.path)
+    get_ms = timed_ms(lambda i: reader.execute(
+        'SELECT data FROM orders WHERE id = ?', (i * 37 % n + 1,)).fetchone(), 2000)
+    query_ms = timed_ms(lambda i: reader.execute(
+        'SELECT data FROM orders WHERE status = ? ORDER BY seq DESC LIMIT 50', (STATUSES[i % 4],)).fetchall(), 500)
+    reader.close()
+    sqlite_write = timed_ms(
+        lambda i: sqlite.append([{'op': 'order.update', 'order': dict(make_order(i + 1), status='ready')}]), 200)
+    sqlite.close()
+
+    print(f'{n:>7} | {file_read:>9.2f} | {get_ms:>8.3f} | {query_ms:>8.3f} | '
+          f'{file_write:>9.2f} | {journal_write:>9.3f} | {sqlite_write:>9.3f}')
+
+
+def main():
+    print('ms per operation')
+    print(f"{'orders':>7} | {'file read':>9} | {'sql get':>8} | {'sql qry':>8} | "
+          f"{'file save':>9} | {'jrnl save':>9} | {'sql save':>9}")
+    print('-' * 80)
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in SIZES:
+            bench(n, tmp)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+تدرج الإنتاجية مع عدد العمليات (server.py --workers)
+
+- يشغّل السيرفر لكل عدد عمال (1، 2، 4 ... حتى عدد الأنوية) في مجلد مؤقت
+- يملأ المخزن بطلبات ثم يضغط عليه من عمليات عميل مستقلة (حتى لا يكون العميل
+  نفسه محدوداً بـ GIL) بطلبات متتالية بلا انتظار
+- المزيج: استعلامات مصفّاة (json.dumps + gzip لكل طلب) + قراءة كاملة + نسبة كتابات
+  تمر بالمالك وتُبث لكل العمال
+- --tenant: نفس المزيج على /api/<tenant>/... ؛ قراءات المطاعم تُخدم من المالك وحده
+  (لا نسخ لها في العمال)، فلا يُتوقع أن تتدرج مع عدد العمال كالمخزن الرئيسي
+
+التشغيل:
+    python benchmarks/bench_workers.py
+    python benchmarks/bench_workers.py --workers 1 2 4 8 --duration 10 --clients 16
+    python benchmarks/bench_workers.py --tenant
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED_ORDERS = 2000
+WRITE_RATIO = 0.05
+QUERY = '/orders?status=pending,preparing&limit=200'
+TENANT_ID = 'bench-tenant'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def request(port, method, path, body=None, client=0, n=0):
+    # عنوان مختلف لكل طلب: حد الطلبات لكل IP ليس موضوع هذا القياس
+    headers = {'Accept-Encoding': 'gzip', 'X-Forwarded-For': f'10.{client % 250}.{n // 250 % 250}.{n % 250 + 1}'}
+    if body is not None:
+        body = json.dumps(body).encode('utf-8')
+        headers['Content-Type'] = 'application/json'
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def make_order(i):
+    return {'id': 10 ** 12 + i, 'tableId': i % 30 + 1, 'status': ('pending', 'preparing', 'completed')[i % 3],
+            'items': [{'id': j, 'name': f'صنف {j}', 'price': 2.5, 'quantity': 1} for j in range(4)],
+            'total': 10.0, 'createdAt': time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())}
+
+
+def client_loop(args):
+    """عملية عميل واحدة: طلبات متتالية حتى انتهاء المدة؛ تُرجع (العدد، الأزمنة، الأخطاء)"""
+    port, client, duration, seed, prefix = args
+    rnd = random.Random(seed)
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    n = 0
+    while time.perf_counter() < deadline:
+        n += 1
+        roll = rnd.random()
+        started = time.perf_counter()
+        try:
+            if roll < WRITE_RATIO:
+                status = request(port, 'POST', prefix + '/orders', make_order(seed * 10 ** 6 + n), client, n)
+            elif roll < 0.5:
+                status = request(port, 'GET', prefix + QUERY, client=client, n=n)
+            else:
+                status = request(port, 'GET', prefix + '/orders', client=client, n=n)
+        except OSError:
+            status = 0
+        latencies.append(time.perf_counter() - started)
+        if status != 200:
+            errors += 1
+    return latencies, errors
+
+
+def run(workers, args):
+    workdir = tempfile.mkdtemp(prefix='restaurant-workers-')
+    prefix = '/api'
+    if args.tenant:
+        # مطعم مُجهَّز يدوياً (مجلد موجود) حتى لا يرد السيرفر 404
+        os.makedirs(os.path.join(workdir, 'tenants', TENANT_ID))
+        prefix = f'/api/{TENANT_ID}'
+    port = free_port()
+    cmd = [sys.executable, os.path.join(ROOT, 'server.py'), '--host', '127.0.0.1', '--port', str(port),
+           '--workers', str(workers)] + (['--async'] if args.use_async else [])
+    process = subprocess.Popen(cmd, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.time() + 15
+        while True:
+            try:
+                request(port, 'GET', '/api/health')
+                break
+            except OSError:
+                if time.time() > deadline:
+                    raise RuntimeError('server did not start')
+                time.sleep(0.1)
+        for i in range(args.orders):
+            request(port, 'POST', prefix + '/orders', make_order(i), client=249, n=i)
+        with multiprocessing.Pool(args.clients) as pool:
+            started = time.perf_counter()
+            results = pool.map(client_loop, [(port, 1000 + c, args.duration, c, prefix) for c in range(args.clients)])
+            elapsed = time.perf_counter() - started
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+    latencies = sorted(lat for lats, _ in results for lat in lats)
+    errors = sum(e for _, e in results)
+    pick = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] * 1000 if latencies else 0
+    return {'workers': workers, 'requests': len(latencies), 'rps': len(latencies) / elapsed,
+            'p50_ms': pick(50), 'p99_ms': pick(99), 'errors': errors}
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description='تدرج الإنتاجية مع --workers')
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, cores} - {0}) if cores > 1 else [1, 2])
+    parser.add_argument('--duration', type=float, default=8)
+    parser.add_argument('--clients', type=int, default=max(8, cores * 2), help='عمليات العميل')
+    parser.add_argument('--orders', type=int, default=SEED_ORDERS)
+    parser.add_argument('--async', dest='use_async', action='store_true')
+    parser.add_argument('--tenant', action='store_true', help='الضغط على بيانات مطعم بدل المخزن الرئيسي')
+    parser.add_argument('--output', help='حفظ النتائج JSON')
+    args = parser.parse_args()
+
+    print(f'cores={cores} clients={args.clients} orders={args.orders} duration={args.duration}s '
+          f"mode={'asyncio' if args.use_async else 'threads'} store={TENANT_ID if args.tenant else 'main'}")
+    print(f"{'workers':>7} | {'requests':>8} | {'req/s':>8} | {'speedup':>7} | {'p50 ms':>7} | {'p99 ms':>7} | {'errors':>6}")
+    results = []
+    for workers in args.workers:
+        r = run(workers, args)
+        results.append(r)
+        speedup = r['rps'] / results[0]['rps'] if results[0]['rps'] else 0
+        print(f"{r['workers']:>7} | {r['requests']:>8} | {r['rps']:>8.0f} | {speedup:>6.2f}x | "
+              f"{r['p50_ms']:>7.2f} | {r['p99_ms']:>7.2f} | {r['errors']:>6}")
+    if cores < max(args.workers):
+        print(f'\n⚠️ {cores} نواة فقط: لا يُتوقع تحسن بعد {cores} عامل')
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'cores': cores, 'config': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+بديل محلي لأمر firebase (للاختبار والقياس دون شبكة أو تسجيل دخول)
+
+يدعم:
+- deploy --only hosting[:site] --project P: يطبع تقدماً سطراً بسطر بعد كل ملف
+- hosting:sites:list [--json]: قائمة مواقع ثابتة
+
+متغيرات البيئة:
+- FIREBASE_STUB_DELAY: ثواني الانتظار الكلية لـ deploy (افتراضي 0.5)
+- FIREBASE_STUB_FAIL=1: إنهاء deploy برمز خطأ
+- FIREBASE_STUB_SITES: مواقع مفصولة بفاصلة
+
+الاستخدام:
+    FIREBASE_CLI="python benchmarks/firebase_stub.py" python server.py
+"""
+
+import json
+import os
+import sys
+import time
+
+
+def deploy(args):
+    only = args[args.index('--only') + 1] if '--only' in args else 'hosting'
+    delay = float(os.environ.get('FIREBASE_STUB_DELAY', '0.5'))
+    files = [os.path.join(d, f) for d, _, names in os.walk('.') for f in names if not f.startswith('.')]
+    print(f'=== Deploying to {only} ===', flush=True)
+    print(f'i  hosting: found {len(files)} files in .', flush=True)
+    steps = 5
+    for i in range(1, steps + 1):
+        time.sleep(delay / steps)
+        print(f'i  hosting: uploading new files [{i * len(files) // steps}/{len(files)}] ({i * 100 // steps}%)',
+              flush=True)
+    if os.environ.get('FIREBASE_STUB_FAIL') == '1':
+        print('Error: HTTP Error: 403, stub failure', flush=True)
+        return 1
+    print('✔  Deploy complete!', flush=True)
+    return 0
+
+
+def sites_list(args):
+    sites = [s for s in os.environ.get('FIREBASE_STUB_SITES', 'stub-site-a,stub-site-b').split(',') if s]
+    if '--json' in args:
+        print(json.dumps({'status': 'success', 'result': {'sites': [{'name': f'projects/p/sites/{s}', 'site': s}
+                                                                      for s in sites]}}))
+    else:
+        for site in sites:
+            print(f'{site}  https://{site}.web.app')
+    return 0
+
+
+def main(argv):
+    if not argv:
+        print('usage: firebase_stub.py <deploy|hosting:sites:list> ...')
+        return 2
+    if argv[0] == 'deploy':
+        return deploy(argv[1:])
+    if argv[0] == 'hosting:sites:list':
+        return sites_list(argv[1:])
+    print(f'Error: unsupported command {argv[0]}')
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+مولّد حمل واقعي لمطعم: يشغّل server.py على منفذ محلي ويحاكي الأجهزة
+
+- نُدُل (waiters): إضافة طلبات POST /api/orders
+- شاشات المطبخ/الكاشير (screens): استطلاع /api/orders و /api/tables مع ETag (304)
+- كاشير (cashiers): نقل الطلبات pending → preparing → ready → completed عبر /api/orders/update
+- متصفحات (browsers): تحميل index.html / super-admin.html وملفات js
+- admin: /api/hosting/sites (firebase مستبدل بـ benchmarks/firebase_stub.py)
+
+--restaurants N: الأجهزة موزعة على N مطعماً عبر /api/<restaurantId>/... (بيانات كل مطعم مستقلة).
+
+كل جهاز له X-Forwarded-For خاص (حد الطلبات لكل جهاز كما في الواقع).
+الناتج: p50/p95/p99 والإنتاجية والأخطاء لكل مسار + ملف JSON للمقارنة بين الإصدارات.
+
+التشغيل:
+    python benchmarks/load_test.py --duration 30 --waiters 10 --screens 20 --output results.json
+    python benchmarks/load_test.py --compare old.json --output new.json
+    python benchmarks/load_test.py --server-args="--async"
+"""
+
+import argparse
+import gzip
+import http.client
+import json
+import os
+import random
+import shlex
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUB = os.path.join(ROOT, 'benchmarks', 'firebase_stub.py')
+ROLES = ('waiter', 'screen', 'cashier', 'browser', 'admin')
+STATUS_FLOW = {'pending': 'preparing', 'preparing': 'ready', 'ready': 'completed'}
+PAGES = ('/index.html', '/super-admin.html', '/cashier.html', '/js/performance.js', '/js/firebase-config.js')
+MENU = [{'id': i, 'name': f'صنف {i}', 'category': ('drinks', 'mains', 'desserts')[i % 3],
+         'price': 1.5 + i % 7, 'quantity': 1} for i in range(1, 31)]
+
+
+def percentile(ordered, p):
+    if not ordered:
+        return 0.0
+    pos = (len(ordered) - 1) * p / 100
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+class Recorder:
+    """زمن كل طلب لكل مسار (قائمة لكل خيط تُدمج في النهاية)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}  # route -> [(latency, status)]
+
+    def add_batch(self, batch):
+        with self.lock:
+            for route, items in batch.items():
+                self.samples.setdefault(route, []).extend(items)
+
+    def summary(self, duration):
+        routes = {}
+        for route, items in sorted(self.samples.items()):
+            latencies = sorted(lat for lat, _ in items)
+            statuses = {}
+            for _, status in items:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+            errors = sum(c for s, c in statuses.items() if s == '0' or s.startswith('5'))
+            routes[route] = {
+                'requests': len(items),
+                'throughput_rps': round(len(items) / duration, 2),
+                'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+                'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+                'max_ms': round(latencies[-1] * 1000, 2) if latencies else 0,
+                'statuses': statuses,
+                'errors': errors
+            }
+        return routes
+
+
+class Device(threading.Thread):
+    """جهاز واحد (حلقة مغلقة: طلب ثم انتظار think time)"""
+
+    def __init__(self, harness, role, index):
+        super().__init__(name=f'{role}-{index}', daemon=True)
+        self.h = harness
+        self.role = role
+        self.ip = f'10.{ROLES.index(role) + 1}.{index // 250}.{index % 250 + 1}'
+        self.rnd = random.Random(f'{role}-{index}')
+        self.etags = {}
+        self.orders = []
+        self.batch = {}
+        # المسار الفعلي للمطعم، والتسمية في التقرير بدون معرّفه
+        self.api = harness.api_prefix(index)
+        self.label = '/api/{restaurant}' if harness.restaurants else '/api'
+
+    def request(self, method, path, body=None, route=None, conditional=False):
+        headers = {'X-Forwarded-For': self.ip, 'Accept-Encoding': 'gzip'}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        if conditional and path in self.etags:
+            headers['If-None-Match'] = self.etags[path]
+        started = time.perf_counter()
+        status, data = 0, b''
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', self.h.port, timeout=30)
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+            status = response.status
+            etag = response.getheader('ETag')
+            if etag and conditional:
+                self.etags[path] = etag
+            conn.close()
+        except (OSError, http.client.HTTPException):
+            pass
+        latency = time.perf_counter() - started
+        self.batch.setdefault(route or f'{method} {path}', []).append((latency, status))
+        return status, data
+
+    def json_of(self, data):
+        try:
+            if data[:2] == b'\x1f\x8b':
+                data = gzip.decompress(data)
+            return json.loads(data.decode('utf-8'))
+        except (ValueError, OSError):
+            return None
+
+    def run(self):
+        interval = self.h.intervals[self.role]
+        # بداية متفرقة حتى لا تتزامن كل الأجهزة
+        self.h.stopped.wait(self.rnd.random() * interval)
+        while not self.h.stopped.is_set():
+            getattr(self, f'act_{self.role}')()
+            if len(self.batch) and sum(map(len, self.batch.values())) >= 50:
+                self.h.recorder.add_batch(self.batch)
+                self.batch = {}
+            self.h.stopped.wait(interval * (0.5 + self.rnd.random()))
+        self.h.recorder.add_batch(self.batch)
+
+    # ------------------------------------------
+    # الأدوار
+    # ------------------------------------------
+    def act_waiter(self):
+        items = [dict(item, quantity=self.rnd.randint(1, 3)) for item in self.rnd.sample(MENU, self.rnd.randint(1, 4))]
+        order = {'tableId': self.rnd.randint(1, self.h.tables), 'items': items, 'status': 'pending',
+                 'total': round(sum(i['price'] * i['quantity'] for i in items), 2),
+                 'createdAt': time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())}
+        self.request('POST', f'{self.api}/orders', order, route=f'POST {self.label}/orders')
+
+    def act_screen(self):
+        self.request('GET', f'{self.api}/orders', route=f'GET {self.label}/orders', conditional=True)
+        self.request('GET', f'{self.api}/tables', route=f'GET {self.label}/tables', conditional=True)
+
+    def act_cashier(self):
+        if not self.orders:
+            status, data = self.request('GET', f'{self.api}/orders?status=pending,preparing,ready&limit=50',
+                                        route=f'GET {self.label}/orders?status')
+            payload = self.json_of(data) if status == 200 else None
+            if payload:
+                orders = payload.get('orders', [])
+                self.rnd.shuffle(orders)
+                self.orders = orders[:5]
+            return
+        order = self.orders.pop()
+        next_status = STATUS_FLOW.get(order.get('status'))
+        if next_status:
+            self.request('POST', f'{self.api}/orders/update', {'id': order['id'], 'status': next_status},
+                         route=f'POST {self.label}/orders/update')
+
+    def act_browser(self):
+        for path in PAGES:
+            self.request('GET', path, route=f'GET {path}')
+
+    def act_admin(self):
+        self.request('GET', '/api/hosting/sites?project=restaurant-system-demo', route='GET /api/hosting/sites')
+        self.request('GET', '/api/stats', route='GET /api/stats')
+
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.port = args.port or self.free_port()
+        self.tables = args.tables
+        self.restaurants = args.restaurants
+        self.recorder = Recorder()
+        self.stopped = threading.Event()
+        self.intervals = {'waiter': args.waiter_interval, 'screen': args.screen_interval,
+                          'cashier': args.cashier_interval, 'browser': args.browser_interval,
+                          'admin': args.admin_interval}
+        self.workdir = tempfile.mkdtemp(prefix='restaurant-load-')
+        for index in range(self.restaurants):
+            # تجهيز المطاعم: السيرفر يرد بـ 404 لأي معرّف ليس له مجلد أو ليس في initial-data.json
+            os.makedirs(os.path.join(self.workdir, 'tenants', f'restaurant-{index + 1}'))
+        self.process = None
+
+    def api_prefix(self, index):
+        if not self.restaurants:
+            return '/api'
+        return f'/api/restaurant-{index % self.restaurants + 1}'
+
+    @staticmethod
+    def free_port():
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            return s.getsockname()[1]
+
+    def start_server(self):
+        # بيانات في مجلد مؤقت (cwd)، والملفات الثابتة من المشروع
+        cmd = [sys.executable, os.path.join(ROOT, 'server.py'), '--host', '127.0.0.1', '--port', str(self.port),
+               '--firebase-cli', f'"{sys.executable}" "{STUB}"'] + shlex.split(self.args.server_args)
+        env = dict(os.environ, FIREBASE_STUB_DELAY='0.2', PYTHONIOENCODING='utf-8')
+        self.process = subprocess.Popen(cmd, cwd=self.workdir, stdout=subprocess.DEVNULL,
+                                        stderr=subprocess.DEVNULL, env=env)
+        deadline = time.time() + 15
+        while time.time() < deadline:
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=2)
+                conn.request('GET', '/api/health')
+                conn.getresponse().read()
+                conn.close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError('server did not start')
+        for index in range(max(1, self.restaurants)):
+            conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+            conn.request('POST', f'{self.api_prefix(index)}/tables/count', body=json.dumps({'count': self.tables}),
+                         headers={'Content-Type': 'application/json', 'X-Forwarded-For': f'10.255.0.{index % 250 + 1}'})
+            conn.getresponse().read()
+            conn.close()
+
+    def scrape_metrics(self):
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+            conn.request('GET', '/metrics', headers={'X-Forwarded-For': '10.255.0.2'})
+            text = conn.getresponse().read().decode('utf-8')
+            conn.close()
+        except OSError:
+            return {}
+        wanted = ('lock_wait_seconds_sum', 'lock_wait_seconds_count', 'lock_hold_seconds_sum',
+                  'save_data_seconds_sum', 'save_data_seconds_count', 'process_threads')
+        out = {}
+        for line in text.splitlines():
+            if line.startswith(wanted):
+                name, _, value = line.rpartition(' ')
+                out[name] = float(value)
+        return out
+
+    def run(self):
+        self.start_server()
+        counts = {'waiter': self.args.waiters, 'screen': self.args.screens, 'cashier': self.args.cashiers,
+                  'browser': self.args.browsers, 'admin': self.args.admins}
+        devices = [Device(self, role, i) for role, n in counts.items() for i in range(n)]
+        started = time.perf_counter()
+        for device in devices:
+            device.start()
+        self.stopped.wait(self.args.duration)
+        self.stopped.set()
+        for device in devices:
+            device.join(timeout=35)
+        duration = time.perf_counter() - started
+        server_metrics = self.scrape_metrics()
+        return {
+            'commit': self.git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'config': dict(vars(self.args), port=self.port),
+            'duration_s': round(duration, 2),
+            'total_requests': sum(len(v) for v in self.recorder.samples.values()),
+            'routes': self.recorder.summary(duration),
+            'server_metrics': server_metrics
+        }
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    @staticmethod
+    def git_commit():
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                  text=True, timeout=5).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+
+def print_report(result, baseline=None):
+    print(f"\ncommit {result['commit']} | {result['duration_s']}s | {result['total_requests']} requests")
+    header = f"{'route':<40} | {'req':>6} | {'rps':>7} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'err':>4}"
+    if baseline:
+        header += f" | {'Δp95':>8}"
+    print(header)
+    print('-' * len(header))
+    for route, r in result['routes'].items():
+        line = (f"{route[:40]:<40} | {r['requests']:>6} | {r['throughput_rps']:>7.1f} | {r['p50_ms']:>8.2f} | "
+                f"{r['p95_ms']:>8.2f} | {r['p99_ms']:>8.2f} | {r['errors']:>4}")
+        if baseline:
+            old = baseline.get('routes', {}).get(route)
+            line += f" | {r['p95_ms'] - old['p95_ms']:>+8.2f}" if old else f" | {'new':>8}"
+        print(line)
+    limited = {route: r['statuses'].get('429') for route, r in result['routes'].items() if r['statuses'].get('429')}
+    if limited:
+        print(f'\n⚠️ 429 (rate limited): {limited}')
+    if result.get('server_metrics'):
+        print(f"\nserver: {result['server_metrics']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='مولّد حمل واقعي لسيرفر المطعم')
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--waiters', type=int, default=10)
+    parser.add_argument('--screens', type=int, default=20)
+    parser.add_argument('--cashiers', type=int, default=3)
+    parser.add_argument('--browsers', type=int, default=5)
+    parser.add_argument('--admins', type=int, default=1)
+    parser.add_argument('--tables', type=int, default=30)
+    parser.add_argument('--restaurants', type=int, default=0,
+                        help='توزيع الأجهزة على N مطعماً (/api/<restaurantId>/...)؛ 0 = المخزن الرئيسي')
+    parser.add_argument('--waiter-interval', type=float, default=2.0, help='ثواني بين طلبات النادل')
+    parser.add_argument('--screen-interval', type=float, default=1.0, help='ثواني بين استطلاعات الشاشة')
+    parser.add_argument('--cashier-interval', type=float, default=0.5)
+    parser.add_argument('--browser-interval', type=float, default=10.0)
+    parser.add_argument('--admin-interval', type=float, default=5.0)
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--server-args', default='', help='معاملات إضافية لـ server.py (مثلاً "--async")')
+    parser.add_argument('--output', help='حفظ النتائج JSON')
+    parser.add_argument('--compare', help='ملف نتائج سابق للمقارنة (Δp95 لكل مسار)')
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    harness = Harness(args)
+    try:
+        result = harness.run()
+    finally:
+        harness.stop()
+    print_report(result, baseline)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f'\n💾 {args.output}')
+
+
+if __name__ == '__main__':
+    main()
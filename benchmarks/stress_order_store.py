@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+اختبار ضغط لعزل القراءة وأقفال الكيانات في OrderStore
+
+- 100 خيط كاتب يزيد كل منهم عدّاداً داخل طلبات مشتركة عبر update_order
+  (نصفهم بمعاملة مباشرة ونصفهم بمقارنة الإصدار مع إعادة المحاولة)
+- خيوط قارئة تُسلسل اللقطات بـ json.dumps أثناء الكتابة (لا يجب أن يفشل أي تسلسل)
+- النتيجة المتوقعة: مجموع العدّادات = عدد الكتّاب × عدد الزيادات (صفر تحديثات مفقودة)
+
+التشغيل: python benchmarks/stress_order_store.py
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from order_store import OrderStore, VersionConflict  # noqa: E402
+
+WRITERS = 100
+READERS = 4
+INCREMENTS = 200
+ORDERS = 8  # طلبات مشتركة قليلة لزيادة التنافس
+
+
+def make_store():
+    return OrderStore({
+        'orders': [{'id': i, 'tableId': i, 'status': 'pending', 'counter': 0, 'items': []}
+                   for i in range(ORDERS, 0, -1)],
+        'tables': [{'id': i, 'status': 'available', 'currentOrder': None} for i in range(1, ORDERS + 1)]
+    })
+
+
+def increment(order):
+    return dict(order, counter=order['counter'] + 1)
+
+
+def locked_writer(store, n):
+    for i in range(INCREMENTS):
+        store.update_order((n + i) % ORDERS + 1, increment)
+
+
+def cas_writer(store, n, stats):
+    for i in range(INCREMENTS):
+        order_id = (n + i) % ORDERS + 1
+        while True:
+            version = store.order_version(order_id)
+            try:
+                store.update_order(order_id, increment, expected_version=version)
+                break
+            except VersionConflict:
+                stats['conflicts'] += 1
+
+
+def reader(store, stop, stats):
+    while not stop.is_set():
+        snap = store.snapshot()
+        json.dumps({'orders': snap.orders, 'tables': snap.tables})
+        stats['reads'] += 1
+
+
+def main():
+    store = make_store()
+    stats = {'conflicts': 0, 'reads': 0}
+    stop = threading.Event()
+    readers = [threading.Thread(target=reader, args=(store, stop, stats)) for _ in range(READERS)]
+    writers = [
+        threading.Thread(target=cas_writer, args=(store, n, stats)) if n % 2
+        else threading.Thread(target=locked_writer, args=(store, n))
+        for n in range(WRITERS)
+    ]
+    for t in readers:
+        t.start()
+    start = time.perf_counter()
+    for t in writers:
+        t.start()
+    for t in writers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for t in readers:
+        t.join()
+
+    expected = WRITERS * INCREMENTS
+    total = sum(o['counter'] for o in store.list_orders())
+    print(f'writers={WRITERS} increments={INCREMENTS} orders={ORDERS}')
+    print(f'total={total} expected={expected} lost={expected - total}')
+    print(f'cas_conflicts={stats["conflicts"]} snapshot_reads={stats["reads"]} '
+          f'version={store.version} elapsed={elapsed:.2f}s')
+    if total != expected:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
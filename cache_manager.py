@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+نظام التخزين المؤقت: LRU حقيقي بتكلفة O(1) مع TTL لكل مفتاح
+
+- OrderedDict لكل جزء (shard): get/set/evict بتكلفة O(1)
+- أقفال مجزأة حسب المفتاح بدلاً من RLock واحد لكل المعالجات
+- TTL لكل مدخل (custom_ttl) بدلاً من TTL عام فقط
+- الإبطال حسب البادئة (ما قبل ':' في المفتاح) دون مسح كل المفاتيح
+- إحصائيات: الإخراج، الانتهاء، تقدير الذاكرة ونسبة الإصابة لكل بادئة
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_SHARDS = 16
+SIZE_SAMPLE = 64  # عدد العناصر المفحوصة لتقدير حجم القوائم/القواميس الكبيرة
+
+
+def namespace_of(key):
+    """البادئة: الجزء قبل ':' (hosting_sites:default -> hosting_sites)"""
+    return str(key).split(':', 1)[0]
+
+
+def estimate_size(value):
+    """تقدير تقريبي وسريع لحجم القيمة بالبايت (عينة من العناصر للحاويات الكبيرة)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        items = list(value.items())[:SIZE_SAMPLE]
+        if items:
+            sample = sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in items)
+            size += sample * len(value) // len(items)
+    elif isinstance(value, (list, tuple)):
+        items = value[:SIZE_SAMPLE]
+        if items:
+            sample = sum(estimate_size(v) if isinstance(v, dict) else sys.getsizeof(v) for v in items)
+            size += sample * len(value) // len(items)
+    return size
+
+
+class _Entry:
+    __slots__ = ('value', 'expires', 'size', 'namespace')
+
+    def __init__(self, value, expires, size, namespace):
+        self.value = value
+        self.expires = expires
+        self.size = size
+        self.namespace = namespace
+
+
+class _Shard:
+    __slots__ = ('lock', 'entries', 'namespaces', 'memory', 'evictions', 'expirations', 'last_cleanup')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> _Entry (الأقدم استخداماً أولاً)
+        self.namespaces = {}  # namespace -> set(keys)
+        self.memory = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.last_cleanup = time.monotonic()
+
+
+class CacheManager:
+    def __init__(self, ttl=30, max_size=1000, shards=DEFAULT_SHARDS, cleanup_interval=60):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.cleanup_interval = cleanup_interval  # تنظيف كل دقيقة
+        self._shards = [_Shard() for _ in range(shards)]
+        self._shard_max = max(1, max_size // shards)
+        # عدادات لكل بادئة: namespace -> [hits, misses]؛ الزيادة غير ذرية تماماً وتكفي للإحصاء
+        self._ns_stats = {}
+
+    def _shard(self, key):
+        return self._shards[hash(key) % len(self._shards)]
+
+    def _count(self, namespace, hit):
+        stats = self._ns_stats.get(namespace)
+        if stats is None:
+            stats = self._ns_stats.setdefault(namespace, [0, 0])
+        stats[0 if hit else 1] += 1
+
+    # ------------------------------------------
+    # الواجهة الأساسية
+    # ------------------------------------------
+    def get(self, key):
+        shard = self._shard(key)
+        namespace = namespace_of(key)
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is not None:
+                if entry.expires > time.monotonic():
+                    shard.entries.move_to_end(key)
+                    self._count(namespace, True)
+                    return entry.value
+                self._remove(shard, key)
+                shard.expirations += 1
+        self._count(namespace, False)
+        return None
+
+    def set(self, key, value, custom_ttl=None):
+        ttl = self.ttl if custom_ttl is None else custom_ttl
+        now = time.monotonic()
+        entry = _Entry(value, now + ttl, estimate_size(value), namespace_of(key))
+        shard = self._shard(key)
+        with shard.lock:
+            if key in shard.entries:
+                self._remove(shard, key)
+            shard.entries[key] = entry
+            shard.memory += entry.size
+            shard.namespaces.setdefault(entry.namespace, set()).add(key)
+            # إذا امتلأ الجزء، نحذف الأقدم استخداماً
+            while len(shard.entries) > self._shard_max:
+                self._remove(shard, next(iter(shard.entries)))
+                shard.evictions += 1
+            if now - shard.last_cleanup >= self.cleanup_interval:
+                self._cleanup(shard, now)
+
+    def invalidate(self, pattern=None):
+        """إبطال بادئة كاملة (مثل 'hosting_sites') أو كل الكاش"""
+        for shard in self._shards:
+            with shard.lock:
+                if pattern is None:
+                    shard.entries.clear()
+                    shard.namespaces.clear()
+                    shard.memory = 0
+                    continue
+                for key in list(shard.namespaces.get(namespace_of(pattern), ())):
+                    self._remove(shard, key)
+
+    # ------------------------------------------
+    # داخلي
+    # ------------------------------------------
+    def _remove(self, shard, key):
+        entry = shard.entries.pop(key)
+        shard.memory -= entry.size
+        keys = shard.namespaces.get(entry.namespace)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del shard.namespaces[entry.namespace]
+
+    def _cleanup(self, shard, now):
+        """تنظيف تلقائي للعناصر المنتهية في جزء واحد"""
+        shard.last_cleanup = now
+        expired = [k for k, e in shard.entries.items() if e.expires <= now]
+        for k in expired:
+            self._remove(shard, k)
+        shard.expirations += len(expired)
+
+    def locks(self):
+        """أقفال كل الشرائح (تُحجز معاً أثناء fork حتى لا يرث العامل شريحة مقفلة)"""
+        return [shard.lock for shard in self._shards]
+
+    def get_stats(self):
+        """إحصائيات الكاش"""
+        size = memory = evictions = expirations = 0
+        for shard in self._shards:
+            size += len(shard.entries)
+            memory += shard.memory
+            evictions += shard.evictions
+            expirations += shard.expirations
+        hits = sum(s[0] for s in self._ns_stats.values())
+        misses = sum(s[1] for s in self._ns_stats.values())
+        total = hits + misses
+        hit_rate = (hits / total * 100) if total > 0 else 0
+        prefixes = {}
+        for namespace, (ns_hits, ns_misses) in list(self._ns_stats.items()):
+            ns_total = ns_hits + ns_misses
+            prefixes[namespace] = {
+                'hits': ns_hits,
+                'misses': ns_misses,
+                'hit_rate': f'{(ns_hits / ns_total * 100) if ns_total else 0:.1f}%'
+            }
+        return {
+            'size': size,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': f'{hit_rate:.1f}%',
+            'evictions': evictions,
+            'expirations': expirations,
+            'memory_estimate_bytes': memory,
+            'shards': len(self._shards),
+            'prefixes': prefixes
+        }
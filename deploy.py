@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+خط نشر القوالب: بيان محتوى + تجهيز تدريجي + طابور متوازي محدود
+
+المراحل لكل نشر (مع زمن كل مرحلة في الحالة):
+- manifest: بصمة sha256 لكل ملف مطلوب (القالب + js/css + صفحات HTML الأساسية)،
+  والبصمات تُعاد حسابها فقط للملفات التي تغيّر mtime/حجمها
+- stage: مجلد تجهيز لكل موقع (.deploy/<target>) تُنسخ إليه الملفات المتغيرة فقط
+  ويُحذف منه ما لم يعد مطلوباً؛ مجلد القالب الأصلي لا يُعدَّل
+- build: تصغير ودمج JS/CSS بأسماء ببصمة المحتوى (assets.py) إلى .deploy/<target>.dist
+- configure: firebase.json (مع كاش immutable للأصول المبصومة) و .firebaserc
+- upload: تشغيل firebase deploy مع بث مخرجاته سطراً بسطر إلى حالة النشر
+
+الطابور: نشر واحد لكل موقع في نفس الوقت، ومواقع مختلفة بالتوازي حتى max_parallel.
+إذا لم يتغير البيان منذ آخر نشر ناجح لنفس الموقع يُتخطى الرفع (إلا مع force).
+
+أمر firebase قابل للاستبدال (FIREBASE_CLI أو --firebase-cli) للاختبار المحلي:
+    FIREBASE_CLI="python benchmarks/firebase_stub.py" python server.py
+"""
+
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from assets import ASSETS_DIR, IMMUTABLE_CACHE_CONTROL, AssetBuilder
+
+FIREBASE_PROJECT = 'restaurant-system-demo'
+DEPLOY_TIMEOUT = 180  # ثواني
+DEPLOY_PARALLELISM = 2  # مواقع تُنشر في نفس الوقت
+MAX_OUTPUT_CHARS = 64 * 1024  # آخر جزء من مخرجات الأمر في الحالة
+MANIFEST_NAME = '.manifest.json'
+SHARED_DIRS = ('js', 'css')
+ESSENTIAL_FILES = ('login-restaurant.html', 'admin.html', 'cashier.html',
+                   'waiter.html', 'menu.html', 'store.html', 'store-admin.html',
+                   'inventory.html', 'profile.html')
+IGNORED_NAMES = ('firebase.json', '.firebaserc', 'node_modules')
+# معرّف موقع Firebase؛ يُستخدم أيضاً كاسم مجلد التجهيز فلا يُقبل غيره
+SITE_ID_RE = re.compile(r'^[a-z0-9-]{1,63}$')
+# مفتاح النشر بدون site: '_' خارج SITE_ID_RE فلا يتصادم مع موقع حقيقي اسمه default
+DEFAULT_SITE_KEY = '_default'
+
+
+def _ignored(name):
+    return name.startswith('.') or name in IGNORED_NAMES
+
+
+def _walk(root):
+    """المسارات النسبية (بفواصل /) لكل ملف تحت root عدا المتجاهل"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not _ignored(d))
+        for name in sorted(filenames):
+            if not _ignored(name):
+                path = os.path.join(dirpath, name)
+                yield os.path.relpath(path, root).replace(os.sep, '/'), path
+
+
+class HashCache:
+    """sha256 لكل ملف، يُعاد حسابه فقط عند تغيّر (mtime, الحجم)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}  # path -> (mtime_ns, size, digest)
+        self.hashed = 0
+
+    def digest(self, path):
+        st = os.stat(path)
+        with self.lock:
+            entry = self.entries.get(path)
+        if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            return entry[2]
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(block)
+        digest = h.hexdigest()
+        with self.lock:
+            self.entries[path] = (st.st_mtime_ns, st.st_size, digest)
+            self.hashed += 1
+        return digest
+
+
+def firebase_command(cli, *args):
+    """argv لأمر firebase (أو بديله المحلي) مع معاملات"""
+    argv = shlex.split(cli, posix=os.name != 'nt')
+    argv[0] = shutil.which(argv[0]) or argv[0]  # firebase.cmd على ويندوز
+    # الأمر قد يعمل داخل مجلد آخر: مسارات السكربتات النسبية (مثل البديل المحلي) تُثبَّت
+    argv = [os.path.abspath(arg) if os.path.isfile(arg) else arg for arg in argv]
+    return argv + list(args)
+
+
+def manifest_digest(manifest):
+    """بصمة البيان كاملاً (تحدد هل يلزم رفع جديد)"""
+    h = hashlib.sha256()
+    for rel in sorted(manifest):
+        h.update(f'{rel}\0{manifest[rel][1]}\n'.encode('utf-8'))
+    return h.hexdigest()
+
+
+class DeployJob:
+    """حالة نشر واحد؛ تُقرأ كنسخة عبر snapshot()"""
+
+    def __init__(self, site_id, template_id, force=False):
+        self.site_id = site_id
+        self.template_id = template_id or 'current'
+        self.force = force
+        self.lock = threading.Lock()
+        self.state = {
+            'running': True,
+            'queued': True,
+            'success': None,
+            'output': 'في انتظار دوره في طابور النشر...',
+            'siteId': site_id,
+            'templateId': self.template_id,
+            'stage': 'queued',
+            'stages': {},
+            'files': {},
+            'submittedAt': time.time(),
+            'finishedAt': None
+        }
+
+    def update(self, **fields):
+        with self.lock:
+            self.state.update(fields)
+
+    def log(self, line):
+        with self.lock:
+            output = self.state['output'] + line
+            self.state['output'] = output[-MAX_OUTPUT_CHARS:]
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.state, stages=dict(self.state['stages']))
+
+    def stage(self, name):
+        return _StageTimer(self, name)
+
+
+class _StageTimer:
+    def __init__(self, job, name):
+        self.job = job
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self.job.update(stage=self.name)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = round((time.perf_counter() - self.started) * 1000, 1)
+        with self.job.lock:
+            self.job.state['stages'][self.name] = elapsed
+        return False
+
+
+class DeployQueue:
+    def __init__(self, project_dir, firebase_cli=None, max_parallel=DEPLOY_PARALLELISM,
+                 timeout=DEPLOY_TIMEOUT, project=FIREBASE_PROJECT, stage_root=None, bundle=True):
+        self.project_dir = project_dir
+        self.firebase_cli = firebase_cli or os.environ.get('FIREBASE_CLI') or 'firebase'
+        self.timeout = timeout
+        self.project = project
+        self.stage_root = stage_root or os.path.join(project_dir, '.deploy')
+        self.hashes = HashCache()
+        self.bundle = bundle
+        self.builders = {}  # site key -> AssetBuilder (مجلد dist لكل موقع)
+        self.executor = ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix='deploy')
+        self.max_parallel = max_parallel
+        self.lock = threading.Lock()
+        self.jobs = {}  # site key -> DeployJob (آخر نشر لكل موقع)
+        self.last = None  # آخر نشر مُرسل (توافق مع /api/deploy/status بدون site)
+        self.deployed = {}  # site key -> بصمة آخر بيان نُشر بنجاح
+        self.completed = 0
+        self.skipped = 0
+
+    # ------------------------------------------
+    # الطابور
+    # ------------------------------------------
+    def submit(self, site_id=None, template_id=None, force=False):
+        """إضافة نشر للطابور؛ تُرجع (job, None) أو (None, رسالة خطأ)"""
+        if site_id and (not isinstance(site_id, str) or not SITE_ID_RE.match(site_id)):
+            return None, 'معرّف الموقع غير صالح (a-z و 0-9 و - فقط)'
+        if template_id not in (None, '', 'current') and self._template_path(template_id) is None:
+            return None, 'معرّف القالب غير صالح'
+        key = site_id or DEFAULT_SITE_KEY
+        with self.lock:
+            current = self.jobs.get(key)
+            if current is not None and current.snapshot()['running']:
+                return None, 'النشر قيد التنفيذ حالياً لهذا الموقع'
+            job = DeployJob(site_id, template_id, force)
+            self.jobs[key] = job
+            self.last = job
+        self.executor.submit(self.run, job)
+        return job, None
+
+    def status(self, site_id=None):
+        with self.lock:
+            job = self.jobs.get(site_id) if site_id else self.last
+        if job is None:
+            return {'running': False, 'output': '', 'success': None}
+        return job.snapshot()
+
+    def all_status(self):
+        with self.lock:
+            jobs = dict(self.jobs)
+        return {key: job.snapshot() for key, job in jobs.items()}
+
+    # ------------------------------------------
+    # المراحل
+    # ------------------------------------------
+    def run(self, job):
+        key = job.site_id or DEFAULT_SITE_KEY
+        job.update(queued=False, output='')
+        started = time.perf_counter()
+        try:
+            template_dir = self.template_dir(job.template_id)
+            if template_dir is None:
+                # القالب الحالي: المشروع نفسه بإعدادات firebase.json الموجودة
+                public_dir = self.project_dir
+            else:
+                with job.stage('manifest'):
+                    manifest = self.build_manifest(template_dir)
+                    digest = manifest_digest(manifest)
+                    job.log(f'📋 البيان: {len(manifest)} ملف\n')
+                with job.stage('stage'):
+                    public_dir, copied, removed = self.stage(key, manifest)
+                    job.update(files={'total': len(manifest), 'copied': copied, 'removed': removed})
+                    job.log(f'📦 التجهيز: نسخ {copied} ملف متغير، حذف {removed}\n')
+                if self.bundle:
+                    with job.stage('build'):
+                        public_dir = self.build(key, public_dir)
+                        stats = self.builders[key].get_stats()
+                        job.log(f"🧱 البناء: {stats['bundles']} ملف مدمج، "
+                                f"{stats['bytes_in']} → {stats['bytes_out']} بايت\n")
+                if not job.force and self.deployed.get(key) == digest:
+                    self.skipped += 1
+                    self._finish(job, started, True, 'لا توجد تغييرات منذ آخر نشر ناجح؛ تم تخطي الرفع\n')
+                    return
+                with job.stage('configure'):
+                    self.configure(public_dir, job.site_id)
+
+            with job.stage('upload'):
+                success = self.upload(job, public_dir)
+            if success and template_dir is not None:
+                self.deployed[key] = digest
+            self._finish(job, started, success)
+        except subprocess.TimeoutExpired:
+            self._finish(job, started, False, f'انتهت مهلة النشر (أكثر من {self.timeout // 60} دقائق)\n')
+        except Exception as e:
+            self._finish(job, started, False, f'خطأ: {e}\n')
+
+    def _finish(self, job, started, success, message=None):
+        if message:
+            job.log(message)
+        with job.lock:
+            job.state['stages']['total'] = round((time.perf_counter() - started) * 1000, 1)
+        job.update(running=False, success=success, stage='done', finishedAt=time.time())
+        self.completed += 1
+
+    def _template_path(self, template_id):
+        """مسار القالب داخل templates/ فقط؛ None لأي معرّف يخرج منه (.. أو مسار مطلق)"""
+        if not isinstance(template_id, str):
+            return None
+        root = os.path.realpath(os.path.join(self.project_dir, 'templates'))
+        path = os.path.realpath(os.path.join(root, template_id))
+        if os.path.dirname(path) != root:
+            return None
+        return path
+
+    def template_dir(self, template_id):
+        if not template_id or template_id == 'current':
+            return None
+        path = self._template_path(template_id)
+        return path if path is not None and os.path.isdir(path) else None
+
+    def build_manifest(self, template_dir):
+        """rel -> (مسار المصدر, sha256): ملفات القالب أولاً ثم المشتركة إن غابت عنه"""
+        manifest = {}
+        for rel, path in _walk(template_dir):
+            manifest[rel] = (path, self.hashes.digest(path))
+        for shared in SHARED_DIRS:
+            src = os.path.join(self.project_dir, shared)
+            if not os.path.isdir(src) or os.path.isdir(os.path.join(template_dir, shared)):
+                continue
+            for rel, path in _walk(src):
+                manifest[f'{shared}/{rel}'] = (path, self.hashes.digest(path))
+        for name in ESSENTIAL_FILES:
+            path = os.path.join(self.project_dir, name)
+            if name not in manifest and os.path.isfile(path):
+                manifest[name] = (path, self.hashes.digest(path))
+        return manifest
+
+    def stage(self, key, manifest):
+        """مزامنة مجلد التجهيز مع البيان؛ تُرجع (المجلد, منسوخ, محذوف)"""
+        if key != DEFAULT_SITE_KEY and not SITE_ID_RE.match(key):
+            raise ValueError(f'invalid stage key: {key!r}')
+        stage_dir = os.path.join(self.stage_root, key)
+        manifest_path = os.path.join(stage_dir, MANIFEST_NAME)
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                staged = json.load(f)
+        except (OSError, ValueError):
+            staged = {}
+
+        copied = 0
+        for rel, (src, digest) in manifest.items():
+            dest = os.path.join(stage_dir, *rel.split('/'))
+            if staged.get(rel) == digest and os.path.exists(dest):
+                continue
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            shutil.copy2(src, dest)
+            copied += 1
+        removed = 0
+        for rel in staged:
+            if rel not in manifest:
+                try:
+                    os.remove(os.path.join(stage_dir, *rel.split('/')))
+                    removed += 1
+                except OSError:
+                    pass
+
+        os.makedirs(stage_dir, exist_ok=True)
+        temp_file = manifest_path + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({rel: digest for rel, (_, digest) in manifest.items()}, f)
+        os.replace(temp_file, manifest_path)
+        return stage_dir, copied, removed
+
+    def build(self, key, stage_dir):
+        builder = self.builders.get(key)
+        if builder is None:
+            builder = self.builders[key] = AssetBuilder(stage_dir, stage_dir + '.dist', copy_all=True)
+        return builder.build()
+
+    def configure(self, public_dir, site_id):
+        target_name = site_id if site_id else 'default-site'
+        firebase_config = {
+            "hosting": {
+                "target": target_name,
+                "public": ".",
+                "ignore": ["firebase.json", ".firebaserc", "**/.*", "**/node_modules/**"],
+                "rewrites": [{"source": "**", "destination": "/index.html"}],
+                "headers": [
+                    {"source": f"/{ASSETS_DIR}/**",
+                     "headers": [{"key": "Cache-Control", "value": IMMUTABLE_CACHE_CONTROL}]},
+                    {"source": "**/*.html", "headers": [{"key": "Cache-Control", "value": "no-cache"}]}
+                ]
+            }
+        }
+        with open(os.path.join(public_dir, 'firebase.json'), 'w', encoding='utf-8') as f:
+            json.dump(firebase_config, f, ensure_ascii=False, indent=2)
+        firebaserc_config = {
+            "projects": {"default": self.project},
+            "targets": {self.project: {"hosting": {target_name: [site_id if site_id else self.project]}}}
+        }
+        with open(os.path.join(public_dir, '.firebaserc'), 'w', encoding='utf-8') as f:
+            json.dump(firebaserc_config, f, ensure_ascii=False, indent=2)
+
+    def command(self, site_id):
+        only = f'hosting:{site_id}' if site_id else 'hosting'
+        return firebase_command(self.firebase_cli, 'deploy', '--only', only, '--project', self.project)
+
+    def upload(self, job, public_dir):
+        """تشغيل firebase deploy وبث مخرجاته إلى حالة النشر"""
+        process = subprocess.Popen(
+            self.command(job.site_id),
+            cwd=public_dir,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding='utf-8',
+            errors='replace'
+        )
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            process.kill()
+
+        timer = threading.Timer(self.timeout, kill)
+        timer.start()
+        try:
+            for line in process.stdout:
+                job.log(line)
+            process.wait()
+        finally:
+            timer.cancel()
+            process.stdout.close()
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(self.command(job.site_id), self.timeout)
+        return process.returncode == 0
+
+    def get_stats(self):
+        return {
+            'max_parallel': self.max_parallel,
+            'running': sum(1 for s in self.all_status().values() if s['running']),
+            'completed': self.completed,
+            'skipped_unchanged': self.skipped,
+            'hashed_files': self.hashes.hashed,
+            'firebase_cli': self.firebase_cli
+        }
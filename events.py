@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+قناة دفع الأحداث (Server-Sent Events) لتغييرات الطلبات والطاولات
+
+- خيط واحد بـ selectors يخدم كل الاتصالات المفتوحة (لا خيط لكل اتصال)
+- حلقة إعادة تشغيل محدودة (ring buffer) لدعم الاستئناف عبر Last-Event-ID
+- نبضات (heartbeat) دورية لإبقاء الاتصال حياً عبر الـ proxy
+- العميل البطيء الذي يتجاوز حد الذاكرة المؤقتة يُفصل
+"""
+
+import json
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+
+REPLAY_SIZE = 1000  # عدد الأحداث المحفوظة للاستئناف
+HEARTBEAT_INTERVAL = 15  # ثواني
+MAX_CLIENT_BUFFER = 512 * 1024  # حد البيانات المعلقة لكل عميل
+
+# أنواع التعديلات في السجل -> أنواع الأحداث
+CHANGE_EVENTS = {
+    'order.create': ('order-created', 'order'),
+    'order.update': ('order-status-changed', 'order'),
+    'order.delete': ('order-deleted', 'id'),
+    'table.update': ('table-updated', 'table'),
+    'tables.set': ('tables-reset', 'tables'),
+}
+
+
+def encode_event(event_id, event_type, data):
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return f'id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n'.encode('utf-8')
+
+
+class EventBroker:
+    def __init__(self, replay_size=REPLAY_SIZE, heartbeat=HEARTBEAT_INTERVAL,
+                 max_buffer=MAX_CLIENT_BUFFER):
+        self.heartbeat = heartbeat
+        self.max_buffer = max_buffer
+        self.lock = threading.Lock()
+        self.last_id = 0
+        self.published = 0
+        self.dropped = 0
+        self._ring = deque(maxlen=replay_size)  # (id, frame)
+        self._clients = {}  # socket -> bytearray
+        self._listeners = {}  # token -> write(frame) للمشتركين غير القائمين على socket
+        self._pending = []  # اشتراكات جديدة بانتظار خيط الحلقة
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+        self._thread = None
+
+    # ------------------------------------------
+    # النشر
+    # ------------------------------------------
+    def publish(self, event_type, data):
+        with self.lock:
+            self.last_id += 1
+            self.published += 1
+            frame = encode_event(self.last_id, event_type, data)
+            self._ring.append((self.last_id, frame))
+            for buf in self._clients.values():
+                buf += frame
+            for write in self._listeners.values():
+                write(frame)
+        self._wake()
+
+    def publish_changes(self, changes, version=None):
+        """تحويل تعديلات السجل إلى أحداث مطبوعة"""
+        for change in changes:
+            mapping = CHANGE_EVENTS.get(change.get('op'))
+            if not mapping:
+                continue
+            event_type, key = mapping
+            self.publish(event_type, {'version': version, key: change.get(key)})
+
+    # ------------------------------------------
+    # الاشتراك
+    # ------------------------------------------
+    def _initial_frames(self, last_event_id):
+        """بداية البث: مهلة إعادة الاتصال + الأحداث التي فاتت العميل (تحت القفل)"""
+        buf = bytearray(b'retry: 3000\n\n')
+        if last_event_id is not None:
+            oldest = self._ring[0][0] if self._ring else self.last_id + 1
+            if last_event_id < oldest - 1 or last_event_id > self.last_id:
+                # فاتت العميل أحداث لم تعد محفوظة - يجب أن يعيد التحميل كاملاً
+                buf += encode_event(self.last_id, 'reset', {'lastEventId': self.last_id})
+            else:
+                for event_id, frame in self._ring:
+                    if event_id > last_event_id:
+                        buf += frame
+        return buf
+
+    def subscribe(self, sock, last_event_id=None):
+        """تسليم اتصال أُرسلت ترويساته إلى خيط الأحداث مع إعادة ما فات العميل"""
+        with self.lock:
+            self._pending.append((sock, self._initial_frames(last_event_id)))
+            self._start()
+        self._wake()
+
+    def add_listener(self, write, last_event_id=None):
+        """مشترك يكتب بنفسه (مثل اتصالات asyncio)؛ write(frame) يجب ألا تحجب"""
+        token = object()
+        with self.lock:
+            write(bytes(self._initial_frames(last_event_id)))
+            self._listeners[token] = write
+            self._start()
+        return token
+
+    def remove_listener(self, token):
+        with self.lock:
+            if self._listeners.pop(token, None) is not None:
+                self.dropped += 1
+
+    def after_fork(self):
+        """في العملية العاملة بعد fork: قناة إيقاظ ومحدد خاصان بها
+
+        النسخ الموروثة تشير لنفس ملفات المالك والعمال الآخرين، فإشارات الإيقاظ
+        ستضيع بينهم.
+        """
+        for resource in (self._selector, self._wake_r, self._wake_w):
+            try:
+                resource.close()
+            except OSError:
+                pass
+        self.lock = threading.Lock()
+        self._clients = {}
+        self._listeners = {}
+        self._pending = []
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+        self._thread = None
+
+    def client_count(self):
+        return len(self._clients) + len(self._listeners)
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='sse-broker', daemon=True)
+            self._thread.start()
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass  # إشارة الإيقاظ معلقة مسبقاً
+
+    # ------------------------------------------
+    # حلقة الإرسال
+    # ------------------------------------------
+    def _run(self):
+        last_heartbeat = time.monotonic()
+        while True:
+            with self.lock:
+                for sock, buf in self._pending:
+                    sock.setblocking(False)
+                    self._clients[sock] = buf
+                    self._selector.register(sock, selectors.EVENT_READ)
+                self._pending = []
+                overflowed = [sock for sock, buf in self._clients.items() if len(buf) > self.max_buffer]
+            for sock in overflowed:
+                self._drop(sock)
+            with self.lock:
+                for sock, buf in self._clients.items():
+                    mask = selectors.EVENT_READ | (selectors.EVENT_WRITE if buf else 0)
+                    self._selector.modify(sock, mask)
+
+            for key, mask in self._selector.select(timeout=self.heartbeat):
+                sock = key.fileobj
+                if sock is self._wake_r:
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except (BlockingIOError, OSError):
+                        pass
+                    continue
+                if mask & selectors.EVENT_READ:
+                    # العميل لا يرسل شيئاً؛ القراءة تعني الإغلاق
+                    try:
+                        if not sock.recv(4096):
+                            self._drop(sock)
+                            continue
+                    except BlockingIOError:
+                        pass
+                    except OSError:
+                        self._drop(sock)
+                        continue
+                if mask & selectors.EVENT_WRITE:
+                    self._flush(sock)
+
+            now = time.monotonic()
+            if now - last_heartbeat >= self.heartbeat:
+                last_heartbeat = now
+                with self.lock:
+                    for buf in self._clients.values():
+                        buf += b': heartbeat\n\n'
+                    for write in self._listeners.values():
+                        write(b': heartbeat\n\n')
+
+    def _flush(self, sock):
+        with self.lock:
+            buf = self._clients.get(sock)
+            if buf is None:
+                return
+            sent = 0
+            try:
+                sent = sock.send(buf)
+                del buf[:sent]
+            except BlockingIOError:
+                pass
+            except OSError:
+                sent = None
+            overflow = len(buf) > self.max_buffer
+        if sent is None or overflow:
+            self._drop(sock)
+
+    def _drop(self, sock):
+        with self.lock:
+            if self._clients.pop(sock, None) is None:
+                return
+            self.dropped += 1
+        try:
+            self._selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    def get_stats(self):
+        return {
+            'clients': self.client_count(),
+            'last_event_id': self.last_id,
+            'published': self.published,
+            'dropped': self.dropped,
+            'replay_size': len(self._ring)
+        }
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+محرك تخزين بسجل كتابة مسبقة (Write-Ahead Journal) لبيانات المطعم
+
+- كل تعديل يُضاف كسطر JSON مضغوط واحد إلى ملف السجل بدلاً من إعادة كتابة الملف كاملاً
+- لقطة (snapshot) مضغوطة تُكتب في الخلفية بنفس صيغة restaurant_data.json الحالية
+- عند بدء التشغيل: قراءة اللقطة ثم إعادة تشغيل السجل فوقها
+- تجميع الكتابات (group commit): كل التعديلات التي تصل خلال نافذة قصيرة تُكتب
+  بعملية write + fsync واحدة بدلاً من كتابة لكل طلب (انظر storage.StorageBackend)
+"""
+
+import json
+import os
+import threading
+import time
+
+from storage import COMMIT_WINDOW, DURABILITY_MODES, StorageBackend  # noqa: F401
+
+JOURNAL_SUFFIX = '.journal'
+COMPACT_EVERY = 500  # عدد السجلات قبل ضغط السجل في لقطة جديدة
+COMPACT_INTERVAL = 60  # أقصى مدة (ثواني) قبل الضغط إذا وُجدت سجلات
+
+
+def default_data(table_count=10):
+    """البيانات الافتراضية عند عدم وجود ملف"""
+    return {
+        'orders': [],
+        'tables': [{'id': i, 'status': 'available', 'currentOrder': None} for i in range(1, table_count + 1)]
+    }
+
+
+def encode_record(change):
+    """ترميز تعديل واحد كسطر JSON مضغوط"""
+    return json.dumps(change, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def replay(data, changes):
+    """تطبيق قائمة تعديلات على البيانات - O(الطلبات + التعديلات)
+
+    أنواع التعديلات:
+      order.create / order.update  -> {'order': {...}} الحالة الكاملة للطلب
+      order.delete                 -> {'id': ...} (+ archived=True إذا نُقل للأرشيف)
+      table.update                 -> {'table': {...}} الحالة الكاملة للطاولة
+      tables.set                   -> {'tables': [...]}
+    """
+    # الطلبات مخزنة الأحدث أولاً؛ نبني فهرساً مرتباً من الأقدم للأحدث
+    orders = {}
+    for order in reversed(data.get('orders', [])):
+        orders[order.get('id')] = order
+    tables = {t.get('id'): t for t in data.get('tables', [])}
+
+    for change in changes:
+        op = change.get('op')
+        if op in ('order.create', 'order.update'):
+            order = change['order']
+            orders[order.get('id')] = order
+        elif op == 'order.delete':
+            orders.pop(change.get('id'), None)
+        elif op == 'table.update':
+            table = change['table']
+            tables[table.get('id')] = table
+        elif op == 'tables.set':
+            tables = {t.get('id'): t for t in change.get('tables', [])}
+
+    data['orders'] = list(reversed(list(orders.values())))
+    data['tables'] = list(tables.values())
+    return data
+
+
+def read_records(path):
+    """قراءة سجلات ملف السجل مع تجاهل السطر الأخير المقطوع (كتابة غير مكتملة)"""
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                print(f'⚠️ تجاهل سجل تالف في {path}')
+    return records
+
+
+def read_snapshot(path, default_factory=default_data):
+    """قراءة ملف اللقطة فقط (أو البيانات الافتراضية)"""
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f'⚠️ خطأ في قراءة البيانات: {e}')
+    return default_factory()
+
+
+def _file_ids(paths):
+    ids = []
+    for path in paths:
+        try:
+            ids.append(os.stat(path).st_ino)
+        except OSError:
+            ids.append(None)
+    return ids
+
+
+def read_data(path, default_factory=default_data, attempts=5):
+    """قراءة فقط: اللقطة + السجل الحالي والمُدوَّر دون فتح OrderJournal
+
+    آمنة أثناء عمل السيرفر (التقارير، الاستيراد، إعادة بناء التحليلات)؛ لا تكتب
+    ولا تضغط ولا تحذف أي ملف. إذا دُوِّر السجل أو استُبدلت اللقطة أثناء القراءة
+    تُعاد القراءة (الإضافة في نهاية السجل لا تضر: نقرأ بادئة متسقة منه).
+    """
+    journal_path = path + JOURNAL_SUFFIX
+    paths = (path, journal_path + '.old', journal_path)
+    for attempt in range(attempts):
+        before = _file_ids(paths)
+        try:
+            records = read_records(paths[1]) + read_records(paths[2])
+        except FileNotFoundError:
+            continue  # الجزء المُدوَّر حُذف بين الفحص والفتح
+        data = read_snapshot(path, default_factory)
+        if _file_ids(paths) == before or attempt == attempts - 1:
+            return replay(data, records)
+    return read_snapshot(path, default_factory)
+
+
+def write_snapshot_file(path, data):
+    """كتابة آمنة للقطة - ملف مؤقت أولاً ثم استبدال ذري"""
+    temp_file = path + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_file, path)
+
+
+class OrderJournal(StorageBackend):
+    """سجل كتابة مسبقة مع لقطات دورية في الخلفية (خلفية json)"""
+
+    name = 'json'
+
+    def __init__(self, path, compact_every=COMPACT_EVERY, compact_interval=COMPACT_INTERVAL,
+                 default_factory=default_data, durability='batched', commit_window=COMMIT_WINDOW):
+        super().__init__(durability, commit_window)
+        self.path = path
+        self.journal_path = path + JOURNAL_SUFFIX
+        # الجزء المُدوَّر الذي ينتظر الدمج في اللقطة
+        self.segment_path = self.journal_path + '.old'
+        self.compact_every = compact_every
+        self.compact_interval = compact_interval
+        self.default_factory = default_factory
+        self.compact_lock = threading.Lock()  # ضغط واحد في كل مرة
+        self.pending = 0  # عدد السجلات منذ آخر لقطة
+        self.last_compact = time.time()
+        self.compactions = 0
+        self._file = None
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    # ------------------------------------------
+    # التحميل
+    # ------------------------------------------
+    def _read_snapshot(self):
+        return read_snapshot(self.path, self.default_factory)
+
+    def load(self):
+        """قراءة اللقطة + إعادة تشغيل السجل، وبدء الضغط في الخلفية"""
+        with self.lock:
+            data = self._read_snapshot()
+            records = read_records(self.segment_path) + read_records(self.journal_path)
+            if records:
+                replay(data, records)
+            self.pending = len(records)
+            self.loaded = True
+            self._start()
+        return data
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='journal-compactor', daemon=True)
+            self._thread.start()
+
+    # ------------------------------------------
+    # الكتابة
+    # ------------------------------------------
+    def _encode(self, changes):
+        return ''.join(encode_record(c) for c in changes)
+
+    def _write_locked(self, batch):
+        """إضافة السجلات في نهاية ملف السجل بعملية write + fsync واحدة
+
+        عند الفشل يُقص الملف لطوله قبل الدفعة: سطر مقطوع في المنتصف كان سيلتصق
+        به السجل التالي فيضيع الاثنان عند إعادة التشغيل.
+        """
+        if self._file is None:
+            self._file = open(self.journal_path, 'a', encoding='utf-8')
+        start = self._file.tell()
+        try:
+            self._file.write(''.join(batch))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except BaseException:
+            self._discard_tail_locked(start)
+            raise
+
+    def _discard_tail_locked(self, size):
+        """إغلاق ملف السجل وقص ما كُتب بعد size (الملف يُفتح من جديد مع الدفعة التالية)"""
+        file, self._file = self._file, None
+        try:
+            file.close()
+        except (IOError, OSError):
+            pass  # البيانات المخزنة في الذاكرة لم تُكتب أصلاً
+        try:
+            os.truncate(self.journal_path, size)
+        except (IOError, OSError) as e:
+            print(f'⚠️ تعذر قص السجل بعد كتابة فاشلة: {e}')
+
+    def _after_write(self, records):
+        self.pending += records
+        if self.pending >= self.compact_every:
+            self._wakeup.set()
+
+    def write_snapshot(self, data):
+        """كتابة لقطة كاملة فوراً (للتعديلات غير القابلة للتسجيل) وتفريغ السجل"""
+        with self.compact_lock, self.lock:
+            # السجلات المنتظرة أقدم من اللقطة: تُكتب ثم تُحذف مع السجل فيُحرَّر من ينتظرها
+            self._drain_locked()
+            write_snapshot_file(self.path, data)
+            self._truncate_locked()
+            if os.path.exists(self.segment_path):
+                os.remove(self.segment_path)
+            self.pending = 0
+            self.last_compact = time.time()
+
+    def _truncate_locked(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+    # ------------------------------------------
+    # الضغط في الخلفية
+    # ------------------------------------------
+    def compact(self):
+        """دمج السجل في لقطة جديدة دون حجز البيانات الحية
+
+        تحت القفل نقوم فقط بتدوير ملف السجل (O(1))، ثم نبني اللقطة من
+        اللقطة السابقة على القرص + الجزء المُدوَّر خارج القفل.
+        """
+        with self.compact_lock:
+            with self.lock:
+                self._drain_locked()
+                if not os.path.exists(self.segment_path):
+                    if not self.pending:
+                        return False
+                    if self._file is not None:
+                        self._file.close()
+                        self._file = None
+                    if os.path.exists(self.journal_path):
+                        os.replace(self.journal_path, self.segment_path)
+                    self.pending = 0
+                    if not os.path.exists(self.segment_path):
+                        return False
+
+            records = read_records(self.segment_path)
+            data = replay(self._read_snapshot(), records)
+            write_snapshot_file(self.path, data)
+            os.remove(self.segment_path)
+            self.last_compact = time.time()
+            self.compactions += 1
+            return True
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(timeout=self.compact_interval)
+            self._wakeup.clear()
+            if self._stopped:
+                break
+            due = time.time() - self.last_compact >= self.compact_interval
+            if self.pending >= self.compact_every or (due and self.pending):
+                try:
+                    self.compact()
+                except (IOError, OSError) as e:
+                    print(f'⚠️ خطأ في ضغط السجل: {e}')
+
+    def close(self):
+        """إيقاف الضغط في الخلفية وكتابة لقطة نهائية"""
+        self._stop_flusher()
+        self._wakeup.set()
+        if self.loaded:
+            try:
+                self.compact()
+            except (IOError, OSError) as e:
+                print(f'⚠️ خطأ في ضغط السجل: {e}')
+        with self.lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def get_stats(self):
+        stats = super().get_stats()
+        stats.update({
+            'pending_records': self.pending,
+            'compactions': self.compactions,
+            'last_compact': self.last_compact
+        })
+        return stats
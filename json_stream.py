@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+ترميز JSON متدفق للردود الكبيرة
+
+- الحاويات الخارجية (dict/list/tuple) تُمشى تدريجياً وكل عنصر يُرمَّز بالمرمّز
+  السريع (C)، والأجزاء تُجمع في قطع بحجم ثابت بدلاً من بناء الرد كاملاً في الذاكرة
+- ضغط gzip متدفق عبر zlib.compressobj (نفس الصيغة التي يفهمها المتصفح)
+- إطار chunked transfer encoding لـ HTTP/1.1؛ أو جسم ينتهي بإغلاق الاتصال لـ HTTP/1.0
+- ذاكرة كل طلب محدودة بحجم القطعة + نافذة الضغط مهما كبرت البيانات
+"""
+
+import json
+import zlib
+
+CHUNK_SIZE = 64 * 1024
+GZIP_LEVEL = 6
+
+_encode = json.JSONEncoder(ensure_ascii=False).encode  # المرمّز السريع (C)
+
+
+def _iter_parts(obj, depth):
+    """أجزاء نصية لـ obj؛ الحاويات حتى العمق depth تُفكك، وما دونها يُرمَّز دفعة واحدة"""
+    if depth and isinstance(obj, dict):
+        yield '{'
+        for i, (key, value) in enumerate(obj.items()):
+            yield (',' if i else '') + _encode(str(key)) + ':'
+            yield from _iter_parts(value, depth - 1)
+        yield '}'
+    elif depth and isinstance(obj, (list, tuple)):
+        yield '['
+        for i, item in enumerate(obj):
+            if i:
+                yield ','
+            yield from _iter_parts(item, depth - 1)
+        yield ']'
+    else:
+        yield _encode(obj)
+
+
+def _collect(parts, chunk_size):
+    buffer = []
+    size = 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def iter_json(obj, chunk_size=CHUNK_SIZE, depth=2):
+    """ترميز obj إلى قطع بايتات بحجم chunk_size تقريباً
+
+    depth=2 يكفي لـ {'orders': [...], 'tables': [...]}: كل طلب يُرمَّز وحده.
+    """
+    return _collect(_iter_parts(obj, depth), chunk_size)
+
+
+def iter_json_array(items, chunk_size=CHUNK_SIZE):
+    """ترميز مولّد عناصر كمصفوفة JSON دون جمعها (مثل الطلبات المؤرشفة)"""
+    def parts():
+        yield '['
+        for i, item in enumerate(items):
+            yield (',' if i else '') + _encode(item)
+        yield ']'
+    return _collect(parts(), chunk_size)
+
+
+def gzip_chunks(chunks, level=GZIP_LEVEL):
+    """ضغط gzip متدفق: قطعة مضغوطة لكل قطعة دخل (إن أنتج الضاغط شيئاً)"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def write_chunked(wfile, chunks):
+    """كتابة القطع بإطار Transfer-Encoding: chunked؛ تُرجع عدد بايتات الجسم"""
+    total = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+        total += len(chunk)
+    wfile.write(b'0\r\n\r\n')
+    return total
+
+
+def write_plain(wfile, chunks):
+    """كتابة القطع كما هي (الجسم ينتهي بإغلاق الاتصال)"""
+    total = 0
+    for chunk in chunks:
+        if chunk:
+            wfile.write(chunk)
+            total += len(chunk)
+    return total
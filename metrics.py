@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+قياسات بصيغة Prometheus النصية بعدّادات لكل خيط
+
+- كل خيط يكتب في عدّاداته الخاصة فقط (threading.local): لا أقفال في مسار الطلب
+- /metrics يدمج عدّادات كل الخيوط عند القراءة؛ عدّادات الخيوط المنتهية تُطوى
+  في مجموع "متقاعد" حتى لا تضيع ولا تتراكم
+- ثلاثة أنواع: counter (inc)، histogram (observe) بحدود ثابتة، و gauge تُحسب
+  عند القراءة من دالة مسجلة (أو مجموع inc/dec لكل خيط مثل الطلبات الجارية)
+- InstrumentedLock: زمن انتظار وحجز قفل (الاستدعاء الخارجي فقط في RLock)
+"""
+
+import threading
+import time
+import weakref
+from bisect import bisect_left
+
+# حدود المدرّجات بالثواني (من 0.5ms إلى 10s)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _ThreadStats:
+    __slots__ = ('counters', 'histograms', '__weakref__')
+
+    def __init__(self):
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [bucket counts..., +Inf, sum]
+
+
+def _merge(target, source):
+    for key, value in source.counters.items():
+        target.counters[key] = target.counters.get(key, 0) + value
+    for key, values in source.histograms.items():
+        current = target.histograms.get(key)
+        if current is None:
+            target.histograms[key] = list(values)
+        else:
+            for i, v in enumerate(values):
+                current[i] += v
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels)
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+               for k, v in pairs)
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value) if value != int(value) or abs(value) >= 1e15 else str(int(value))
+    return str(value)
+
+
+class Metrics:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._lock = threading.Lock()  # تسجيل الخيوط والقراءة فقط
+        self._threads = []  # (weakref للخيط, _ThreadStats)
+        self._retired = _ThreadStats()
+        self._help = {}  # name -> (type, help)
+        self._gauges = {}  # name -> fn() -> value أو {labels: value}
+
+    # ------------------------------------------
+    # التعريف
+    # ------------------------------------------
+    def counter(self, name, help_text):
+        self._help[name] = ('counter', help_text)
+
+    def histogram(self, name, help_text):
+        self._help[name] = ('histogram', help_text)
+
+    def gauge(self, name, help_text, fn=None):
+        """fn=None: القيمة مجموع inc() من كل الخيوط (زيادة ونقصان)"""
+        self._help[name] = ('gauge', help_text)
+        self._gauges[name] = fn
+
+    def reset(self):
+        """تصفير كل العدّادات (في العملية العاملة بعد fork: لا تُحسب أرقام المالك)"""
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._retired = _ThreadStats()
+
+    # ------------------------------------------
+    # التسجيل (مسار الطلب: بدون أقفال)
+    # ------------------------------------------
+    def _stats(self):
+        try:
+            return self._local.stats
+        except AttributeError:
+            stats = self._local.stats = _ThreadStats()
+            with self._lock:
+                self._threads.append((weakref.ref(threading.current_thread()), stats))
+            return stats
+
+    def inc(self, name, labels=(), amount=1):
+        counters = self._stats().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        histograms = self._stats().histograms
+        key = (name, labels)
+        values = histograms.get(key)
+        if values is None:
+            values = histograms[key] = [0] * (len(self.buckets) + 2)
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    # ------------------------------------------
+    # القراءة
+    # ------------------------------------------
+    def collect(self):
+        """دمج عدّادات كل الخيوط (الخيوط المنتهية تُطوى في المجموع المتقاعد)"""
+        merged = _ThreadStats()
+        with self._lock:
+            alive = []
+            for ref, stats in self._threads:
+                thread = ref()
+                if thread is None or not thread.is_alive():
+                    _merge(self._retired, stats)
+                else:
+                    alive.append((ref, stats))
+            self._threads = alive
+            _merge(merged, self._retired)
+            for _, stats in alive:
+                # قراءة أثناء الكتابة من الخيط المالك: نسخة القاموس تكفي (القيم أرقام)
+                snapshot = _ThreadStats()
+                snapshot.counters = dict(stats.counters)
+                snapshot.histograms = {k: list(v) for k, v in list(stats.histograms.items())}
+                _merge(merged, snapshot)
+        return merged
+
+    def render(self):
+        merged = self.collect()
+        by_name = {}
+        for (name, labels), value in merged.counters.items():
+            by_name.setdefault(name, []).append((labels, value))
+        hist_by_name = {}
+        for (name, labels), values in merged.histograms.items():
+            hist_by_name.setdefault(name, []).append((labels, values))
+
+        lines = []
+        for name, (kind, help_text) in self._help.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind == 'counter' or (kind == 'gauge' and self._gauges.get(name) is None):
+                for labels, value in sorted(by_name.get(name, ()), key=lambda item: item[0]):
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+            elif kind == 'histogram':
+                for labels, values in sorted(hist_by_name.get(name, ()), key=lambda item: item[0]):
+                    cumulative = 0
+                    for bound, count in zip(self.buckets + (float('inf'),), values):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append(f'{name}_bucket{_format_labels(labels, ("le", le))} {cumulative}')
+                    lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(values[-1])}')
+                    lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+            else:
+                try:
+                    value = self._gauges[name]()
+                except Exception:
+                    continue
+                items = value.items() if isinstance(value, dict) else [((), value)]
+                for labels, v in items:
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(v)}')
+        return '\n'.join(lines) + '\n'
+
+
+class InstrumentedLock:
+    """غلاف لقفل (Lock/RLock) يسجل زمن الانتظار والحجز للاستدعاء الخارجي"""
+
+    def __init__(self, lock, metrics, name):
+        self._lock = lock
+        self._metrics = metrics
+        self._labels = (('lock', name),)
+        self._local = threading.local()
+
+    def acquire(self, blocking=True, timeout=-1):
+        started = time.perf_counter()
+        acquired = self._lock.acquire(blocking, timeout)
+        if acquired:
+            depth = getattr(self._local, 'depth', 0)
+            if depth == 0:
+                now = time.perf_counter()
+                self._metrics.observe('lock_wait_seconds', self._labels, now - started)
+                self._local.acquired_at = now
+            self._local.depth = depth + 1
+        return acquired
+
+    def release(self):
+        depth = self._local.depth - 1
+        self._local.depth = depth
+        if depth == 0:
+            self._metrics.observe('lock_hold_seconds', self._labels,
+                                  time.perf_counter() - self._local.acquired_at)
+        self._lock.release()
+
+    __enter__ = acquire
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
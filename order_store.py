@@ -0,0 +1,578 @@
+#!/usr/bin/env python3
+"""
+مخزن الطلبات والطاولات في الذاكرة مع فهارس
+
+- فهرس حسب رقم الطلب، حسب الطاولة (tableId) وحسب الحالة (status)
+- يحافظ على ترتيب الإدخال لإرجاع الطلبات الأحدث أولاً كما في /api/orders
+- البحث وتغيير الحالة والحذف بتكلفة O(1)
+- كل عملية تُرجع قائمة التعديلات بصيغة السجل (journal) لحفظها
+- عدّاد تغييرات (version) لإرجاع ما تغيّر فقط منذ إصدار معيّن (since)
+- ترقيم صفحات بمؤشر (cursor) ثابت حتى مع إضافة أو حذف طلبات
+- نسخ عند الكتابة (copy-on-write): الطلب/الطاولة المنشورة لا تُعدَّل أبداً،
+  فالقارئ يحصل على لقطة ثابتة دون نسخ عميق
+- معاملات (transactions) بأقفال لكل طلب/طاولة بدلاً من قفل عام للكتّاب،
+  ومقارنة الإصدار (compare-and-swap) لمنع فقدان التحديثات
+"""
+
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import datetime, timezone
+
+MAX_TOMBSTONES = 5000  # عدد الطلبات المحذوفة المحفوظة لوضع since
+LOCK_STRIPES = 64  # عدد أقفال الكيانات (طلبات/طاولات)
+_HOLE = object()  # مكان طلب محذوف في الخط الزمني
+_DELETED = object()  # علامة حذف داخل المعاملة
+
+StoreSnapshot = namedtuple('StoreSnapshot', 'version orders tables')
+
+
+def created_at(order):
+    """createdAt كنص ISO قابل للمقارنة، أو None إذا لم يكن تاريخاً
+
+    بعض الواجهات تحفظ Date.now() (ملّي ثانية) بدلاً من toISOString()
+    """
+    created = order.get('createdAt')
+    if isinstance(created, str):
+        return created or None
+    if isinstance(created, (int, float)) and not isinstance(created, bool):
+        try:
+            dt = datetime.fromtimestamp(created / 1000, timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            return None
+        return dt.strftime('%Y-%m-%dT%H:%M:%S.') + f'{dt.microsecond // 1000:03d}Z'
+    return None
+
+
+class VersionConflict(Exception):
+    """الطلب تغيّر منذ الإصدار المتوقع (compare-and-swap)"""
+
+    def __init__(self, order_id, expected, actual):
+        super().__init__(f'order {order_id}: expected version {expected}, found {actual}')
+        self.order_id = order_id
+        self.expected = expected
+        self.actual = actual
+
+    def __reduce__(self):
+        # للنقل بين العمليات (وضع --workers)
+        return VersionConflict, (self.order_id, self.expected, self.actual)
+
+
+class Transaction:
+    """معاملة على كيانات محددة: تُقفل أقفالها فقط (مرتبة لتجنب الجمود)
+
+    التعديلات تُجمَّع مرحلياً وتُنشر معاً بإصدار واحد عند الخروج بدون استثناء،
+    ثم يُستدعى on_commit قبل تحرير الأقفال فيبقى ترتيب السجل مطابقاً لترتيب
+    التعديلات على نفس الكيان. أي استثناء يُلغي المعاملة؛ وإذا فشل on_commit
+    (الحفظ) تُلغى في الذاكرة أيضاً بمعاملة معاكسة ثم يُعاد رفع الاستثناء.
+    """
+
+    __slots__ = ('store', 'stripes', 'locks', 'orders', 'tables', 'tables_replaced',
+                 'created', 'archived', 'changes', 'version', 'undo')
+
+    def __init__(self, store, stripes):
+        self.store = store
+        self.stripes = stripes
+        self.locks = None
+        self.orders = {}  # id -> order جديد أو _DELETED
+        self.tables = {}  # id -> table جديد
+        self.tables_replaced = None
+        self.created = set()
+        self.archived = set()
+        self.changes = []
+        self.version = None
+        self.undo = None  # (طلبات، طاولات، كل الطاولات) قبل التطبيق؛ يملؤه _commit
+
+    def __enter__(self):
+        if self.locks is not None:
+            return self  # أُقفلت مسبقاً (_order_transaction)
+        locks = self.store._stripes
+        self.locks = [locks[i] for i in sorted(self.stripes)]
+        for lock in self.locks:
+            lock.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None and (self.orders or self.tables or self.tables_replaced is not None):
+                store = self.store
+                store._commit(self)
+                # معاملة بلا أثر (مثل حذف طلب غير موجود) لا تأخذ إصداراً ولا تصل للسجل أو البث
+                if self.changes and store.on_commit is not None:
+                    try:
+                        store.on_commit(self.changes, self.version)
+                    except Exception:
+                        store._rollback(self)
+                        raise
+        finally:
+            for lock in reversed(self.locks):
+                lock.release()
+        return False
+
+    def get_order(self, order_id):
+        order = self.orders.get(order_id)
+        if order is _DELETED:
+            return None
+        return order if order is not None else self.store._orders.get(order_id)
+
+    def get_table(self, table_id):
+        if table_id in self.tables:
+            return self.tables[table_id]
+        if self.tables_replaced is not None:
+            return self.tables_replaced.get(table_id)
+        return self.store._tables.get(table_id)
+
+    def put_order(self, order, created=False):
+        self.orders[order.get('id')] = order
+        if created:
+            self.created.add(order.get('id'))
+
+    def delete_order(self, order_id, archived=False):
+        """archived=True: الطلب نُقل للأرشيف (لا يُطرح من التحليلات)"""
+        self.orders[order_id] = _DELETED
+        self.created.discard(order_id)
+        if archived:
+            self.archived.add(order_id)
+
+    def put_table(self, table):
+        self.tables[table.get('id')] = table
+
+    def replace_tables(self, tables):
+        self.tables_replaced = {t.get('id'): t for t in tables}
+        self.tables = {}
+
+
+class OrderStore:
+    def __init__(self, data=None):
+        # قفل البنية: يُحجز فقط لتبديل المراجع في الفهارس (O(1)) أو لبناء لقطة
+        self.lock = threading.RLock()
+        self._stripes = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._snapshot = None
+        # يُستدعى بعد كل معاملة والأقفال ما زالت محجوزة: on_commit(changes, version)
+        self.on_commit = None
+        self.loaded = False
+        self._orders = {}  # id -> order (من الأقدم للأحدث)
+        self._by_table = {}  # tableId -> {id: None} (مجموعة مرتبة)
+        self._by_status = {}  # status -> {id: None}
+        self._tables = {}  # id -> table
+        # الخط الزمني لترقيم الصفحات: تسلسلات تصاعدية ومعرفات موازية
+        self._seq = 0
+        self._order_seq = {}  # id -> seq
+        self._timeline_seqs = []
+        self._timeline_ids = []
+        self._holes = 0
+        # عدّاد التغييرات
+        self.version = 0
+        self._order_versions = {}  # id -> version (مرتب حسب آخر تغيير)
+        self._tombstones = {}  # id -> version للطلبات المحذوفة
+        self._horizon = 0  # أقدم إصدار يمكن الإجابة عنه في وضع since
+        self._tables_version = 0
+        if data is not None:
+            self.load(data)
+
+    # ------------------------------------------
+    # التحميل والتصدير
+    # ------------------------------------------
+    def load(self, data):
+        """تحميل البيانات بصيغة restaurant_data.json (الطلبات الأحدث أولاً)"""
+        with self.lock:
+            self._orders = {}
+            self._by_table = {}
+            self._by_status = {}
+            self._order_seq = {}
+            self._timeline_seqs = []
+            self._timeline_ids = []
+            self._holes = 0
+            self._order_versions = {}
+            self._tombstones = {}
+            for order in reversed(data.get('orders', [])):
+                self._index(order)
+                self._order_versions[order.get('id')] = self.version
+            self._tables = {t.get('id'): t for t in data.get('tables', [])}
+            self._horizon = self.version
+            self._tables_version = self.version
+            self._snapshot = None
+            self.loaded = True
+
+    def snapshot(self):
+        """لقطة ثابتة (tuples من مراجع كيانات لا تتغير) تُبنى مرة لكل إصدار"""
+        snap = self._snapshot
+        if snap is not None and snap.version == self.version:
+            return snap
+        with self.lock:
+            snap = self._snapshot
+            if snap is None or snap.version != self.version:
+                snap = StoreSnapshot(self.version, tuple(reversed(self._orders.values())),
+                                     tuple(self._tables.values()))
+                self._snapshot = snap
+            return snap
+
+    def to_data(self):
+        """تصدير بنفس صيغة load_data القديمة"""
+        snap = self.snapshot()
+        return {'orders': list(snap.orders), 'tables': list(snap.tables)}
+
+    # ------------------------------------------
+    # الفهارس
+    # ------------------------------------------
+    def _index(self, order):
+        order_id = order.get('id')
+        if order_id in self._orders:
+            self._unindex(self._orders[order_id])
+        self._seq += 1
+        self._orders[order_id] = order
+        self._order_seq[order_id] = self._seq
+        self._timeline_seqs.append(self._seq)
+        self._timeline_ids.append(order_id)
+        self._by_table.setdefault(order.get('tableId'), {})[order_id] = None
+        self._by_status.setdefault(order.get('status'), {})[order_id] = None
+
+    def _unindex(self, order):
+        order_id = order.get('id')
+        self._orders.pop(order_id, None)
+        self._discard(self._by_table, order.get('tableId'), order_id)
+        self._discard(self._by_status, order.get('status'), order_id)
+        seq = self._order_seq.pop(order_id, None)
+        if seq is not None:
+            self._timeline_ids[bisect_left(self._timeline_seqs, seq)] = _HOLE
+            self._holes += 1
+            if self._holes > 1024 and self._holes * 2 > len(self._timeline_ids):
+                self._compact_timeline()
+
+    def _reindex(self, old, new):
+        """استبدال مرجع طلب موجود بنسخة جديدة مع الحفاظ على ترتيبه وتسلسله"""
+        order_id = new.get('id')
+        self._orders[order_id] = new
+        if old.get('status') != new.get('status'):
+            self._discard(self._by_status, old.get('status'), order_id)
+            self._by_status.setdefault(new.get('status'), {})[order_id] = None
+        if old.get('tableId') != new.get('tableId'):
+            self._discard(self._by_table, old.get('tableId'), order_id)
+            self._by_table.setdefault(new.get('tableId'), {})[order_id] = None
+
+    def _compact_timeline(self):
+        pairs = [(s, i) for s, i in zip(self._timeline_seqs, self._timeline_ids) if i is not _HOLE]
+        self._timeline_seqs = [s for s, _ in pairs]
+        self._timeline_ids = [i for _, i in pairs]
+        self._holes = 0
+
+    def _touch(self, order_id, deleted=False):
+        """تسجيل الطلب المتغيّر بالإصدار الحالي"""
+        self._order_versions.pop(order_id, None)
+        self._tombstones.pop(order_id, None)
+        if deleted:
+            self._tombstones[order_id] = self.version
+            if len(self._tombstones) > MAX_TOMBSTONES:
+                oldest = next(iter(self._tombstones))
+                self._horizon = self._tombstones.pop(oldest)
+        else:
+            self._order_versions[order_id] = self.version
+
+    def invalidate_all(self):
+        """تغيير غير معروف التفاصيل: إصدار جديد ويجب على عملاء since إعادة التحميل"""
+        with self.lock:
+            self.version += 1
+            self._horizon = self.version
+            self._tables_version = self.version
+
+    @staticmethod
+    def _discard(index, key, order_id):
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.pop(order_id, None)
+            if not bucket:
+                del index[key]
+
+    # ------------------------------------------
+    # القراءة
+    # ------------------------------------------
+    def __len__(self):
+        return len(self._orders)
+
+    def get_order(self, order_id):
+        return self._orders.get(order_id)
+
+    def order_version(self, order_id):
+        """إصدار آخر تغيير للطلب (لاستخدامه مع expected_version)"""
+        return self._order_versions.get(order_id)
+
+    def get_table(self, table_id):
+        return self._tables.get(table_id)
+
+    def list_orders(self):
+        """كل الطلبات الأحدث أولاً"""
+        return list(self.snapshot().orders)
+
+    def list_tables(self):
+        return list(self.snapshot().tables)
+
+    def orders_by_table(self, table_id):
+        with self.lock:
+            ids = self._by_table.get(table_id, {})
+            return [self._orders[i] for i in reversed(ids)]
+
+    def orders_by_status(self, status):
+        with self.lock:
+            ids = self._by_status.get(status, {})
+            return [self._orders[i] for i in reversed(ids)]
+
+    def query_orders(self, statuses=None, table_id=None, created_from=None, created_to=None,
+                     limit=None, cursor=None):
+        """تصفية الطلبات (الأحدث أولاً) مع ترقيم صفحات بالمؤشر
+
+        المؤشر هو تسلسل آخر طلب في الصفحة السابقة؛ تُرجع (الطلبات، المؤشر التالي).
+        created_from/created_to تُقارن نصياً مع createdAt بصيغة ISO؛ الطلب بدون
+        تاريخ صالح يُستبعد عند وجود أي منهما.
+        """
+        with self.lock:
+            if statuses or table_id is not None:
+                # المرشحون من فهارس الطاولة/الحالة فقط، ثم ترتيب حسب التسلسل
+                candidates = None
+                if table_id is not None:
+                    candidates = set(self._by_table.get(table_id, {}))
+                if statuses:
+                    by_status = set()
+                    for status in statuses:
+                        by_status.update(self._by_status.get(status, {}))
+                    candidates = by_status if candidates is None else candidates & by_status
+                ids = sorted(candidates, key=self._order_seq.__getitem__, reverse=True)
+                if cursor is not None:
+                    ids = [i for i in ids if self._order_seq[i] < cursor]
+            else:
+                end = len(self._timeline_seqs)
+                if cursor is not None:
+                    end = bisect_left(self._timeline_seqs, cursor)
+                ids = (self._timeline_ids[p] for p in range(end - 1, -1, -1))
+
+            result = []
+            next_cursor = None
+            for order_id in ids:
+                if order_id is _HOLE:
+                    continue
+                order = self._orders[order_id]
+                if created_from or created_to:
+                    created = created_at(order)
+                    if created is None:
+                        continue
+                    if created_from and created < created_from:
+                        continue
+                    if created_to and created > created_to:
+                        continue
+                if limit is not None and len(result) >= limit:
+                    next_cursor = self._order_seq[result[-1].get('id')]
+                    break
+                result.append(order)
+            return result, next_cursor
+
+    def changes_since(self, since):
+        """الطلبات التي تغيّرت بعد الإصدار since فقط (دلتا للعملاء الذين يستطلعون)
+
+        إذا كان since أقدم من السجل المحفوظ أو من إصدار غير معروف تُرجع reset=True مع كل الطلبات.
+        """
+        with self.lock:
+            if since < self._horizon or since > self.version:
+                return {'version': self.version, 'reset': True,
+                        'orders': self.list_orders(), 'deleted': [], 'tables': self.list_tables()}
+            changed = []
+            for order_id, version in reversed(self._order_versions.items()):
+                if version <= since:
+                    break
+                changed.append(self._orders[order_id])
+            deleted = []
+            for order_id, version in reversed(self._tombstones.items()):
+                if version <= since:
+                    break
+                deleted.append(order_id)
+            result = {'version': self.version, 'reset': False, 'orders': changed, 'deleted': deleted}
+            if self._tables_version > since:
+                result['tables'] = self.list_tables()
+            return result
+
+    # ------------------------------------------
+    # المعاملات
+    # ------------------------------------------
+    def transaction(self, orders=(), tables=(), all_tables=False):
+        """معاملة تقفل الطلبات والطاولات المذكورة فقط؛ الكتّاب على كيانات مختلفة لا ينتظرون بعضهم"""
+        if all_tables:
+            return Transaction(self, range(LOCK_STRIPES))
+        stripes = {hash(('order', i)) % LOCK_STRIPES for i in orders}
+        stripes.update(hash(('table', i)) % LOCK_STRIPES for i in tables)
+        return Transaction(self, stripes)
+
+    def _commit(self, txn):
+        changes = txn.changes
+        with self.lock:
+            if not txn.tables and txn.tables_replaced is None and all(
+                    order is _DELETED and order_id not in self._orders for order_id, order in txn.orders.items()):
+                return
+            # نسخة متماثلة (apply_changes): الإصدار يأتي من المخزن الأصلي
+            self.version = txn.version if txn.version is not None else self.version + 1
+            txn.version = self.version
+            undo_orders, undo_tables = {}, {}
+            txn.undo = (undo_orders, undo_tables,
+                        list(self._tables.values()) if txn.tables_replaced is not None else None)
+            for order_id, order in txn.orders.items():
+                old = self._orders.get(order_id)
+                undo_orders[order_id] = old
+                if order is _DELETED:
+                    if old is not None:
+                        self._unindex(old)
+                        self._touch(order_id, deleted=True)
+                        change = {'op': 'order.delete', 'id': order_id}
+                        if order_id in txn.archived:
+                            change['archived'] = True
+                        changes.append(change)
+                    continue
+                if old is None or order_id in txn.created:
+                    self._index(order)
+                    changes.append({'op': 'order.create', 'order': order})
+                else:
+                    self._reindex(old, order)
+                    changes.append({'op': 'order.update', 'order': order})
+                self._touch(order_id)
+            if txn.tables_replaced is not None:
+                self._tables = dict(txn.tables_replaced)
+                changes.append({'op': 'tables.set', 'tables': list(self._tables.values())})
+            for table_id, table in txn.tables.items():
+                undo_tables.setdefault(table_id, self._tables.get(table_id))
+                self._tables[table_id] = table
+                changes.append({'op': 'table.update', 'table': table})
+            if txn.tables or txn.tables_replaced is not None:
+                self._tables_version = self.version
+
+    def _rollback(self, txn):
+        """إلغاء معاملة فشل حفظها: معاملة معاكسة بنفس الأقفال (ما زالت محجوزة)
+
+        تأخذ إصداراً جديداً وتمر بـ on_commit كأي معاملة، فعملاء since و ETag
+        والنسخ المتماثلة يرون الكيانات تعود لحالتها. حفظ السجلات المعاكسة يكتب
+        حالة موجودة على القرص أصلاً، ففشله لا يترك الذاكرة مختلفة عن القرص.
+        """
+        if txn.undo is None:
+            return
+        orders, tables, all_tables = txn.undo
+        undo = Transaction(self, txn.stripes)
+        undo.locks = txn.locks
+        for order_id, old in orders.items():
+            if old is None:
+                undo.delete_order(order_id)
+            else:
+                undo.put_order(old, created=order_id not in self._orders)
+        if all_tables is not None:
+            undo.replace_tables(all_tables)  # المعاملة تحجز كل الأقفال
+        else:
+            for old in tables.values():
+                if old is not None:
+                    undo.put_table(old)
+        self._commit(undo)
+        if undo.changes and self.on_commit is not None:
+            try:
+                self.on_commit(undo.changes, undo.version)
+            except Exception as e:
+                print(f'⚠️ تعذر حفظ إلغاء المعاملة {txn.version}: {e}')
+
+    def _order_transaction(self, order_id):
+        """معاملة على طلب وطاولته؛ الطاولة تُقرأ قبل القفل ثم يُتحقق منها بعده"""
+        while True:
+            order = self._orders.get(order_id)
+            table_id = order.get('tableId') if order is not None else None
+            txn = self.transaction(orders=(order_id,), tables=(table_id,)).__enter__()
+            current = self._orders.get(order_id)
+            if current is None or current.get('tableId') == table_id:
+                return txn
+            # الطلب أُنشئ أو استُبدل بين القراءة والقفل: إعادة المحاولة
+            txn.__exit__(None, None, None)
+
+    # ------------------------------------------
+    # التعديل - كل دالة تُرجع التعديلات بصيغة السجل
+    # ------------------------------------------
+    def add_order(self, order):
+        """إضافة طلب جديد وحجز طاولته"""
+        with self.transaction(orders=[order.get('id')], tables=[order.get('tableId')]) as txn:
+            txn.put_order(order, created=True)
+            table = txn.get_table(order.get('tableId'))
+            if table is not None:
+                txn.put_table(dict(table, status='pending', currentOrder=order['id']))
+        return txn.changes
+
+    def update_order(self, order_id, update, expected_version=None):
+        """تعديل طلب بدالة update(order) -> نسخة جديدة
+
+        إذا مُرّر expected_version ولم يطابق إصدار الطلب الحالي تُرفع VersionConflict.
+        """
+        with self._order_transaction(order_id) as txn:
+            order = txn.get_order(order_id)
+            if order is None:
+                return []
+            if expected_version is not None and self._order_versions.get(order_id) != expected_version:
+                raise VersionConflict(order_id, expected_version, self._order_versions.get(order_id))
+            txn.put_order(update(order))
+        return txn.changes
+
+    def update_status(self, order_id, new_status, expected_version=None):
+        """تغيير حالة الطلب وتحديث حالة الطاولة المرتبطة"""
+        with self._order_transaction(order_id) as txn:
+            order = txn.get_order(order_id)
+            if order is None:
+                return []
+            if expected_version is not None and self._order_versions.get(order_id) != expected_version:
+                raise VersionConflict(order_id, expected_version, self._order_versions.get(order_id))
+            order = dict(order, status=new_status)
+            txn.put_order(order)
+
+            # الطاولة تُكتب فقط إذا تغيّرت فعلاً (لا سجل ولا حدث ولا إصدار زائد)
+            table = txn.get_table(order.get('tableId'))
+            if table is not None:
+                if new_status == 'completed':
+                    updated = dict(table, status='available', currentOrder=None)
+                elif new_status == 'preparing':
+                    updated = dict(table, status='occupied')
+                else:
+                    updated = table
+                if updated != table:
+                    txn.put_table(updated)
+        return txn.changes
+
+    def delete_order(self, order_id):
+        with self.transaction(orders=[order_id]) as txn:
+            if txn.get_order(order_id) is None:
+                return []
+            txn.delete_order(order_id)
+        return txn.changes
+
+    def update_table(self, table_id, updates):
+        with self.transaction(tables=[table_id]) as txn:
+            table = txn.get_table(table_id)
+            if table is None:
+                return []
+            txn.put_table(dict(table, **updates))
+        return txn.changes
+
+    def apply_changes(self, changes, version):
+        """تطبيق تعديلات بصيغة السجل كما وصلت من المخزن الأصلي (نسخة متماثلة للقراءة)
+
+        الإصدار يُنسخ كما هو فتبقى since و ETag متطابقة بين النسخ.
+        """
+        with self.transaction(all_tables=True) as txn:
+            txn.version = version
+            for change in changes:
+                op = change.get('op')
+                if op == 'order.create':
+                    txn.put_order(change['order'], created=True)
+                elif op == 'order.update':
+                    txn.put_order(change['order'])
+                elif op == 'order.delete':
+                    txn.delete_order(change.get('id'), archived=change.get('archived', False))
+                elif op == 'table.update':
+                    txn.put_table(change['table'])
+                elif op == 'tables.set':
+                    txn.replace_tables(change['tables'])
+        return txn.changes
+
+    def set_table_count(self, count):
+        """تغيير عدد الطاولات مع الإبقاء على الطاولات الموجودة"""
+        with self.transaction(all_tables=True) as txn:
+            txn.replace_tables([
+                self._tables.get(i) or {'id': i, 'status': 'available', 'currentOrder': None}
+                for i in range(1, count + 1)
+            ])
+        return txn.changes
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+نظام Rate Limiting بذاكرة ثابتة لكل IP
+
+- خوارزمية النافذة المنزلقة التقريبية (sliding window counter): عدّادان فقط لكل IP
+  بدلاً من قائمة بوقت كل طلب
+- حدود وتكلفة لكل فئة مسار: الملفات الثابتة لا تستهلك حصة الـ API
+- أقفال مجزأة حسب IP
+- خيط خلفي يحذف عناوين IP الخاملة (لا نمو غير محدود خلف proxy عام)
+- معلومات لترويسات X-RateLimit-*
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+DEFAULT_SHARDS = 16
+SWEEP_INTERVAL = 60  # ثواني بين كل عملية تنظيف
+
+RateLimitResult = namedtuple('RateLimitResult', 'allowed limit remaining reset')
+
+
+class _Counter:
+    __slots__ = ('window_start', 'current', 'previous', 'last_seen')
+
+    def __init__(self, now):
+        self.window_start = now
+        self.current = 0
+        self.previous = 0
+        self.last_seen = now
+
+    def estimate(self, now, window):
+        """عدد الطلبات التقديري في آخر window ثانية"""
+        elapsed = now - self.window_start
+        if elapsed >= window:
+            periods = int(elapsed // window)
+            self.previous = self.current if periods == 1 else 0
+            self.current = 0
+            self.window_start += periods * window
+            elapsed = now - self.window_start
+        return self.previous * (window - elapsed) / window + self.current
+
+
+class RateLimiter:
+    def __init__(self, max_requests=200, window=60, route_limits=None,
+                 shards=DEFAULT_SHARDS, sweep_interval=SWEEP_INTERVAL):
+        self.max_requests = max_requests
+        self.window = window
+        # فئة المسار -> (الحد، النافذة)
+        self.route_limits = {'api': (max_requests, window)}
+        self.route_limits.update(route_limits or {})
+        self._shards = [({}, threading.Lock()) for _ in range(shards)]
+        self.sweep_interval = sweep_interval
+        self.rejected = 0
+        self.evicted = 0
+        self._sweeper = None
+
+    def share(self, parts):
+        """تقسيم كل الحدود على parts عملية تطبق كل منها حصتها (وضع --workers)
+
+        العدادات في ذاكرة كل عملية، والاتصالات تتوزع على العمال؛ بدون التقسيم
+        يصبح الحد الفعلي لكل IP مضروباً في عدد العمال.
+        """
+        parts = max(1, parts)
+        self.max_requests = max(1, -(-self.max_requests // parts))
+        self.route_limits = {route: (max(1, -(-limit // parts)), window)
+                             for route, (limit, window) in self.route_limits.items()}
+
+    def _shard(self, ip):
+        return self._shards[hash(ip) % len(self._shards)]
+
+    def check(self, ip, route='api', cost=1):
+        """احتساب الطلب وإرجاع (مسموح، الحد، المتبقي، ثواني حتى التصفير)"""
+        limit, window = self.route_limits.get(route, self.route_limits['api'])
+        counters, lock = self._shard(ip)
+        now = time.monotonic()
+        with lock:
+            counter = counters.get((ip, route))
+            if counter is None:
+                counter = counters[(ip, route)] = _Counter(now)
+                self._start_sweeper()
+            counter.last_seen = now
+            used = counter.estimate(now, window)
+            allowed = used + cost <= limit
+            if allowed:
+                counter.current += cost
+                used += cost
+            reset = counter.window_start + window - now
+        if not allowed:
+            self.rejected += 1
+        return RateLimitResult(allowed, limit, max(0, int(limit - used)), max(0, int(reset + 0.999)))
+
+    def is_allowed(self, ip, route='api', cost=1):
+        return self.check(ip, route, cost).allowed
+
+    def get_remaining(self, ip, route='api'):
+        limit, window = self.route_limits.get(route, self.route_limits['api'])
+        counters, lock = self._shard(ip)
+        with lock:
+            counter = counters.get((ip, route))
+            if counter is None:
+                return limit
+            return max(0, int(limit - counter.estimate(time.monotonic(), window)))
+
+    # ------------------------------------------
+    # تنظيف عناوين IP الخاملة
+    # ------------------------------------------
+    def _start_sweeper(self):
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._sweep_loop, name='rate-limit-sweeper', daemon=True)
+            self._sweeper.start()
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            self.sweep()
+
+    def sweep(self, now=None):
+        """حذف العدادات التي لم تُستخدم لأكثر من نافذتين (لم يعد لها أثر على الحد)"""
+        now = time.monotonic() if now is None else now
+        removed = 0
+        for counters, lock in self._shards:
+            with lock:
+                idle = [key for key, c in counters.items()
+                        if now - c.last_seen >= 2 * self.route_limits.get(key[1], self.route_limits['api'])[1]]
+                for key in idle:
+                    del counters[key]
+            removed += len(idle)
+        self.evicted += removed
+        return removed
+
+    def get_stats(self):
+        return {
+            'tracked': sum(len(counters) for counters, _ in self._shards),
+            'rejected': self.rejected,
+            'evicted_idle': self.evicted,
+            'routes': {route: f'{limit}/{window}s' for route, (limit, window) in self.route_limits.items()}
+        }
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+تحديث خلفي بأسلوب stale-while-revalidate لبيانات بطيئة الجلب (مثل مواقع Firebase Hosting)
+
+- الطلب يحصل فوراً على آخر قيمة ناجحة مع عمرها، حتى لو كانت قديمة
+- إذا تجاوز عمرها fresh_ttl يبدأ تحديث في الخلفية؛ تحديث واحد فقط لكل مفتاح
+  في نفس الوقت (single-flight) مهما تزامنت الطلبات
+- الفشل لا يُخزَّن كقيمة فارغة: القيمة السابقة تبقى، والمحاولة التالية تتأخر
+  تصاعدياً (backoff) حتى max_backoff
+- خيط يبقي المفاتيح المستخدمة مؤخراً دافئة (يحدّثها قبل أن يطلبها أحد)؛ المفاتيح
+  التي لم تنجح أو فشل آخر جلب لها لا تُدفَّأ
+- أول طلب لمفتاح بارد ينتظر حتى cold_wait فقط ثم يُرجع "قيد التحميل"
+- حد لعدد المفاتيح (max_keys) ولعدد عمليات الجلب المتزامنة (max_concurrent)
+"""
+
+import threading
+import time
+
+FRESH_TTL = 60  # ثواني قبل اعتبار القيمة قديمة
+KEEP_WARM = 3600  # المفاتيح المطلوبة خلال هذه المدة تُحدَّث في الخلفية
+COLD_WAIT = 5  # أقصى انتظار لأول جلب داخل الطلب
+BACKOFF_BASE = 5
+MAX_BACKOFF = 300
+MAX_KEYS = 32  # أقصى عدد مفاتيح محفوظة في نفس الوقت
+MAX_CONCURRENT = 2  # أقصى عدد عمليات جلب متزامنة لكل المفاتيح
+
+
+class RefreshError(RuntimeError):
+    """لا توجد قيمة بعد: الجلب فشل أو ما زال جارياً"""
+
+    def __init__(self, message, retry_in=None, loading=False):
+        super().__init__(message)
+        self.retry_in = retry_in
+        self.loading = loading
+
+    def __reduce__(self):
+        # للنقل بين العمليات (وضع --workers)
+        return RefreshError, (str(self), self.retry_in, self.loading)
+
+
+class _Slot:
+    __slots__ = ('value', 'fetched_at', 'has_value', 'error', 'failures', 'next_attempt',
+                 'refreshing', 'done', 'last_access')
+
+    def __init__(self):
+        self.value = None
+        self.fetched_at = None
+        self.has_value = False
+        self.error = None
+        self.failures = 0
+        self.next_attempt = 0.0
+        self.refreshing = False
+        self.done = threading.Event()
+        self.last_access = time.monotonic()
+
+
+class BackgroundRefresher:
+    def __init__(self, fetch, name='refresher', fresh_ttl=FRESH_TTL, keep_warm=KEEP_WARM,
+                 cold_wait=COLD_WAIT, backoff_base=BACKOFF_BASE, max_backoff=MAX_BACKOFF,
+                 max_keys=MAX_KEYS, max_concurrent=MAX_CONCURRENT):
+        self.fetch = fetch  # fetch(key) -> value أو استثناء
+        self.name = name
+        self.fresh_ttl = fresh_ttl
+        self.keep_warm = keep_warm
+        self.cold_wait = cold_wait
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.max_keys = max_keys
+        self.lock = threading.Lock()
+        self._fetch_slots = threading.BoundedSemaphore(max_concurrent)
+        self.slots = {}
+        self.fetches = 0
+        self.failures = 0
+        self.coalesced = 0  # طلبات وجدت تحديثاً جارياً فلم تبدأ غيره
+        self._stopped = threading.Event()
+        self._thread = None
+
+    # ------------------------------------------
+    # القراءة
+    # ------------------------------------------
+    def get(self, key):
+        """(value, meta) فوراً؛ RefreshError إذا لم تنجح أي عملية جلب بعد"""
+        with self.lock:
+            slot = self.slots.get(key)
+            if slot is None:
+                if len(self.slots) >= self.max_keys:
+                    raise RefreshError('عدد المفاتيح المطلوبة تجاوز الحد، أعد المحاولة لاحقاً',
+                                       retry_in=self.max_backoff)
+                slot = self.slots[key] = _Slot()
+            slot.last_access = time.monotonic()
+            if slot.refreshing:
+                self.coalesced += 1
+            else:
+                self._maybe_start(key, slot)
+            wait = not slot.has_value and slot.refreshing
+            done = slot.done
+        if wait:
+            done.wait(self.cold_wait)
+        with self.lock:
+            if slot.has_value:
+                return slot.value, self._meta(slot)
+            now = time.monotonic()
+            if slot.refreshing:
+                raise RefreshError('جاري جلب البيانات لأول مرة، أعد المحاولة بعد قليل', loading=True)
+            raise RefreshError(slot.error or 'تعذر جلب البيانات',
+                               retry_in=round(max(0.0, slot.next_attempt - now), 1))
+
+    def _meta(self, slot):
+        age = time.time() - slot.fetched_at
+        return {
+            'ageSeconds': round(age, 1),
+            'fetchedAt': slot.fetched_at,
+            'stale': age > self.fresh_ttl,
+            'refreshing': slot.refreshing,
+            'lastError': slot.error
+        }
+
+    # ------------------------------------------
+    # التحديث
+    # ------------------------------------------
+    def _maybe_start(self, key, slot):
+        """يُستدعى تحت self.lock؛ يبدأ تحديثاً إن لزم ولم يكن جارياً ولم يحن وقت backoff"""
+        if slot.refreshing or time.monotonic() < slot.next_attempt:
+            return False
+        if slot.has_value and time.time() - slot.fetched_at < self.fresh_ttl:
+            return False
+        self._start_locked(key, slot)
+        return True
+
+    def _start_locked(self, key, slot):
+        slot.refreshing = True
+        slot.done = threading.Event()
+        threading.Thread(target=self._refresh, args=(key, slot), name=f'{self.name}-fetch',
+                         daemon=True).start()
+
+    def _refresh(self, key, slot):
+        try:
+            with self._fetch_slots:
+                value = self.fetch(key)
+        except Exception as e:
+            with self.lock:
+                self.fetches += 1
+                self.failures += 1
+                slot.failures += 1
+                slot.error = str(e)
+                delay = min(self.backoff_base * 2 ** (slot.failures - 1), self.max_backoff)
+                slot.next_attempt = time.monotonic() + delay
+                slot.refreshing = False
+                slot.done.set()
+            return
+        with self.lock:
+            self.fetches += 1
+            slot.value = value
+            slot.has_value = True
+            slot.fetched_at = time.time()
+            slot.error = None
+            slot.failures = 0
+            slot.next_attempt = 0.0
+            slot.refreshing = False
+            slot.done.set()
+
+    # ------------------------------------------
+    # الإبقاء دافئاً
+    # ------------------------------------------
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f'{self.name}-warm', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        interval = max(1.0, self.fresh_ttl / 2)
+        while not self._stopped.wait(interval):
+            now = time.monotonic()
+            with self.lock:
+                for key, slot in list(self.slots.items()):
+                    idle = now - slot.last_access
+                    if not slot.has_value:
+                        # لم ينجح أي جلب: لا يُدفَّأ، ويُحذف بعد أطول backoff دون طلبات
+                        if not slot.refreshing and idle > self.max_backoff:
+                            del self.slots[key]
+                        continue
+                    if idle > self.keep_warm:
+                        del self.slots[key]  # لم يطلبه أحد منذ مدة
+                        continue
+                    if slot.failures:
+                        continue  # آخر جلب فشل: الطلب التالي يعيد المحاولة بعد backoff
+                    # تحديث قبل انتهاء الصلاحية بقليل حتى لا يرى الطلب قيمة قديمة
+                    if time.time() - slot.fetched_at < self.fresh_ttl - interval:
+                        continue
+                    if not slot.refreshing and now >= slot.next_attempt:
+                        self._start_locked(key, slot)
+
+    def stop(self):
+        self._stopped.set()
+
+    def get_stats(self):
+        with self.lock:
+            keys = {str(key): {'has_value': slot.has_value, 'refreshing': slot.refreshing,
+                               'failures': slot.failures,
+                               'age': round(time.time() - slot.fetched_at, 1) if slot.has_value else None}
+                    for key, slot in self.slots.items()}
+        return {'fetches': self.fetches, 'failures': self.failures, 'coalesced': self.coalesced, 'keys': keys}
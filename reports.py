@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+تقارير مجمّعة (نهاية اليوم/الشهر) على أعمدة بدلاً من حلقات على القواميس
+
+- تسطيح الطلبات وأصنافها إلى أعمدة (array) أثناء القراءة: لا يُحتفظ بالقواميس،
+  فالأرشيف يُبث مباشرة إلى الأعمدة
+- مع NumPy (اختياري): bincount/percentile موجّهة بدون حلقات بايثون
+- بدون NumPy: نفس النتائج بحلقات مضغوطة على array (بايثون القياسية)
+- مجاميع الكمية × السعر حسب الفئة، حسب الطاولة وحسب الساعة، سلاسل زمنية
+  (ساعة/يوم/شهر) ومئينات قيمة الفاتورة
+
+الاستخدام من سطر الأوامر (قراءة فقط: آمن أثناء عمل السيرفر):
+    python reports.py --from 2026-10-01 --to 2026-10-31 --bucket day
+    python reports.py --storage sqlite --bucket month
+"""
+
+import argparse
+import json
+import sys
+from array import array
+
+from order_store import created_at
+
+try:
+    import numpy as np  # اختياري
+except ImportError:
+    np = None
+
+BUCKETS = {'hour': 13, 'day': 10, 'month': 7}  # طول بادئة createdAt لكل دلو
+PERCENTILES = (50, 90, 95, 99)
+
+
+class _Codes:
+    """ترميز القيم النصية إلى أرقام متتالية (للتجميع بـ bincount)"""
+
+    def __init__(self):
+        self.index = {}
+        self.values = []
+
+    def code(self, value):
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class OrderColumns:
+    """أعمدة الطلبات (صف لكل طلب) وأعمدة الأصناف (صف لكل صنف في طلب)"""
+
+    def __init__(self):
+        # أعمدة الطلبات
+        self.total = array('d')
+        self.table = array('l')
+        self.hour = array('l')
+        self.bucket = array('l')
+        # أعمدة الأصناف
+        self.item_order = array('l')  # رقم صف الطلب
+        self.item_category = array('l')
+        self.item_id = array('l')
+        self.quantity = array('d')
+        self.amount = array('d')  # الكمية × السعر
+        # جداول الترميز
+        self.tables = _Codes()
+        self.buckets = _Codes()
+        self.categories = _Codes()
+        self.items = _Codes()
+        self.item_names = {}
+
+    def __len__(self):
+        return len(self.total)
+
+    @classmethod
+    def from_orders(cls, orders, bucket='day', statuses=('completed',), created_from=None, created_to=None):
+        """تسطيح مولّد طلبات إلى أعمدة في مرور واحد"""
+        cols = cls()
+        prefix = BUCKETS[bucket]
+        for order in orders:
+            if statuses and order.get('status') not in statuses:
+                continue
+            created = created_at(order) or ''
+            if created_from and created < created_from:
+                continue
+            if created_to and created > created_to:
+                continue
+            row = len(cols.total)
+            try:
+                cols.total.append(float(order.get('total') or 0))
+            except (TypeError, ValueError):
+                cols.total.append(0.0)
+            cols.table.append(cols.tables.code(order.get('tableId')))
+            cols.hour.append(int(created[11:13]) if created[11:13].isdigit() else -1)
+            cols.bucket.append(cols.buckets.code(created[:prefix] or 'unknown'))
+            for item in order.get('items') or ():
+                if not isinstance(item, dict):
+                    continue
+                try:
+                    qty = float(item.get('quantity', 1) or 0)
+                    price = float(item.get('price', 0) or 0)
+                except (TypeError, ValueError):
+                    continue
+                item_id = item.get('id')
+                cols.item_order.append(row)
+                cols.item_category.append(cols.categories.code(item.get('category')))
+                cols.item_id.append(cols.items.code(item_id))
+                cols.quantity.append(qty)
+                cols.amount.append(qty * price)
+                cols.item_names.setdefault(item_id, item.get('name'))
+        return cols
+
+
+# ------------------------------------------
+# العمليات الموجّهة: NumPy أو array
+# ------------------------------------------
+def _view(column):
+    """عرض NumPy على ذاكرة array نفسها (بدون نسخ)"""
+    return np.frombuffer(column, dtype=column.typecode)
+
+
+def grouped_sum(codes, weights, size):
+    """مجموع weights لكل قيمة في codes (0..size-1)"""
+    if np is not None:
+        if not len(codes):
+            return [0.0] * size
+        return np.bincount(_view(codes), weights=_view(weights), minlength=size).tolist()
+    sums = [0.0] * size
+    for code, weight in zip(codes, weights):
+        sums[code] += weight
+    return sums
+
+
+def grouped_count(codes, size):
+    if np is not None:
+        if not len(codes):
+            return [0] * size
+        return np.bincount(_view(codes), minlength=size).tolist()
+    counts = [0] * size
+    for code in codes:
+        counts[code] += 1
+    return counts
+
+
+def column_sum(column):
+    if np is not None:
+        return float(_view(column).sum()) if len(column) else 0.0
+    return sum(column)
+
+
+def percentiles(values, points=PERCENTILES):
+    """مئينات بالاستيفاء الخطي (نفس طريقة numpy الافتراضية)"""
+    if not len(values):
+        return {f'p{p}': 0 for p in points}
+    if np is not None:
+        result = np.percentile(_view(values), points)
+        return {f'p{p}': round(float(v), 2) for p, v in zip(points, result)}
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    out = {}
+    for p in points:
+        pos = last * p / 100
+        low = int(pos)
+        high = min(low + 1, last)
+        out[f'p{p}'] = round(ordered[low] + (ordered[high] - ordered[low]) * (pos - low), 2)
+    return out
+
+
+def gather(column, index):
+    """column[index] لكل عنصر في index (ربط الأصناف بأعمدة طلباتها)"""
+    if np is not None and len(index):
+        return array(column.typecode, _view(column)[_view(index)].tobytes())
+    return array(column.typecode, (column[i] for i in index))
+
+
+def replace_negative(column, value):
+    """الساعة المجهولة (-1) تُجمع في دلو إضافي"""
+    if np is not None and len(column):
+        view = _view(column)
+        return array(column.typecode, np.where(view >= 0, view, value).astype(view.dtype).tobytes())
+    return array(column.typecode, (v if v >= 0 else value for v in column))
+
+
+# ------------------------------------------
+# التقرير
+# ------------------------------------------
+def build_report(cols, bucket='day'):
+    revenue = column_sum(cols.total)
+    n_tables = len(cols.tables.values)
+    n_buckets = len(cols.buckets.values)
+    n_categories = len(cols.categories.values)
+    n_items = len(cols.items.values)
+
+    table_revenue = grouped_sum(cols.table, cols.total, n_tables)
+    table_orders = grouped_count(cols.table, n_tables)
+    bucket_revenue = grouped_sum(cols.bucket, cols.total, n_buckets)
+    bucket_orders = grouped_count(cols.bucket, n_buckets)
+    hour_revenue = grouped_sum(replace_negative(cols.hour, 24), cols.total, 25)[:24]
+
+    category_qty = grouped_sum(cols.item_category, cols.quantity, n_categories)
+    category_amount = grouped_sum(cols.item_category, cols.amount, n_categories)
+    item_qty = grouped_sum(cols.item_id, cols.quantity, n_items)
+    item_amount = grouped_sum(cols.item_id, cols.amount, n_items)
+    # الكمية × السعر حسب الطاولة (من أعمدة الأصناف عبر صف الطلب)
+    item_tables = gather(cols.table, cols.item_order)
+    table_items_amount = grouped_sum(item_tables, cols.amount, n_tables)
+
+    top = sorted(range(n_items), key=item_qty.__getitem__, reverse=True)[:10]
+    return {
+        'engine': 'numpy' if np is not None else 'array',
+        'bucket': bucket,
+        'orders': len(cols),
+        'revenue': round(revenue, 2),
+        'averageTicket': round(revenue / len(cols), 2) if len(cols) else 0,
+        'ticketPercentiles': percentiles(cols.total),
+        'byCategory': {str(cols.categories.values[c]): {'quantity': category_qty[c],
+                                                        'amount': round(category_amount[c], 2)}
+                       for c in range(n_categories)},
+        'byTable': {str(cols.tables.values[t]): {'orders': table_orders[t],
+                                                 'revenue': round(table_revenue[t], 2),
+                                                 'itemsAmount': round(table_items_amount[t], 2)}
+                    for t in range(n_tables)},
+        'byHour': [round(v, 2) for v in hour_revenue],
+        'series': {cols.buckets.values[b]: {'orders': bucket_orders[b], 'revenue': round(bucket_revenue[b], 2)}
+                   for b in sorted(range(n_buckets), key=cols.buckets.values.__getitem__)},
+        'topItems': [{'id': cols.items.values[i], 'name': cols.item_names.get(cols.items.values[i]),
+                      'quantity': item_qty[i], 'amount': round(item_amount[i], 2)} for i in top]
+    }
+
+
+def end_of_day(created_to):
+    """to بتاريخ فقط (YYYY-MM-DD) شامل لليوم كله"""
+    if created_to and len(created_to) == 10:
+        return created_to + 'T23:59:59.999Z'
+    return created_to
+
+
+def generate(orders, bucket='day', created_from=None, created_to=None, statuses=('completed',)):
+    """تقرير كامل من مولّد طلبات (المخزن الحي + الأرشيف)"""
+    if bucket not in BUCKETS:
+        raise ValueError(f'bucket must be one of {tuple(BUCKETS)}')
+    created_to = end_of_day(created_to)
+    cols = OrderColumns.from_orders(orders, bucket, statuses, created_from, created_to)
+    report = build_report(cols, bucket)
+    report['from'] = created_from
+    report['to'] = created_to
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='تقارير المبيعات (نهاية اليوم/الشهر)')
+    parser.add_argument('--from', dest='created_from')
+    parser.add_argument('--to', dest='created_to')
+    parser.add_argument('--bucket', choices=tuple(BUCKETS), default='day')
+    parser.add_argument('--status', default='completed', help="حالات مفصولة بفاصلة، أو 'all'")
+    parser.add_argument('--storage', choices=('json', 'sqlite'), default='json', help='خلفية التخزين كما في السيرفر')
+    parser.add_argument('--data', default='restaurant_data.json')
+    parser.add_argument('--db', default='restaurant_data.db')
+    parser.add_argument('--archive', default='archive')
+    args = parser.parse_args(argv)
+
+    from itertools import chain
+    from archive import OrderArchive
+    from storage import read_storage
+
+    # قراءة فقط: فتح OrderJournal ثم إغلاقه يضغط سجل السيرفر الحي ويحذفه
+    live = read_storage(args.storage, args.data, args.db).get('orders', [])
+    archived = OrderArchive(args.archive).iter_orders(args.created_from, end_of_day(args.created_to))
+    statuses = None if args.status == 'all' else tuple(args.status.split(','))
+    report = generate(chain(archived, reversed(live)), args.bucket, args.created_from, args.created_to, statuses)
+    json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
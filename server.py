@@ -4,8 +4,12 @@
 مع Thread Pool و Connection Pooling و Rate Limiting
 """
 
+import argparse
 import json
 import os
+import re
+import signal
+import socket
 import sys
 import subprocess
 import threading
@@ -15,10 +19,36 @@ from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 from socketserver import ThreadingMixIn
 from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
 from functools import lru_cache
 import gzip
+from itertools import chain
+
+import reports
+from analytics import SalesAnalytics
+from archive import Archiver, OrderArchive
+from assets import IMMUTABLE_CACHE_CONTROL, AssetBuilder, is_fingerprinted
+from deploy import DeployQueue, firebase_command
+from refresher import BackgroundRefresher, RefreshError
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, InstrumentedLock, Metrics
+from template_registry import TemplateRegistry
+from tenants import TenantRegistry, UnknownTenant
+from workers import StateOwner, can_fork
+from storage import DURABILITY_MODES, STORAGE_BACKENDS, StorageError, create_storage, read_storage
+from order_store import OrderStore, VersionConflict
+from events import EventBroker
+from async_server import AsyncHTTPServer
+from cache_manager import CacheManager
+from rate_limiter import RateLimiter
+from json_stream import gzip_chunks, iter_json, iter_json_array, write_chunked, write_plain
+from static_cache import StaticAssetCache, STREAM_CHUNK_SIZE, accepts_encoding, file_etag, is_compressible, parse_range
+from email.utils import formatdate
 
 DATA_FILE = 'restaurant_data.json'
+SQLITE_FILE = 'restaurant_data.db'
+ARCHIVE_DIR = 'archive'
+TENANTS_DIR = 'tenants'  # بيانات كل مطعم في مجلد خاص: tenants/<restaurantId>/
+INITIAL_DATA_FILE = 'initial-data.json'  # المطاعم المعروفة: restaurant-system.restaurants
 PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # ==========================================
@@ -32,317 +62,387 @@ MAX_BODY_SIZE = 2 * 1024 * 1024  # 2MB حد أقصى للبيانات
 CONNECTION_TIMEOUT = 30  # مهلة الاتصال بالثواني
 KEEP_ALIVE = True  # الحفاظ على الاتصال مفتوح
 GZIP_MIN_SIZE = 1024  # الحد الأدنى للضغط (1KB)
+LISTEN_BACKLOG = 1024  # طابور الاتصالات المنتظرة (إعادة اتصال الأجهزة دفعة واحدة)
+DEPLOY_PARALLELISM = 2  # مواقع تُنشر في نفس الوقت (طابور النشر)
+WORKER_PROCESSES = 1  # عمليات HTTP (>1: pre-fork مع مالك واحد للكتابة، انظر workers.py)
+STORAGE_BACKEND = 'json'  # json (ملف + سجل) | sqlite (WAL مع فهارس)
+JOURNAL_DURABILITY = 'batched'  # immediate | batched | async
+JOURNAL_COMMIT_WINDOW = 0.002  # نافذة تجميع الكتابات (ثواني)
+ARCHIVE_AFTER_HOURS = 24  # الطلبات المكتملة الأقدم من هذا تنتقل للأرشيف
+ARCHIVE_INTERVAL = 600  # ثواني بين كل عملية أرشفة
+TENANT_IDLE_TIMEOUT = 600  # ثواني خمول قبل إغلاق بيانات مطعم وتحريرها من الذاكرة
+MAX_LOADED_TENANTS = 100  # أقصى عدد مطاعم محمّلة في نفس الوقت
 
 # ==========================================
 # نظام التخزين المؤقت المحسّن
 # ==========================================
-class CacheManager:
-    def __init__(self, ttl=CACHE_TTL, max_size=1000):
-        self.cache = {}
-        self.ttl = ttl
-        self.max_size = max_size
-        self.lock = threading.RLock()  # RLock للسماح بإعادة الدخول
+cache = CacheManager(ttl=CACHE_TTL)
+static_cache = StaticAssetCache(min_compress_size=GZIP_MIN_SIZE)
+template_registry = TemplateRegistry(os.path.join(PROJECT_DIR, 'templates'))
+asset_builder = None  # --bundle: صفحات HTML من .build (JS/CSS مدمجة ومصغّرة ومبصومة)
+
+# ==========================================
+# نظام Rate Limiting
+# ==========================================
+# فئات المسارات: الملفات الثابتة وقناة الأحداث لها حصص مستقلة عن الـ API
+RATE_LIMIT_ROUTES = {
+    'static': (1000, RATE_LIMIT_WINDOW),
+    'events': (30, RATE_LIMIT_WINDOW),
+}
+# تكلفة المسارات الثقيلة بوحدات من حصة الـ API
+RATE_LIMIT_COSTS = {
+    '/api/data': 5,
+    '/api/deploy': 10,
+    '/api/hosting/sites': 5,
+    '/api/reports': 5,
+}
+
+rate_limiter = RateLimiter(RATE_LIMIT_REQUESTS, RATE_LIMIT_WINDOW, route_limits=RATE_LIMIT_ROUTES)
+
+# ==========================================
+# كاش ردود JSON المرمّزة حسب إصدار البيانات
+# ==========================================
+JSON_GZIP_LEVEL = 6  # توازن بين الحجم وزمن المعالج للردود الديناميكية
+STREAM_JSON_MIN_ORDERS = 2000  # فوق هذا العدد تُبث الردود بقطع بدلاً من ترميزها كاملة في الذاكرة
+BOOT_ID = format(int(time.time() * 1000), 'x')  # يميز الإصدارات بعد إعادة التشغيل
+
+class EncodedResponse:
+    """بايتات JSON جاهزة (+ نسخة gzip عند أول طلب لها) لإصدار واحد من البيانات"""
+    __slots__ = ('version', 'body', '_gzip', 'etag')
+    
+    def __init__(self, version, body):
+        self.version = version
+        self.body = body
+        self._gzip = None
+        self.etag = self.make_etag(version)
+    
+    @staticmethod
+    def make_etag(version):
+        return f'W/"{BOOT_ID}-{version}"'  # ضعيف: نفس الإصدار بترميزات مختلفة
+    
+    def gzipped(self):
+        if self._gzip is None:
+            self._gzip = gzip.compress(self.body, compresslevel=JSON_GZIP_LEVEL)
+        return self._gzip
+
+class JsonResponseCache:
+    """ترميز كل نقطة API مرة واحدة لكل إصدار بدلاً من json.dumps لكل طلب"""
+    def __init__(self):
+        self.entries = {}  # endpoint -> EncodedResponse
+        self.lock = threading.Lock()
         self.hits = 0
         self.misses = 0
-        self.last_cleanup = time.time()
-        self.cleanup_interval = 60  # تنظيف كل دقيقة
     
-    def get(self, key):
+    def get(self, endpoint, version_fn, producer):
+        entry = self.entries.get(endpoint)
+        if entry is not None and entry.version == version_fn():
+            self.hits += 1
+            return entry
         with self.lock:
-            self._auto_cleanup()
-            if key in self.cache:
-                data, timestamp, access_count = self.cache[key]
-                if time.time() - timestamp < self.ttl:
-                    self.cache[key] = (data, timestamp, access_count + 1)
-                    self.hits += 1
-                    return data
-                del self.cache[key]
+            entry = self.entries.get(endpoint)
+            version = version_fn()
+            if entry is not None and entry.version == version:
+                self.hits += 1
+                return entry
             self.misses += 1
-        return None
+            body = json.dumps(producer(), ensure_ascii=False).encode('utf-8')
+            entry = EncodedResponse(version, body)
+            self.entries[endpoint] = entry
+            return entry
     
-    def set(self, key, value, custom_ttl=None):
+    def invalidate(self, endpoint):
+        """للبيانات المشتقة التي تتغير دون تغيّر إصدار المخزن (مثل إعادة بناء التحليلات)"""
         with self.lock:
-            # إذا امتلأ الكاش، نحذف الأقل استخداماً
-            if len(self.cache) >= self.max_size:
-                self._evict_lru()
-            self.cache[key] = (value, time.time(), 1)
-    
-    def invalidate(self, pattern=None):
-        with self.lock:
-            if pattern:
-                keys_to_delete = [k for k in self.cache if pattern in k]
-                for k in keys_to_delete:
-                    del self.cache[k]
-            else:
-                self.cache.clear()
-    
-    def _evict_lru(self):
-        """حذف العناصر الأقل استخداماً"""
-        if not self.cache:
-            return
-        # ترتيب حسب عدد الوصول وحذف الأقل
-        sorted_keys = sorted(self.cache.keys(), key=lambda k: self.cache[k][2])
-        keys_to_remove = sorted_keys[:len(sorted_keys) // 4]  # حذف 25%
-        for k in keys_to_remove:
-            del self.cache[k]
-    
-    def _auto_cleanup(self):
-        """تنظيف تلقائي للعناصر المنتهية"""
-        now = time.time()
-        if now - self.last_cleanup < self.cleanup_interval:
-            return
-        self.last_cleanup = now
-        expired_keys = [k for k, (_, ts, _) in self.cache.items() if now - ts >= self.ttl]
-        for k in expired_keys:
-            del self.cache[k]
+            self.entries.pop(endpoint, None)
     
     def get_stats(self):
-        """إحصائيات الكاش"""
         total = self.hits + self.misses
-        hit_rate = (self.hits / total * 100) if total > 0 else 0
         return {
-            'size': len(self.cache),
+            'endpoints': len(self.entries),
             'hits': self.hits,
             'misses': self.misses,
-            'hit_rate': f'{hit_rate:.1f}%'
+            'hit_rate': f'{(self.hits / total * 100) if total else 0:.1f}%'
         }
 
-cache = CacheManager()
+json_cache = JsonResponseCache()
 
 # ==========================================
-# نظام Rate Limiting
+# القياسات (/metrics بصيغة Prometheus)
 # ==========================================
-class RateLimiter:
-    def __init__(self, max_requests=RATE_LIMIT_REQUESTS, window=RATE_LIMIT_WINDOW):
-        self.requests = {}
-        self.max_requests = max_requests
-        self.window = window
-        self.lock = threading.Lock()
-    
-    def is_allowed(self, ip):
-        with self.lock:
-            now = time.time()
-            
-            # تنظيف الطلبات القديمة
-            if ip in self.requests:
-                self.requests[ip] = [t for t in self.requests[ip] if now - t < self.window]
-            else:
-                self.requests[ip] = []
-            
-            # التحقق من الحد
-            if len(self.requests[ip]) >= self.max_requests:
-                return False
-            
-            self.requests[ip].append(now)
-            return True
-    
-    def get_remaining(self, ip):
-        with self.lock:
-            if ip not in self.requests:
-                return self.max_requests
-            now = time.time()
-            valid_requests = [t for t in self.requests[ip] if now - t < self.window]
-            return max(0, self.max_requests - len(valid_requests))
+metrics = Metrics()
+metrics.counter('http_requests_total', 'HTTP requests by method, route and status')
+metrics.histogram('http_request_duration_seconds', 'HTTP request latency by method and route')
+metrics.counter('http_request_bytes_total', 'Request body bytes received by route')
+metrics.counter('http_response_bytes_total', 'Response bytes sent by route')
+metrics.gauge('http_requests_in_flight', 'Requests currently being handled')
+metrics.histogram('lock_wait_seconds', 'Time spent waiting to acquire a lock')
+metrics.histogram('lock_hold_seconds', 'Time a lock was held (outermost acquire)')
+metrics.histogram('save_data_seconds', 'Time to persist one transaction (enqueue + group commit wait)')
+metrics.gauge('process_threads', 'Active Python threads', threading.active_count)
+
+class _CountingWriter:
+    """غلاف wfile يعدّ البايتات المرسلة (للقياسات)"""
+    __slots__ = ('raw', 'bytes')
 
-rate_limiter = RateLimiter()
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes = 0
+
+    def write(self, data):
+        self.bytes += len(data)
+        return self.raw.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+def instrumented(method):
+    """عدد الطلبات والحالة وزمن الاستجابة والبايتات لكل مسار"""
+    def wrapper(self):
+        if not isinstance(self.wfile, _CountingWriter):
+            self.wfile = _CountingWriter(self.wfile)
+        sent_before = self.wfile.bytes
+        self.status_code = None
+        self.sendfile_bytes = 0
+        metrics.inc('http_requests_in_flight')
+        started = time.perf_counter()
+        try:
+            return method(self)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.inc('http_requests_in_flight', amount=-1)
+            route = self.metrics_route()
+            labels = (('method', self.command), ('route', route))
+            metrics.observe('http_request_duration_seconds', labels, elapsed)
+            metrics.inc('http_requests_total', labels + (('status', str(self.status_code or 0)),))
+            received = int(self.headers.get('Content-Length') or 0) if self.command == 'POST' else 0
+            if received:
+                metrics.inc('http_request_bytes_total', (('route', route),), received)
+            metrics.inc('http_response_bytes_total', (('route', route),),
+                        self.wfile.bytes - sent_before + self.sendfile_bytes)
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
 
 # ==========================================
 # إدارة البيانات مع Thread Safety
 # ==========================================
-data_lock = threading.Lock()
+data_lock = InstrumentedLock(threading.RLock(), metrics, 'data_lock')
+
+def open_storage(backend=STORAGE_BACKEND, durability=JOURNAL_DURABILITY):
+    return create_storage(backend, DATA_FILE, SQLITE_FILE,
+                          durability=durability, commit_window=JOURNAL_COMMIT_WINDOW)
+
+storage = open_storage()
+store = OrderStore()
+events = EventBroker()
+analytics = SalesAnalytics(os.path.join(ARCHIVE_DIR, 'analytics.json'))
+metrics.gauge('storage_queue_depth', 'Change records waiting for the group commit',
+              lambda: storage.get_stats()['queue_depth'])
+metrics.gauge('store_version', 'Current OrderStore data version', lambda: store.version)
+
+def get_store():
+    """المخزن المفهرس؛ يُحمَّل عند أول استخدام من اللقطة + السجل"""
+    if not store.loaded:
+        with data_lock:
+            if not store.loaded:
+                store.load(storage.load())
+                analytics.load(store)
+    return store
 
 def load_data():
     cached = cache.get('data')
     if cached:
         return cached
     
-    with data_lock:
-        if os.path.exists(DATA_FILE):
-            try:
-                with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    cache.set('data', data)
-                    return data
-            except (json.JSONDecodeError, IOError) as e:
-                print(f'⚠️ خطأ في قراءة البيانات: {e}')
-        
-        default_data = {
-            'orders': [],
-            'tables': [{'id': i, 'status': 'available', 'currentOrder': None} for i in range(1, 11)]
-        }
-        cache.set('data', default_data)
-        return default_data
-
-def save_data(data):
-    with data_lock:
-        try:
-            # كتابة آمنة - ملف مؤقت أولاً
-            temp_file = DATA_FILE + '.tmp'
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            os.replace(temp_file, DATA_FILE)
-            cache.set('data', data)
-            cache.invalidate('orders')
-            cache.invalidate('tables')
-        except IOError as e:
-            print(f'⚠️ خطأ في حفظ البيانات: {e}')
-            raise
+    data = get_store().to_data()
+    cache.set('data', data)
+    return data
 
-# متغير لتتبع حالة النشر
-deploy_status = {'running': False, 'output': '', 'success': None}
-deploy_lock = threading.Lock()
+def save_data(changes, version):
+    """on_commit للمخزن: حفظ التعديلات عبر خلفية التخزين ثم تحديث التحليلات والبث
 
-def run_deploy(site_id=None, template_id=None):
-    """تنفيذ أمر النشر في الخلفية مع دعم القوالب"""
-    global deploy_status
-    with deploy_lock:
-        deploy_status = {'running': True, 'output': 'جاري النشر...', 'success': None}
-    
+    يُستدعى بعد كل معاملة وأقفال الكيانات ما زالت محجوزة. data_lock يحمي فقط
+    إدخال التعديلات في طابور الكتابة؛ انتظار الكتابة المجمّعة (group commit) يتم خارجه.
+    أي فشل في الحفظ يُرفع كـ StorageError: المعاملة تُلغى في الذاكرة والمعالج يرد بـ 500.
+    """
+    started = time.perf_counter()
     try:
-        # تحديد مجلد النشر حسب القالب
-        public_dir = PROJECT_DIR
-        if template_id and template_id != 'current':
-            template_path = os.path.join(PROJECT_DIR, 'templates', template_id)
-            if os.path.exists(template_path):
-                public_dir = template_path
-        
-        # إنشاء firebase.json مؤقت للنشر إذا كان قالب مختار
-        temp_firebase_json = None
-        temp_firebaserc = None
-        if template_id and template_id != 'current' and public_dir != PROJECT_DIR:
-            temp_firebase_json = os.path.join(public_dir, 'firebase.json')
-            temp_firebaserc = os.path.join(public_dir, '.firebaserc')
-            
-            # إنشاء firebase.json مع target صحيح
-            target_name = site_id if site_id else 'default-site'
-            firebase_config = {
-                "hosting": {
-                    "target": target_name,
-                    "public": ".",
-                    "ignore": ["firebase.json", ".firebaserc", "**/.*", "**/node_modules/**"],
-                    "rewrites": [{"source": "**", "destination": "/index.html"}]
-                }
-            }
-            with open(temp_firebase_json, 'w', encoding='utf-8') as f:
-                json.dump(firebase_config, f, ensure_ascii=False, indent=2)
-            
-            # إنشاء .firebaserc لربط الهدف بالموقع
-            firebaserc_config = {
-                "projects": {
-                    "default": "restaurant-system-demo"
-                },
-                "targets": {
-                    "restaurant-system-demo": {
-                        "hosting": {
-                            target_name: [site_id if site_id else "restaurant-system-demo"]
-                        }
-                    }
-                }
-            }
-            with open(temp_firebaserc, 'w', encoding='utf-8') as f:
-                json.dump(firebaserc_config, f, ensure_ascii=False, indent=2)
-            
-            # نسخ ملفات JS الضرورية للقالب
-            js_src = os.path.join(PROJECT_DIR, 'js')
-            js_dest = os.path.join(public_dir, 'js')
-            css_src = os.path.join(PROJECT_DIR, 'css')
-            css_dest = os.path.join(public_dir, 'css')
-            
-            import shutil
-            if os.path.exists(js_src) and not os.path.exists(js_dest):
-                shutil.copytree(js_src, js_dest)
-            if os.path.exists(css_src) and not os.path.exists(css_dest):
-                shutil.copytree(css_src, css_dest)
-            
-            # نسخ ملفات HTML الأساسية
-            essential_files = ['login-restaurant.html', 'admin.html', 'cashier.html', 
-                              'waiter.html', 'menu.html', 'store.html', 'store-admin.html',
-                              'inventory.html', 'profile.html']
-            for ef in essential_files:
-                src_file = os.path.join(PROJECT_DIR, ef)
-                dest_file = os.path.join(public_dir, ef)
-                if os.path.exists(src_file) and not os.path.exists(dest_file):
-                    shutil.copy2(src_file, dest_file)
-        
-        # بناء أمر النشر
-        if site_id:
-            # نشر إلى موقع محدد
-            cmd = f'firebase deploy --only hosting:{site_id} --project restaurant-system-demo'
-        else:
-            cmd = 'firebase deploy --only hosting --project restaurant-system-demo'
-        
-        result = subprocess.run(
-            cmd,
-            shell=True,
-            cwd=public_dir,
-            capture_output=True,
-            text=True,
-            timeout=180
-        )
-        
-        output = result.stdout + result.stderr
-        success = result.returncode == 0
-        
-        # تنظيف الملفات المؤقتة
-        if temp_firebase_json and os.path.exists(temp_firebase_json):
-            os.remove(temp_firebase_json)
-        if temp_firebaserc and os.path.exists(temp_firebaserc):
-            os.remove(temp_firebaserc)
-        
-        with deploy_lock:
-            deploy_status = {
-                'running': False,
-                'output': output,
-                'success': success,
-                'siteId': site_id,
-                'templateId': template_id
-            }
-        
-    except subprocess.TimeoutExpired:
-        with deploy_lock:
-            deploy_status = {
-                'running': False,
-                'output': 'انتهت مهلة النشر (أكثر من 3 دقائق)',
-                'success': False
-            }
+        with data_lock:
+            ticket = storage.enqueue(changes)
+        storage.wait(ticket)
     except Exception as e:
-        with deploy_lock:
-            deploy_status = {
-                'running': False,
-                'output': f'خطأ: {str(e)}',
-                'success': False
-            }
+        print(f'⚠️ خطأ في حفظ البيانات: {e}')
+        raise StorageError(str(e)) from e
+    finally:
+        metrics.observe('save_data_seconds', (), time.perf_counter() - started)
+    # بعد الحفظ فقط: التحليلات وعملاء /api/events لا يرون تعديلاً لم يُكتب
+    analytics.apply(changes)
+    events.publish_changes(changes, version=version)
+    # الإصدار (store.version) تغيّر مع التعديل؛ كاش الترميز يُبطل نفسه تلقائياً
+    cache.invalidate('data')
 
+store.on_commit = save_data  # كل معاملة ناجحة تُكتب في السجل وتُبث
 
-def list_hosting_sites(project_id=None):
-    """إرجاع قائمة مواقع Firebase Hosting عبر firebase-tools.
+# الطلبات المكتملة القديمة تُنقل لملفات يومية مضغوطة؛ المخزن الحي للطلبات النشطة فقط
+order_archive = OrderArchive(ARCHIVE_DIR)
+archiver = Archiver(store, order_archive, after_hours=ARCHIVE_AFTER_HOURS, interval=ARCHIVE_INTERVAL)
 
-    ملاحظة: في حال عدم وجود مشروع نشط في Firebase CLI، مرّر project_id.
+# ==========================================
+# بيانات كل مطعم: مخزن وسجل وقفل وكاش مستقلة (/api/<restaurantId>/...)
+# ==========================================
+def open_tenant_storage(directory):
+    """نفس خلفية التخزين ووضع المتانة للمخزن الرئيسي، داخل مجلد المطعم"""
+    return create_storage(storage.name, os.path.join(directory, DATA_FILE), os.path.join(directory, SQLITE_FILE),
+                          durability=storage.durability, commit_window=JOURNAL_COMMIT_WINDOW)
+
+def load_known_restaurants():
+    """معرفات المطاعم في initial-data.json (restaurant-system.restaurants)"""
+    try:
+        with open(os.path.join(PROJECT_DIR, INITIAL_DATA_FILE), 'r', encoding='utf-8') as f:
+            restaurants = json.load(f).get('restaurant-system', {}).get('restaurants')
+    except (OSError, ValueError, AttributeError) as e:
+        print(f'⚠️ تعذر قراءة المطاعم من {INITIAL_DATA_FILE}: {e}')
+        return frozenset()
+    return frozenset(restaurants) if isinstance(restaurants, dict) else frozenset()
+
+KNOWN_RESTAURANTS = load_known_restaurants()
+
+def tenant_provisioned(tenant_id):
+    """مطعم معروف: في initial-data.json، أو له مجلد بيانات (التجهيز اليدوي: mkdir tenants/<id>)
+
+    أي معرّف آخر يُرد عليه بـ 404 دون إنشاء مجلد أو فتح خلفية تخزين.
     """
-    cache_key = f"hosting_sites:{project_id or 'default'}"
-    # كاش بسيط لتقليل استدعاء CLI
-    cached = cache.get(cache_key)
-    if cached is not None:
-        return cached
+    return tenant_id in KNOWN_RESTAURANTS or os.path.isdir(os.path.join(TENANTS_DIR, tenant_id))
 
+tenants = TenantRegistry(TENANTS_DIR, open_tenant_storage, JsonResponseCache, tenant_provisioned,
+                         idle_timeout=TENANT_IDLE_TIMEOUT, max_loaded=MAX_LOADED_TENANTS)
+
+# المقطع الأول لمسارات API الموجودة لا يُعامل كمعرّف مطعم
+RESERVED_API_SEGMENTS = {'orders', 'tables', 'analytics', 'reports', 'data', 'events', 'deploy',
+                         'hosting', 'health', 'stats', 'templates'}
+TENANT_PATH_RE = re.compile(r'^/api/([^/]+)(/orders(?:/update|/delete)?|/tables(?:/update|/count)?)$')
+
+# جدول مسارات API المعروفة لكل طريقة: تسمية القياسات تأتي منه لا من حالة الرد،
+# فمسار عشوائي (400/429/404) لا يُنشئ قيمة تسمية جديدة
+API_ROUTES = {
+    'GET': frozenset({'/api/orders', '/api/orders/history', '/api/tables', '/api/analytics', '/api/reports',
+                      '/api/data', '/api/events', '/api/deploy/status', '/api/hosting/sites', '/api/health',
+                      '/api/stats', '/api/templates', '/metrics'}),
+    'POST': frozenset({'/api/orders', '/api/orders/update', '/api/orders/delete', '/api/tables/update',
+                       '/api/tables/count', '/api/analytics/rebuild', '/api/deploy'}),
+}
+API_ROUTES['OPTIONS'] = API_ROUTES['GET'] | API_ROUTES['POST']
+
+def tenant_route(path):
+    """/api/<restaurantId>/orders/update -> (restaurantId, '/api/orders/update')؛ None للمخزن الرئيسي"""
+    match = TENANT_PATH_RE.match(path)
+    if match is None or match.group(1) in RESERVED_API_SEGMENTS or not tenants.is_known(match.group(1)):
+        return None
+    return match.group(1), '/api' + match.group(2)
+
+@contextmanager
+def store_for(tenant_id):
+    """المخزن الرئيسي (tenant_id=None) أو مخزن المطعم للكتابة، محجوزاً من الإغلاق طوال الكتلة"""
+    if tenant_id is None:
+        yield get_store()
+        return
+    with tenants.use(tenant_id, create=True) as tenant:
+        yield tenant.store
+
+def tenant_read(tenant_id, path, query):
+    """قراءة من بيانات مطعم: رد مرمّز من كاش المطعم، أو dict لاستعلام مصفّى
+
+    في وضع --workers تُنفذ في المالك وحده: شرائح المطاعم لا تُنسخ للعمال كالمخزن
+    الرئيسي، فقراءاتها لا تتدرج مع عدد العمال وتدفع كلفة IPC
+    (benchmarks/bench_workers.py --tenant).
+    """
+    with tenants.use(tenant_id) as tenant:
+        store = tenant.store
+        if path == '/api/tables':
+            return tenant.responses.get('tables', lambda: store.version, store.list_tables)
+        if query:
+            return query_orders(parse_qs(query), store)
+        return tenant.responses.get('orders', lambda: store.version, store.list_orders)
+
+def rebuild_analytics():
+    """إعادة حساب التحليلات من الصفر (المخزن الحي + كل الأرشيف) للاسترجاع"""
+    analytics.rebuild(get_store(), order_archive.iter_orders())
+    json_cache.invalidate('analytics')
+
+MAX_PAGE_SIZE = 500  # أقصى عدد طلبات في صفحة واحدة
+
+def _parse_id(value):
+    """معرفات الطاولات/الطلبات أرقام في البيانات ونصوص في الرابط"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+def query_orders(qs, store=None):
+    """/api/orders?status=&tableId=&from=&to=&limit=&cursor=&since=
+
+    - since=<version>: الطلبات المتغيرة بعد الإصدار فقط + المحذوفة
+    - status يقبل عدة قيم مفصولة بفاصلة
+    - from/to على createdAt (تاريخ YYYY-MM-DD أو ISO كامل، to شامل لليوم)
+    """
+    first = lambda key: (qs.get(key) or [None])[0]
+    if store is None:
+        store = get_store()
+
+    since = first('since')
+    if since is not None:
+        return store.changes_since(int(since))
+
+    statuses = [s for s in (first('status') or '').split(',') if s] or None
+    table_id = first('tableId')
+    created_to = first('to')
+    if created_to and len(created_to) == 10:
+        created_to += 'T23:59:59.999Z'
+    limit = first('limit')
+    limit = min(int(limit), MAX_PAGE_SIZE) if limit else None
+    if limit is not None and limit <= 0:
+        raise ValueError('limit')
+    cursor = first('cursor')
+
+    orders, next_cursor = store.query_orders(
+        statuses=statuses,
+        table_id=_parse_id(table_id) if table_id is not None else None,
+        created_from=first('from'),
+        created_to=created_to,
+        limit=limit,
+        cursor=int(cursor) if cursor else None
+    )
+    return {'orders': orders, 'nextCursor': next_cursor, 'version': store.version}
+
+# ==========================================
+# النشر: طابور متوازي محدود مع تجهيز تدريجي (deploy.py)
+# ==========================================
+deployer = DeployQueue(PROJECT_DIR, max_parallel=DEPLOY_PARALLELISM)
+
+def run_deploy(site_id=None, template_id=None, force=False):
+    """إضافة نشر (مع دعم القوالب) لطابور النشر؛ تُرجع (job, خطأ)"""
+    return deployer.submit(site_id, template_id, force=force)
+
+
+HOSTING_SITES_TTL = 60  # عمر قائمة المواقع قبل تحديثها في الخلفية
+
+def fetch_hosting_sites(project_id=None):
+    """جلب قائمة مواقع Firebase Hosting عبر firebase-tools (بطيء: يُستدعى من hosting_sites فقط)
+
+    ملاحظة: في حال عدم وجود مشروع نشط في Firebase CLI، مرّر project_id.
+    """
     # محاولة JSON أولاً
-    if project_id:
-        cmd_candidates = [
-            f'firebase hosting:sites:list --project {project_id} --json',
-            f'firebase hosting:sites:list --project {project_id}'
-        ]
-    else:
-        cmd_candidates = [
-            'firebase hosting:sites:list --json',
-            'firebase hosting:sites:list'
-        ]
+    project_args = ('--project', project_id) if project_id else ()
+    cmd_candidates = [
+        firebase_command(deployer.firebase_cli, 'hosting:sites:list', *project_args, '--json'),
+        firebase_command(deployer.firebase_cli, 'hosting:sites:list', *project_args)
+    ]
 
     last_error = None
     for cmd in cmd_candidates:
         try:
             result = subprocess.run(
                 cmd,
-                shell=True,
                 cwd=PROJECT_DIR,
                 capture_output=True,
                 text=True,
@@ -354,10 +454,9 @@ def list_hosting_sites(project_id=None):
             combined = (stdout + '\n' + stderr).strip()
 
             if result.returncode != 0:
-                last_error = combined or f'فشل تنفيذ الأمر: {cmd}'
+                last_error = combined or f"فشل تنفيذ الأمر: {' '.join(cmd)}"
                 # إذا كان خطأ في الصلاحيات، لا نحاول المزيد
                 if 'Permission' in combined or '403' in combined or 'denied' in combined.lower():
-                    cache.set(cache_key, [])
                     raise RuntimeError('لا توجد صلاحيات للوصول إلى Firebase Hosting. يرجى تسجيل الدخول إلى Firebase CLI باستخدام: firebase login')
                 continue
 
@@ -392,7 +491,6 @@ def list_hosting_sites(project_id=None):
 
             if not sites:
                 # Parse النص: التقط كلمات شبيهة بمعرفات المواقع (a-z0-9-)
-                import re
                 # تجنب التقاط روابط web.app أو firebaseapp.com
                 for line in combined.splitlines():
                     line = line.strip()
@@ -413,22 +511,181 @@ def list_hosting_sites(project_id=None):
                 seen.add(s)
                 cleaned.append(s)
 
-            cache.set(cache_key, cleaned)
             return cleaned
 
+        except RuntimeError:
+            raise
         except Exception as e:
             last_error = str(e)
             continue
 
-    # فشل كل المحاولات
-    cache.set(cache_key, [])
+    # فشل كل المحاولات: لا يُخزَّن شيء، والمحاولة التالية بعد backoff
     error_msg = last_error or 'تعذر جلب مواقع الاستضافة'
     # تحسين رسالة الخطأ
     if 'Permission' in error_msg or '403' in error_msg or 'denied' in error_msg.lower():
         error_msg = 'لا توجد صلاحيات للوصول إلى Firebase Hosting. يرجى تسجيل الدخول إلى Firebase CLI.'
     raise RuntimeError(error_msg)
 
+# آخر قائمة ناجحة لكل project_id تُخدم فوراً، وتُحدَّث في الخلفية (single-flight + backoff)
+hosting_sites = BackgroundRefresher(fetch_hosting_sites, name='hosting-sites', fresh_ttl=HOSTING_SITES_TTL)
+
+def known_firebase_projects():
+    """مشاريع Firebase المسموح بجلب مواقعها: مشروع النشر + المشاريع المعرّفة في .firebaserc"""
+    projects = {deployer.project}
+    try:
+        with open(os.path.join(PROJECT_DIR, '.firebaserc'), 'r', encoding='utf-8') as f:
+            firebaserc = json.load(f)
+    except (OSError, ValueError):
+        return projects
+    if isinstance(firebaserc, dict):
+        aliases = firebaserc.get('projects')
+        if isinstance(aliases, dict):
+            projects.update(p for p in aliases.values() if isinstance(p, str))
+        targets = firebaserc.get('targets')
+        if isinstance(targets, dict):
+            projects.update(targets)
+    return projects
+
+def list_hosting_sites(project_id=None):
+    """(sites, meta) من الذاكرة دون انتظار firebase؛ RefreshError إذا لم تنجح أي عملية جلب بعد"""
+    return hosting_sites.get(project_id)
+
+# ==========================================
+# العمليات التي تملكها عملية واحدة (المالك في وضع --workers)
+# ==========================================
+state_owner = None  # في المالك: StateOwner (يبث التعديلات للعمال)
+owner_link = None  # في العامل: WorkerLink (قناة العامل إلى المالك)
+
+def _store_op(method):
+    """عملية مخزن تُنفذ في المالك؛ التعديلات تصل للعمال بالبث لا بالرد"""
+    def op(tenant_id, *args):
+        with store_for(tenant_id) as target:
+            getattr(target, method)(*args)
+    return op
+
+def _update_status_op(tenant_id, order_id, new_status, expected_version):
+    """تغيير الحالة؛ تُرجع إصدار الطلب الجديد (لاستخدامه كـ expectedVersion)"""
+    with store_for(tenant_id) as target:
+        target.update_status(order_id, new_status, expected_version=expected_version)
+        return target.order_version(order_id)
+
+def _rebuild_analytics_op():
+    rebuild_analytics()
+    if state_owner is not None:
+        state_owner.broadcast('analytics', analytics.export_base())
+    return analytics.get_stats()
+
+def _deploy_op(site_id, template_id, force):
+    job, error = run_deploy(site_id, template_id, force=force)
+    return (job.snapshot() if job is not None else None), error
+
+def _deploy_status_op(site_id=None):
+    """?site= لحالة موقع محدد، وبدونه آخر نشر (+ كل المواقع في jobs)"""
+    status = deployer.status(site_id)
+    if not site_id:
+        status['jobs'] = deployer.all_status()
+    return status
+
+def shared_stats():
+    """إحصائيات ما يملكه المالك: التخزين والأرشفة والنشر وقائمة المواقع"""
+    return {
+        'storage': storage.get_stats(),
+        'archive': archiver.get_stats(),
+        'deploy': deployer.get_stats(),
+        'hosting_sites': hosting_sites.get_stats(),
+        'tenants': tenants.get_stats(),
+        'owner': state_owner.get_stats() if state_owner is not None else None
+    }
+
+# كل التعديلات وكل ما له حالة واحدة مشتركة (النشر، مواقع الاستضافة) يمر من هنا
+OWNER_OPS = {
+    'add_order': _store_op('add_order'),
+    'update_status': _update_status_op,
+    'update_table': _store_op('update_table'),
+    'set_table_count': _store_op('set_table_count'),
+    'delete_order': _store_op('delete_order'),
+    'tenant_read': tenant_read,
+    'rebuild_analytics': _rebuild_analytics_op,
+    'deploy': _deploy_op,
+    'deploy_status': _deploy_status_op,
+    'hosting_sites': list_hosting_sites,
+    'stats': shared_stats,
+}
+
+def owner_call(op, *args):
+    """تنفيذ عملية المالك: مباشرة في العملية الواحدة، أو عبر IPC من العامل
+
+    في العامل تعود الدالة بعد أن تصل تعديلات العملية لنسخته المحلية.
+    """
+    if owner_link is None:
+        return OWNER_OPS[op](*args)
+    return owner_link.call(op, *args)
+
+def publish_and_save(changes, version):
+    """on_commit في المالك: الحفظ أولاً ثم البث للعمال بترتيب الإصدار
+
+    نسخ العمال (وعملاء SSE عندهم) لا ترى تعديلاً لم يُكتب. إذا فشل الحفظ يُبث
+    الإصدار فارغاً حتى لا يتوقف التسلسل؛ المعاملة المعاكسة تأخذ إصداراً تالياً
+    وتمر من هنا كأي معاملة.
+    """
+    try:
+        save_data(changes, version)
+    except Exception:
+        state_owner.publish([], version)
+        raise
+    state_owner.publish(changes, version)
+
+def apply_replicated(changes, version):
+    """on_commit في نسخة العامل: ما يلي الحفظ في save_data فقط (المالك كتب السجل)"""
+    analytics.apply(changes)
+    events.publish_changes(changes, version=version)
+    cache.invalidate('data')
+
+def on_owner_message(kind, payload):
+    if kind == 'analytics':
+        # أساس التحليلات أُعيد بناؤه في المالك
+        analytics.load_base(payload, get_store())
+        json_cache.invalidate('analytics')
+
+@contextmanager
+def fork_quiesce():
+    """كل الأقفال التي يرثها العامل ويستخدمها، محجوزة أثناء fork
+
+    أقفال الكيانات أولاً (لا معاملة جارية)، ثم بنفس ترتيب حجزها في بقية الكود:
+    data_lock ثم json_cache (منتِجه يقرأ المخزن) ثم بنية المخزن ثم الأقفال الطرفية.
+    أقفال السجل والنشر والتحديث في الخلفية لا تُستخدم إلا في المالك.
+    """
+    with ExitStack() as stack:
+        stack.enter_context(store.transaction(all_tables=True))
+        for lock in (data_lock, json_cache.lock, store.lock, analytics.lock, *cache.locks(), tenants.lock):
+            stack.enter_context(lock)
+        yield
+
+def run_worker(link):
+    """عملية HTTP عاملة (بعد fork): تقرأ من نسختها وترسل كل تعديل للمالك"""
+    global owner_link
+    owner_link = link
+    store.on_commit = apply_replicated
+    analytics.base_path = None  # المالك وحده يكتب أساس التحليلات
+    metrics.reset()
+    events.after_fork()
+
+    def owner_lost():
+        print(f'⚠️ انقطع الاتصال بالعملية المالكة؛ إيقاف العامل {os.getpid()}')
+        os._exit(1)
+
+    link.on_changes = store.apply_changes
+    link.on_message = on_owner_message
+    link.on_lost = owner_lost
+    link.start(store.version)
+    server.serve_forever()
+
 class RestaurantHandler(BaseHTTPRequestHandler):
+    timeout = CONNECTION_TIMEOUT  # لا يحجز عميل بطيء عاملاً للأبد
+    rate_limit = None  # نتيجة فحص الحد للطلب الحالي
+    status_code = None  # للقياسات
+    sendfile_bytes = 0  # بايتات أُرسلت عبر sendfile خارج wfile
+    
     # تعطيل السجلات لتحسين الأداء
     def log_message(self, format, *args):
         pass  # يمكن تفعيلها للتصحيح
@@ -440,91 +697,156 @@ class RestaurantHandler(BaseHTTPRequestHandler):
             return forwarded.split(',')[0].strip()
         return self.client_address[0]
     
+    def send_response(self, code, message=None):
+        self.status_code = code
+        super().send_response(code, message)
+    
+    def metrics_route(self):
+        """تسمية المسار في القياسات: مسار من API_ROUTES أو unmatched، والباقي static (عدد محدود من القيم)"""
+        path = urlparse(self.path).path
+        route = tenant_route(path)
+        if route is not None:
+            # معرّف المطعم لا يدخل في التسمية (عدد القيم يبقى ثابتاً مهما زاد المطاعم)
+            return '/api/{restaurant}' + route[1][len('/api'):]
+        if path.startswith('/api/') or path == '/metrics':
+            return path if path in API_ROUTES.get(self.command, ()) else 'unmatched'
+        return 'static'
+    
     def check_rate_limit(self):
-        ip = self.get_client_ip()
-        if not rate_limiter.is_allowed(ip):
+        path = urlparse(self.path).path
+        if path == '/api/events':
+            route = 'events'
+        elif path.startswith('/api/'):
+            route = 'api'
+        else:
+            route = 'static'
+        self.rate_limit = rate_limiter.check(self.get_client_ip(), route, RATE_LIMIT_COSTS.get(path, 1))
+        if not self.rate_limit.allowed:
             self.send_error_json(429, 'تم تجاوز حد الطلبات المسموحة')
             return False
         return True
     
+    def end_headers(self):
+        # ترويسات X-RateLimit-* لكل رد بعد فحص الحد
+        rate_limit = self.rate_limit
+        if rate_limit is not None:
+            self.send_header('X-RateLimit-Limit', rate_limit.limit)
+            self.send_header('X-RateLimit-Remaining', rate_limit.remaining)
+            self.send_header('X-RateLimit-Reset', rate_limit.reset)
+            if not rate_limit.allowed:
+                self.send_header('Retry-After', rate_limit.reset)
+        super().end_headers()
+    
     def send_error_json(self, code, message):
         try:
             self.send_response(code)
+            content = json.dumps({'error': message}, ensure_ascii=False).encode('utf-8')
             self.send_header('Content-Type', 'application/json; charset=utf-8')
             self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Content-Length', len(content))
             self.end_headers()
-            self.wfile.write(json.dumps({'error': message}, ensure_ascii=False).encode('utf-8'))
+            self.wfile.write(content)
             self.wfile.flush()
         except (ConnectionAbortedError, BrokenPipeError, OSError):
             pass  # الاتصال انقطع
         except Exception as e:
             print(f'⚠️ خطأ في إرسال error JSON: {e}')
     
+    @instrumented
     def do_GET(self):
         if not self.check_rate_limit():
             return
         
         parsed = urlparse(self.path)
+        route = tenant_route(parsed.path)
         
-        if parsed.path == '/api/orders':
-            cached = cache.get('orders')
-            if cached:
-                self.send_json(cached)
+        if route is not None:
+            # /api/<restaurantId>/orders|tables من بيانات المطعم
+            if route[1] in ('/api/orders', '/api/tables'):
+                self.send_tenant_json(route[0], route[1], parsed.query)
             else:
-                orders = load_data()['orders']
-                cache.set('orders', orders)
-                self.send_json(orders)
+                self.send_error(404)
+        elif parsed.path == '/api/orders' and parsed.query:
+            # تصفية وترقيم صفحات ودلتا (since) بدلاً من كل السجل
+            try:
+                self.send_json(query_orders(parse_qs(parsed.query)))
+            except ValueError:
+                self.send_error_json(400, 'معاملات استعلام غير صالحة')
+        elif parsed.path == '/api/orders/history':
+            self.send_order_history(parse_qs(parsed.query))
+        elif parsed.path == '/api/orders':
+            self.send_versioned_json('orders', get_store().list_orders, lambda snap: snap.orders)
         elif parsed.path == '/api/tables':
-            cached = cache.get('tables')
-            if cached:
-                self.send_json(cached)
-            else:
-                tables = load_data()['tables']
-                cache.set('tables', tables)
-                self.send_json(tables)
+            self.send_versioned_json('tables', get_store().list_tables)
+        elif parsed.path == '/api/analytics':
+            self.send_versioned_json('analytics', lambda: analytics.report(len(get_store().list_tables())))
+        elif parsed.path == '/api/reports':
+            try:
+                self.send_report(parse_qs(parsed.query))
+            except ValueError:
+                self.send_error_json(400, 'معاملات التقرير غير صالحة')
         elif parsed.path == '/api/data':
-            self.send_json(load_data())
+            self.send_versioned_json('data', get_store().to_data,
+                                     lambda snap: {'orders': snap.orders, 'tables': snap.tables})
+        elif parsed.path == '/api/events':
+            self.open_event_stream(parsed)
         elif parsed.path == '/api/deploy/status':
-            with deploy_lock:
-                self.send_json(deploy_status)
+            site_id = (parse_qs(parsed.query).get('site') or [None])[0]
+            self.send_json(owner_call('deploy_status', site_id))
         elif parsed.path == '/api/hosting/sites':
+            # من الذاكرة فوراً (قد تكون قديمة قليلاً: ageSeconds/stale)، والتحديث في الخلفية
+            qs = parse_qs(parsed.query)
+            project_id = (qs.get('project') or [None])[0]
+            if project_id is not None and project_id not in known_firebase_projects():
+                # كل مشروع جديد يعني مفتاحاً وعمليات firebase في الخلفية؛ المعروفة فقط
+                self.send_json({'success': False, 'error': 'مشروع Firebase غير معروف', 'sites': []}, status=400)
+                return
             try:
-                qs = parse_qs(parsed.query)
-                project_id = (qs.get('project') or [None])[0]
-                sites = list_hosting_sites(project_id=project_id)
-                self.send_json({'success': True, 'sites': sites})
-            except RuntimeError as e:
-                # خطأ في الصلاحيات أو الاتصال بـ Firebase
+                sites, meta = owner_call('hosting_sites', project_id)
+                self.send_json(dict(meta, success=True, sites=sites))
+            except RefreshError as e:
+                # لم تنجح أي عملية جلب بعد (صلاحيات/اتصال/ما زال يجلب)
                 error_msg = str(e)
                 if 'Permission' in error_msg or '403' in error_msg:
                     error_msg = 'لا توجد صلاحيات للوصول إلى Firebase Hosting. يرجى تسجيل الدخول إلى Firebase CLI.'
-                self.send_json({'success': False, 'error': error_msg, 'sites': []})
-            except Exception as e:
-                # خطأ عام
-                error_msg = f'خطأ في جلب المواقع: {str(e)}'
-                print(f'⚠️ {error_msg}')
-                try:
-                    self.send_json({'success': False, 'error': error_msg, 'sites': []})
-                except:
-                    pass  # الاتصال انقطع
+                self.send_json({'success': False, 'error': error_msg, 'sites': [],
+                                'loading': e.loading, 'retryIn': e.retry_in})
+        elif parsed.path == '/metrics':
+            self.send_metrics()
         elif parsed.path == '/api/health':
             # نقطة فحص الصحة المحسّنة
             health_data = {
                 'status': 'healthy',
                 'timestamp': time.time(),
                 'uptime': time.time() - server_start_time if 'server_start_time' in globals() else 0,
+                # في وضع --workers: المتبقي والحد من حصة العامل الذي خدم الطلب
                 'rate_limit_remaining': rate_limiter.get_remaining(self.get_client_ip()),
                 'cache_stats': cache.get_stats(),
                 'connections': {
                     'max_workers': MAX_WORKERS,
-                    'rate_limit': f'{RATE_LIMIT_REQUESTS}/{RATE_LIMIT_WINDOW}s'
+                    'rate_limit': f'{rate_limiter.max_requests}/{RATE_LIMIT_WINDOW}s'
                 }
             }
             self.send_json(health_data)
         elif parsed.path == '/api/stats':
-            # إحصائيات النظام
+            # إحصائيات النظام (ما يملكه المالك يأتي منه في وضع --workers)
+            shared = owner_call('stats')
             self.send_json({
                 'cache': cache.get_stats(),
+                'rate_limit': rate_limiter.get_stats(),
+                'storage': shared['storage'],
+                'archive': shared['archive'],
+                'analytics': analytics.get_stats(),
+                'events': events.get_stats(),
+                'static': static_cache.get_stats(),
+                'json': json_cache.get_stats(),
+                'templates': template_registry.get_stats(),
+                'deploy': shared['deploy'],
+                'assets': asset_builder.get_stats() if asset_builder is not None else None,
+                'hosting_sites': shared['hosting_sites'],
+                'tenants': shared['tenants'],
+                'workers': shared['owner'],
+                'worker': owner_link.get_stats() if owner_link is not None else None,
                 'settings': {
                     'max_workers': MAX_WORKERS,
                     'cache_ttl': CACHE_TTL,
@@ -533,81 +855,104 @@ class RestaurantHandler(BaseHTTPRequestHandler):
                 }
             })
         elif parsed.path == '/api/templates':
-            # جلب قائمة القوالب المتاحة مع الأقسام
+            # قائمة القوالب مع الأقسام من الكتالوج في الذاكرة (يُحدَّث عند تغيّر الملفات)
             try:
-                templates_dir = os.path.join(PROJECT_DIR, 'templates')
-                templates_file = os.path.join(templates_dir, 'templates.json')
-                categories_file = os.path.join(templates_dir, 'categories.json')
-
-                # 1) تحميل القوالب/الأقسام من الملف القديم إن وجد (توافق خلفي)
-                templates_data = {}
-                if os.path.exists(templates_file):
-                    with open(templates_file, 'r', encoding='utf-8') as f:
-                        templates_data = json.load(f) or {}
-
-                templates_list = list(templates_data.get('templates', []) or [])
-
-                # 2) تحميل الأقسام من ملف مستقل إن وجد (الأولوية له)
-                categories_list = list(templates_data.get('categories', []) or [])
-                if os.path.exists(categories_file):
-                    try:
-                        with open(categories_file, 'r', encoding='utf-8') as f:
-                            loaded_categories = json.load(f)
-                        if isinstance(loaded_categories, list):
-                            categories_list = loaded_categories
-                    except Exception:
-                        # لو فشلنا في قراءة categories.json نُبقي على القديم
-                        pass
-
-                # 3) دمج/إضافة القوالب من ملفات template.json داخل كل قالب
-                discovered = {}
-                if os.path.isdir(templates_dir):
-                    for entry in os.listdir(templates_dir):
-                        entry_path = os.path.join(templates_dir, entry)
-                        if not os.path.isdir(entry_path):
-                            continue
-                        template_json = os.path.join(entry_path, 'template.json')
-                        if not os.path.exists(template_json):
-                            continue
-                        try:
-                            with open(template_json, 'r', encoding='utf-8') as f:
-                                tpl = json.load(f)
-                            if isinstance(tpl, dict) and tpl.get('id'):
-                                discovered[str(tpl['id'])] = tpl
-                        except Exception:
-                            continue
-
-                # override existing templates by id, and append new ones
-                merged = []
-                seen_ids = set()
-                for tpl in templates_list:
-                    tpl_id = None
-                    if isinstance(tpl, dict):
-                        tpl_id = tpl.get('id')
-                    if tpl_id and str(tpl_id) in discovered:
-                        merged.append(discovered[str(tpl_id)])
-                        seen_ids.add(str(tpl_id))
-                    else:
-                        merged.append(tpl)
-                        if tpl_id:
-                            seen_ids.add(str(tpl_id))
-
-                for tpl_id, tpl in discovered.items():
-                    if tpl_id not in seen_ids:
-                        merged.append(tpl)
-                        seen_ids.add(tpl_id)
-
-                self.send_json({
-                    'success': True,
-                    'templates': merged,
-                    'categories': categories_list
-                })
+                entry = json_cache.get('templates', template_registry.current_version, template_registry.catalog)
             except Exception as e:
                 self.send_json({'success': False, 'error': str(e), 'templates': [], 'categories': []})
+            else:
+                if not self.send_not_modified(entry.etag):
+                    self.send_json(None, encoded=entry)
         else:
             # خدمة الملفات الثابتة
             self.serve_static_file()
     
+    def open_event_stream(self, parsed):
+        """/api/events: بث SSE؛ الاتصال يُسلَّم لخيط الأحداث ويُحرَّر خيط الطلب فوراً"""
+        last_event_id = self.headers.get('Last-Event-ID')
+        if last_event_id is None:
+            last_event_id = (parse_qs(parsed.query).get('lastEventId') or [None])[0]
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = None
+        
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('X-Accel-Buffering', 'no')
+            self.end_headers()
+            self.wfile.flush()
+        except (ConnectionAbortedError, BrokenPipeError, OSError):
+            return  # الاتصال انقطع
+        
+        self.close_connection = True
+        self.server.hand_off_event_stream(self, last_event_id)
+    
+    def send_metrics(self):
+        """/metrics بصيغة Prometheus النصية (دمج عدّادات الخيوط عند الطلب)"""
+        content = metrics.render().encode('utf-8')
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', METRICS_CONTENT_TYPE)
+            self.send_header('Content-Length', len(content))
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            self.wfile.write(content)
+            self.wfile.flush()
+        except (ConnectionAbortedError, BrokenPipeError, OSError):
+            pass  # الاتصال انقطع
+    
+    def send_tenant_json(self, tenant_id, path, query):
+        """رد من بيانات مطعم (في المالك عند --workers) مع ETag و 304 كالمخزن الرئيسي"""
+        try:
+            result = owner_call('tenant_read', tenant_id, path, query)
+        except ValueError:
+            self.send_error_json(400, 'معاملات استعلام غير صالحة')
+            return
+        except UnknownTenant:
+            self.send_error_json(404, 'مطعم غير معروف')
+            return
+        if isinstance(result, EncodedResponse):
+            if not self.send_not_modified(result.etag):
+                self.send_json(None, encoded=result)
+        else:
+            self.send_json(result)
+    
+    def send_order_history(self, qs):
+        """/api/orders/history?from=&to= - بث الطلبات المؤرشفة كمصفوفة JSON دون تحميل الأقسام"""
+        first = lambda key: (qs.get(key) or [None])[0]
+        created_to = first('to')
+        if created_to and len(created_to) == 10:
+            created_to += 'T23:59:59.999Z'
+        orders = order_archive.iter_orders(first('from'), created_to)
+        self.send_json_stream(iter_json_array(orders, STREAM_CHUNK_SIZE))
+    
+    def send_report(self, qs):
+        """/api/reports?from=&to=&bucket=hour|day|month&status= - تقرير مجمّع على أعمدة
+
+        يشمل الأرشيف (الأقسام ضمن النطاق فقط) + المخزن الحي؛ الرد المرمّز يُحفظ في
+        الكاش لكل استعلام وإصدار بيانات (الأرشفة نفسها تغيّر الإصدار).
+        """
+        first = lambda key: (qs.get(key) or [None])[0]
+        created_from, created_to = first('from'), first('to')
+        bucket = first('bucket') or 'day'
+        status = first('status') or 'completed'
+        statuses = None if status == 'all' else tuple(s for s in status.split(',') if s)
+        snap = get_store().snapshot()
+        key = f'reports:{bucket}:{status}:{created_from}:{created_to}'
+        entry = cache.get(key)
+        if entry is None or entry.version != snap.version:
+            orders = chain(order_archive.iter_orders(created_from, reports.end_of_day(created_to)),
+                           reversed(snap.orders))
+            report = reports.generate(orders, bucket, created_from, created_to, statuses)
+            entry = EncodedResponse(snap.version, json.dumps(report, ensure_ascii=False).encode('utf-8'))
+            cache.set(key, entry)
+        if not self.send_not_modified(entry.etag):
+            self.send_json(None, encoded=entry)
+    
     def serve_static_file(self):
         """خدمة الملفات الثابتة مع كاش"""
         parsed = urlparse(self.path)
@@ -621,40 +966,52 @@ class RestaurantHandler(BaseHTTPRequestHandler):
             path = preferred if os.path.exists(preferred_path) else '/index.html'
         
         file_path = os.path.join(PROJECT_DIR, path.lstrip('/'))
+        if asset_builder is not None:
+            file_path = asset_builder.resolve(path) or file_path
         
-        if not os.path.exists(file_path) or not os.path.isfile(file_path):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            stat = None
+        if stat is None or not os.path.isfile(file_path):
             self.send_error(404)
             return
         
         # تحديد نوع الملف
         content_type = self.guess_content_type(file_path)
         
+        # الصور والخطوط والملفات الكبيرة: بث من القرص بذاكرة ثابتة مع دعم Range
+        if not is_compressible(content_type) or stat.st_size > static_cache.max_entry_bytes:
+            self.serve_file_stream(file_path, stat, content_type)
+            return
+        
         try:
-            with open(file_path, 'rb') as f:
-                content = f.read()
-            
+            asset = static_cache.get(file_path, content_type, stat)
+            # 304 إذا كانت نسخة المتصفح ما زالت صالحة
+            if asset.not_modified(self.headers.get('If-None-Match'), self.headers.get('If-Modified-Since')):
+                self.send_response(304)
+                self.send_header('ETag', asset.etag)
+                self.send_header('Last-Modified', asset.last_modified)
+                self.send_cache_headers(file_path)
+                self.end_headers()
+                return
+            content, encoding, etag = asset.select(self.headers.get('Accept-Encoding', ''))
+
             self.send_response(200)
             self.send_header('Content-Type', content_type)
             self.send_header('Access-Control-Allow-Origin', '*')
-            
-            # Cache headers للملفات الثابتة
-            if any(file_path.endswith(ext) for ext in ['.css', '.js', '.png', '.jpg', '.ico']):
-                self.send_header('Cache-Control', 'public, max-age=3600')
-            else:
-                self.send_header('Cache-Control', 'no-cache')
-            
-            # ضغط الملفات النصية
-            if content_type.startswith('text/') or content_type == 'application/javascript':
-                accept_encoding = self.headers.get('Accept-Encoding', '')
-                if 'gzip' in accept_encoding:
-                    content = gzip.compress(content)
-                    self.send_header('Content-Encoding', 'gzip')
+            self.send_cache_headers(file_path)
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', asset.last_modified)
+            self.send_header('Vary', 'Accept-Encoding')
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
             
             self.send_header('Content-Length', len(content))
             self.end_headers()
             self.wfile.write(content)
             self.wfile.flush()
-        except (ConnectionAbortedError, BrokenPipeError, OSError):
+        except (ConnectionAbortedError, BrokenPipeError):
             pass  # الاتصال انقطع
         except IOError:
             try:
@@ -662,6 +1019,88 @@ class RestaurantHandler(BaseHTTPRequestHandler):
             except:
                 pass  # الاتصال انقطع
     
+    def serve_file_stream(self, file_path, stat, content_type):
+        """بث ملف من القرص دون تحميله في الذاكرة، مع Range/206 و 304"""
+        size = stat.st_size
+        etag = file_etag(stat)
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+        
+        if_none_match = self.headers.get('If-None-Match')
+        if (if_none_match and etag in [t.strip() for t in if_none_match.split(',')]) or \
+                (not if_none_match and self.headers.get('If-Modified-Since') == last_modified):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', last_modified)
+            self.send_cache_headers(file_path)
+            self.end_headers()
+            return
+        
+        byte_range = parse_range(self.headers.get('Range'), size)
+        if_range = self.headers.get('If-Range')
+        if byte_range and if_range and if_range not in (etag, last_modified):
+            byte_range = None  # الملف تغيّر منذ التحميل الجزئي - نرسله كاملاً
+        
+        try:
+            if byte_range is False:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            
+            start, end = byte_range or (0, size - 1)
+            length = end - start + 1 if size else 0
+            with open(file_path, 'rb') as f:
+                self.send_response(206 if byte_range else 200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.send_header('Accept-Ranges', 'bytes')
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', last_modified)
+                self.send_cache_headers(file_path)
+                if byte_range:
+                    self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+                self.send_header('Content-Length', length)
+                self.end_headers()
+                self.send_file_body(f, start, length)
+        except (ConnectionAbortedError, BrokenPipeError, ConnectionResetError):
+            pass  # الاتصال انقطع
+        except IOError:
+            try:
+                self.send_error(500)
+            except:
+                pass  # الاتصال انقطع
+    
+    def send_file_body(self, f, offset, length):
+        """sendfile بدون نسخ عند توفر socket حقيقي، وإلا قطع بحجم ثابت"""
+        self.wfile.flush()
+        if length <= 0:
+            return
+        sendfile = getattr(self.connection, 'sendfile', None)
+        if sendfile is not None:
+            sendfile(f, offset, length)
+            self.sendfile_bytes += length
+            return
+        f.seek(offset)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            self.wfile.write(chunk)
+            remaining -= len(chunk)
+        self.wfile.flush()
+    
+    def send_cache_headers(self, file_path):
+        """Cache headers للملفات الثابتة"""
+        if is_fingerprinted(file_path):
+            # الاسم يتغير مع المحتوى: لا حاجة لإعادة التحقق أبداً
+            self.send_header('Cache-Control', IMMUTABLE_CACHE_CONTROL)
+        elif any(file_path.endswith(ext) for ext in ['.css', '.js', '.png', '.jpg', '.ico']):
+            self.send_header('Cache-Control', 'public, max-age=3600')
+        else:
+            self.send_header('Cache-Control', 'no-cache')
+    
     def guess_content_type(self, path):
         ext = os.path.splitext(path)[1].lower()
         types = {
@@ -680,6 +1119,7 @@ class RestaurantHandler(BaseHTTPRequestHandler):
         }
         return types.get(ext, 'application/octet-stream')
     
+    @instrumented
     def do_POST(self):
         if not self.check_rate_limit():
             return
@@ -699,115 +1139,157 @@ class RestaurantHandler(BaseHTTPRequestHandler):
             self.send_error_json(400, 'بيانات غير صالحة')
             return
         
-        data = load_data()
-        
-        if parsed.path == '/api/orders':
+        # /api/<restaurantId>/orders... نفس العمليات على بيانات المطعم
+        tenant_id, path = tenant_route(parsed.path) or (None, parsed.path)
+        try:
+            self.handle_post(tenant_id, path, body)
+        except StorageError:
+            # التعديل لم يُحفظ وأُلغي في الذاكرة؛ العميل يعيد المحاولة
+            self.send_error_json(500, 'تعذر حفظ التعديل، لم يُطبَّق')
+        except UnknownTenant:
+            self.send_error_json(404, 'مطعم غير معروف')
+    
+    def handle_post(self, tenant_id, path, body):
+        """مسارات POST (tenant_id=None للمخزن الرئيسي)"""
+        if path == '/api/orders':
             # إضافة طلب جديد
             order = body
             order['id'] = int(order.get('id', 0)) or int(__import__('time').time() * 1000)
-            data['orders'].insert(0, order)
-            
-            # تحديث الطاولة
-            table_id = order.get('tableId')
-            for table in data['tables']:
-                if table['id'] == table_id:
-                    table['status'] = 'pending'
-                    table['currentOrder'] = order['id']
-                    break
-            
-            save_data(data)
+            owner_call('add_order', tenant_id, order)
             self.send_json({'success': True, 'order': order})
         
-        elif parsed.path == '/api/orders/update':
-            # تحديث حالة الطلب
+        elif path == '/api/orders/update':
+            # تحديث حالة الطلب؛ expectedVersion اختياري لمنع الكتابة فوق تعديل أحدث
             order_id = body.get('id')
             new_status = body.get('status')
-            
-            for order in data['orders']:
-                if order['id'] == order_id:
-                    order['status'] = new_status
-                    
-                    # تحديث الطاولة
-                    for table in data['tables']:
-                        if table['id'] == order['tableId']:
-                            if new_status == 'completed':
-                                table['status'] = 'available'
-                                table['currentOrder'] = None
-                            elif new_status == 'preparing':
-                                table['status'] = 'occupied'
-                            break
-                    break
-            
-            save_data(data)
-            self.send_json({'success': True})
+            try:
+                version = owner_call('update_status', tenant_id, order_id, new_status, body.get('expectedVersion'))
+            except VersionConflict as e:
+                self.send_json({'success': False, 'error': 'تعارض في الإصدار',
+                                'version': e.actual}, status=409)
+                return
+            self.send_json({'success': True, 'version': version})
         
-        elif parsed.path == '/api/tables/update':
+        elif path == '/api/tables/update':
             # تحديث الطاولة
             table_id = body.get('id')
             updates = body.get('updates', {})
-            
-            for table in data['tables']:
-                if table['id'] == table_id:
-                    table.update(updates)
-                    break
-            
-            save_data(data)
+            owner_call('update_table', tenant_id, table_id, updates)
             self.send_json({'success': True})
         
-        elif parsed.path == '/api/tables/count':
+        elif path == '/api/tables/count':
             # تغيير عدد الطاولات
             count = body.get('count', 10)
-            current = data['tables']
-            new_tables = []
-            for i in range(1, count + 1):
-                existing = next((t for t in current if t['id'] == i), None)
-                if existing:
-                    new_tables.append(existing)
-                else:
-                    new_tables.append({'id': i, 'status': 'available', 'currentOrder': None})
-            data['tables'] = new_tables
-            save_data(data)
+            owner_call('set_table_count', tenant_id, count)
             self.send_json({'success': True})
         
-        elif parsed.path == '/api/orders/delete':
+        elif path == '/api/analytics/rebuild':
+            self.send_json({'success': True, 'analytics': owner_call('rebuild_analytics')})
+        
+        elif path == '/api/orders/delete':
             order_id = body.get('id')
-            data['orders'] = [o for o in data['orders'] if o['id'] != order_id]
-            save_data(data)
+            owner_call('delete_order', tenant_id, order_id)
             self.send_json({'success': True})
         
-        elif parsed.path == '/api/deploy':
+        elif path == '/api/deploy':
             # بدء النشر مع دعم القوالب
             site_id = body.get('siteId')
             template_id = body.get('templateId', 'current')
             
-            with deploy_lock:
-                if deploy_status['running']:
-                    self.send_json({'success': False, 'error': 'النشر قيد التنفيذ حالياً'})
-                    return
-            
-            # تشغيل النشر في خيط منفصل
-            thread = threading.Thread(target=run_deploy, args=(site_id, template_id), daemon=True)
-            thread.start()
+            job, error = owner_call('deploy', site_id, template_id, bool(body.get('force')))
+            if job is None:
+                self.send_json({'success': False, 'error': error})
+                return
             self.send_json({'success': True, 'message': 'بدأ النشر', 'siteId': site_id, 'templateId': template_id})
         
         else:
             self.send_error(404)
     
-    def send_json(self, obj, compress=False):
+    def send_versioned_json(self, endpoint, producer, stream_view=None):
+        """رد JSON من كاش الترميز مع ETag = إصدار البيانات و 304 إن لم يتغير شيء
+
+        إذا كبرت البيانات (STREAM_JSON_MIN_ORDERS) والنقطة تدعم البث، يُرمَّز الرد
+        من لقطة المخزن الثابتة بقطع دون الاحتفاظ بنسخة كاملة في الكاش أو الذاكرة.
+        """
+        store = get_store()
+        if stream_view is not None and len(store) >= STREAM_JSON_MIN_ORDERS:
+            snap = store.snapshot()
+            etag = EncodedResponse.make_etag(snap.version)
+            if not self.send_not_modified(etag):
+                self.send_json_stream(iter_json(stream_view(snap), STREAM_CHUNK_SIZE),
+                                      etag=etag, version=snap.version)
+            return
+        entry = json_cache.get(endpoint, lambda: store.version, producer)
+        if not self.send_not_modified(entry.etag):
+            self.send_json(None, encoded=entry)
+    
+    def send_not_modified(self, etag):
+        """رد 304 إذا كانت نسخة العميل (If-None-Match) مطابقة"""
+        if_none_match = self.headers.get('If-None-Match')
+        if not if_none_match or etag not in [t.strip() for t in if_none_match.split(',')]:
+            return False
+        try:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+        except (ConnectionAbortedError, BrokenPipeError, OSError):
+            pass  # الاتصال انقطع
+        return True
+    
+    def send_json_stream(self, chunks, etag=None, version=None):
+        """بث قطع JSON: chunked لعملاء HTTP/1.1، وجسم ينتهي بإغلاق الاتصال لعملاء HTTP/1.0
+
+        المعالج المتعدد الخيوط يتكلم HTTP/1.0 (بلا keep-alive)، فيُرسل هذا الرد
+        وحده بسطر حالة HTTP/1.1 مع chunked ثم يُغلق الاتصال؛ نواة asyncio تبقيه مفتوحاً.
+        الضغط (gzip) متدفق أيضاً؛ الذاكرة لكل طلب = قطعة واحدة + نافذة zlib.
+        """
+        chunked = self.request_version == 'HTTP/1.1'
+        keep_alive = chunked and self.protocol_version == 'HTTP/1.1'
+        if chunked and not keep_alive:
+            self.protocol_version = 'HTTP/1.1'  # لهذا الاتصال فقط: يُغلق بعد الرد
         try:
-            content = json.dumps(obj, ensure_ascii=False).encode('utf-8')
-            
             self.send_response(200)
             self.send_header('Content-Type', 'application/json; charset=utf-8')
             self.send_header('Access-Control-Allow-Origin', '*')
+            if etag:
+                self.send_header('ETag', etag)
+                self.send_header('X-Data-Version', version)
+            self.send_header('Cache-Control', 'no-cache')
+            if accepts_encoding(self.headers.get('Accept-Encoding', ''), 'gzip'):
+                chunks = gzip_chunks(chunks, JSON_GZIP_LEVEL)
+                self.send_header('Content-Encoding', 'gzip')
+                self.send_header('Vary', 'Accept-Encoding')
+            if chunked:
+                self.send_header('Transfer-Encoding', 'chunked')
+            if not keep_alive:
+                self.send_header('Connection', 'close')
+            self.end_headers()
+            (write_chunked if chunked else write_plain)(self.wfile, chunks)
+            self.wfile.flush()
+        except (ConnectionAbortedError, BrokenPipeError, OSError):
+            self.close_connection = True  # الاتصال انقطع
+    
+    def send_json(self, obj, compress=True, encoded=None, status=200):
+        try:
+            content = encoded.body if encoded else json.dumps(obj, ensure_ascii=False).encode('utf-8')
+            
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Access-Control-Allow-Origin', '*')
             self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
             self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+            if encoded:
+                self.send_header('ETag', encoded.etag)
+                self.send_header('X-Data-Version', encoded.version)
+                self.send_header('Cache-Control', 'no-cache')
             
-            # ضغط الاستجابات الكبيرة
+            # ضغط تلقائي للاستجابات الأكبر من GZIP_MIN_SIZE
             accept_encoding = self.headers.get('Accept-Encoding', '')
-            if compress and 'gzip' in accept_encoding and len(content) > 1024:
-                content = gzip.compress(content)
+            if compress and accepts_encoding(accept_encoding, 'gzip') and len(content) >= GZIP_MIN_SIZE:
+                content = encoded.gzipped() if encoded else gzip.compress(content, compresslevel=JSON_GZIP_LEVEL)
                 self.send_header('Content-Encoding', 'gzip')
+                self.send_header('Vary', 'Accept-Encoding')
             
             self.send_header('Content-Length', len(content))
             self.end_headers()
@@ -820,12 +1302,14 @@ class RestaurantHandler(BaseHTTPRequestHandler):
             # خطأ آخر - تسجيل فقط
             print(f'⚠️ خطأ في إرسال JSON: {e}')
     
+    @instrumented
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         self.send_header('Access-Control-Max-Age', '86400')  # 24 ساعة
+        self.send_header('Content-Length', '0')
         self.end_headers()
 
 
@@ -835,11 +1319,38 @@ class RestaurantHandler(BaseHTTPRequestHandler):
 class ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
     """سيرفر متعدد الخيوط لدعم الطلبات المتزامنة"""
     daemon_threads = True
-    request_queue_size = 100
+    request_queue_size = LISTEN_BACKLOG
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        self.executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='handler')
+        self._detached = set()
+        self._detached_lock = threading.Lock()
+    
+    def process_request(self, request, client_address):
+        """تنفيذ الطلب في المنفذ المحدود بدلاً من خيط جديد لكل اتصال"""
+        self.executor.submit(self.process_request_thread, request, client_address)
+    
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False)
+    
+    def hand_off_event_stream(self, handler, last_event_id):
+        """تسليم اتصال SSE لخيط الأحداث"""
+        self.detach_request(handler.connection)
+        events.subscribe(handler.connection, last_event_id)
+    
+    def detach_request(self, request):
+        """نقل ملكية الاتصال (مثل SSE) بحيث لا يُغلق بعد انتهاء المعالج"""
+        with self._detached_lock:
+            self._detached.add(request)
+    
+    def shutdown_request(self, request):
+        with self._detached_lock:
+            if request in self._detached:
+                self._detached.discard(request)
+                return
+        super().shutdown_request(request)
 
 
 if __name__ == '__main__':
@@ -850,10 +1361,60 @@ if __name__ == '__main__':
     except Exception:
         pass
 
-    port = 3000
-    host = 'localhost'  # استخدام localhost بدلاً من 0.0.0.0
+    parser = argparse.ArgumentParser(description='سيرفر المطعم')
+    parser.add_argument('--host', default='localhost', help='استخدام localhost بدلاً من 0.0.0.0')
+    parser.add_argument('--port', type=int, default=3000)
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='نواة asyncio مع keep-alive بدلاً من خيط لكل اتصال')
+    parser.add_argument('--durability', choices=DURABILITY_MODES, default=JOURNAL_DURABILITY,
+                        help='متى يُرد على التعديل: بعد كتابته (immediate)، بعد كتابة دفعته (batched) أو فور دخوله الطابور (async)')
+    parser.add_argument('--storage', choices=STORAGE_BACKENDS, default=STORAGE_BACKEND,
+                        help=f'خلفية التخزين: json ({DATA_FILE}) أو sqlite ({SQLITE_FILE})')
+    parser.add_argument('--rebuild-analytics', action='store_true',
+                        help='إعادة حساب أساس التحليلات من البيانات المحفوظة وكل الأرشيف ثم الخروج '
+                             '(لسيرفر يعمل الآن: POST /api/analytics/rebuild)')
+    parser.add_argument('--bundle', action='store_true',
+                        help='خدمة الصفحات بأصول مدمجة ومصغّرة ومبصومة (تُبنى في .build وتُحدَّث عند التعديل)')
+    parser.add_argument('--firebase-cli', default=None,
+                        help='أمر firebase للنشر (مثلاً "python benchmarks/firebase_stub.py" للاختبار المحلي)')
+    parser.add_argument('--workers', type=int, default=WORKER_PROCESSES,
+                        help='عدد عمليات HTTP؛ أكثر من 1: عمليات fork تتشارك المنفذ وعملية مالكة واحدة تكتب البيانات. '
+                             'حدود الطلبات لكل IP تُقسم على العمال (كل عامل يطبق حصته في ذاكرته)، '
+                             'فعميل على اتصال keep-alive واحد يحصل على حصة عامل واحد فقط. '
+                             'بيانات المطاعم (/api/<restaurantId>/...) تُقرأ وتُكتب في المالك وحده')
+    args = parser.parse_args()
+    if args.workers > 1 and not can_fork():
+        print('⚠️ --workers يتطلب fork (Linux/macOS)')
+        sys.exit(2)
+    if args.firebase_cli:
+        deployer.firebase_cli = args.firebase_cli
+    if args.bundle:
+        asset_builder = AssetBuilder(PROJECT_DIR, os.path.join(PROJECT_DIR, '.build'))
+        asset_builder.build()
+        print(f'🧱 بناء الأصول: {asset_builder.get_stats()}')
+    if args.storage != STORAGE_BACKEND:
+        storage = open_storage(args.storage, args.durability)
+    storage.durability = args.durability
+
+    if args.rebuild_analytics:
+        # قراءة فقط: سيرفر يعمل على نفس الملفات لا يتأثر (ويطبّق النتيجة عند إعادة تشغيله)
+        snapshot = OrderStore(read_storage(args.storage, DATA_FILE, SQLITE_FILE))
+        analytics.rebuild(snapshot, order_archive.iter_orders())
+        print(f'✅ تمت إعادة حساب التحليلات: {analytics.get_stats()}')
+        sys.exit(0)
+
+    port = args.port
+    host = args.host
     server_start_time = time.time()  # تتبع وقت البدء
-    server = ThreadedHTTPServer((host, port), RestaurantHandler)
+    if args.use_async:
+        # مع --workers: socket واحد يُفتح هنا ويرثه كل عامل
+        listener = socket.create_server((host, port), backlog=LISTEN_BACKLOG) if args.workers > 1 else None
+        server = AsyncHTTPServer(host, port, RestaurantHandler, MAX_WORKERS, MAX_BODY_SIZE, events, sock=listener)
+    else:
+        server = ThreadedHTTPServer((host, port), RestaurantHandler)
+        if args.workers > 1:
+            # كل العمال يُوقَظون لنفس الاتصال؛ من لم يحصل عليه يعود لحلقته بدل انتظار accept
+            server.socket.setblocking(False)
 
     banner = f'''
 ╔════════════════════════════════════════════════════════════════╗
@@ -861,7 +1422,7 @@ if __name__ == '__main__':
 ╠════════════════════════════════════════════════════════════════╣
 ║  🌐 الرابط: http://localhost:{port}                            ║
 ║  📱 للهاتف: http://192.168.1.112:{port}                        ║
-║  ⚡ الخيوط المتزامنة: {MAX_WORKERS}                                 ║
+║  ⚡ الخيوط المتزامنة: {MAX_WORKERS} ({'asyncio' if args.use_async else 'threads'}{f' × {args.workers} workers' if args.workers > 1 else ''})                       ║
 ║  🛡️  Rate Limit: {RATE_LIMIT_REQUESTS} طلب/{RATE_LIMIT_WINDOW} ثانية                       ║
 ║  📦 الكاش: {CACHE_TTL} ثواني (LRU مع إحصائيات)                    ║
 ║  🔧 API: /api/health | /api/stats                             ║
@@ -874,9 +1435,43 @@ if __name__ == '__main__':
         # fallback بسيط بدون رموز/عربي
         print(f"Server started on http://localhost:{port} (UTF-8 output not supported in this console)")
     
+    get_store()
+    template_registry.poll()  # بناء كتالوج القوالب مرة واحدة عند التشغيل
+    if args.workers > 1:
+        # هذه العملية تملك المخزن والسجل والنشر ولا تخدم HTTP؛ العمال يرثون المخزن المحمّل
+        state_owner = StateOwner(OWNER_OPS, store.version, fork_quiesce)
+        store.on_commit = publish_and_save
+        # كل عامل يعدّ الطلبات في ذاكرته: الحد لكل IP يُقسم بينهم
+        rate_limiter.share(args.workers)
+        # العمال الأوائل قبل خيوط الأرشفة والتحديث والمطاعم؛ البدائل لاحقاً تمر بـ fork_quiesce
+        state_owner.spawn(run_worker, args.workers)
+    hosting_sites.start()
+    archiver.start()
+    tenants.start()
+
+    if args.workers > 1:
+        def terminate(signum, frame):
+            raise KeyboardInterrupt
+
+        signal.signal(signal.SIGTERM, terminate)
+        try:
+            state_owner.supervise(run_worker)
+        except KeyboardInterrupt:
+            print('\n👋 تم إيقاف السيرفر')
+            state_owner.stop()
+            archiver.stop()
+            hosting_sites.stop()
+            tenants.close()
+            storage.close()
+        sys.exit(0)
+
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         print('\n👋 تم إيقاف السيرفر')
         print(f'📊 إحصائيات الكاش النهائية: {cache.get_stats()}')
         server.shutdown()
+        archiver.stop()
+        hosting_sites.stop()
+        tenants.close()
+        storage.close()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+خلفية تخزين sqlite3 (مكتبة بايثون القياسية) بوضع WAL
+
+- جداول مفهرسة: orders (حسب الطاولة، الحالة، التاريخ)، order_items (حسب الصنف والفئة) و tables
+- الطلب الكامل محفوظ كـ JSON في عمود data؛ الأعمدة الأخرى للفهارس والاستعلامات فقط
+- السيرفر يقرأ من OrderStore في الذاكرة؛ القاعدة للحفظ فقط عبر اتصال كتابة واحد
+  تحت قفل الخلفية
+- كل دفعة تعديلات (group commit) تُكتب في معاملة sqlite واحدة
+- استيراد لمرة واحدة من restaurant_data.json (+ سجله) عند إنشاء قاعدة فارغة
+
+الاستيراد يدوياً:
+    python sqlite_storage.py import restaurant_data.json restaurant_data.db
+"""
+
+import json
+import os
+import sqlite3
+import sys
+from urllib.parse import quote
+
+from journal import JOURNAL_SUFFIX, default_data, read_data
+from storage import COMMIT_WINDOW, StorageBackend
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    table_id INTEGER,
+    status TEXT,
+    created_at TEXT,
+    total REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_orders_seq ON orders(seq);
+CREATE INDEX IF NOT EXISTS idx_orders_table ON orders(table_id, seq);
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status, seq);
+CREATE INDEX IF NOT EXISTS idx_orders_created ON orders(created_at);
+
+CREATE TABLE IF NOT EXISTS order_items (
+    order_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    item_id INTEGER,
+    name TEXT,
+    category TEXT,
+    price REAL,
+    quantity INTEGER,
+    PRIMARY KEY (order_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_items_item ON order_items(item_id);
+CREATE INDEX IF NOT EXISTS idx_items_category ON order_items(category);
+
+CREATE TABLE IF NOT EXISTS tables (
+    id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    status TEXT,
+    current_order INTEGER,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+'''
+
+
+def _dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+
+def _read_all(conn):
+    return {
+        'orders': [json.loads(row[0]) for row in conn.execute('SELECT data FROM orders ORDER BY seq DESC')],
+        'tables': [json.loads(row[0]) for row in conn.execute('SELECT data FROM tables ORDER BY position')]
+    }
+
+
+def read_database(path, import_from=None, default_factory=default_data):
+    """قراءة فقط (mode=ro) دون إنشاء القاعدة أو الكتابة فيها
+
+    آمنة أثناء عمل السيرفر؛ قاعدة لم تُنشأ بعد تُرجع ما سيستورده السيرفر عند تشغيله.
+    """
+    if os.path.exists(path):
+        conn = sqlite3.connect(f'file:{quote(os.path.abspath(path))}?mode=ro', uri=True)
+        try:
+            if conn.execute("SELECT value FROM meta WHERE key = 'initialized'").fetchone() is not None:
+                return _read_all(conn)
+        except sqlite3.OperationalError:
+            pass  # الجداول لم تُنشأ بعد
+        finally:
+            conn.close()
+    if import_from:
+        return read_data(import_from, default_factory)
+    return default_factory()
+
+
+def connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA foreign_keys=OFF')
+    return conn
+
+
+class SQLiteStorage(StorageBackend):
+    """تخزين الطلبات والطاولات في sqlite مع فهارس (خلفية sqlite)"""
+
+    name = 'sqlite'
+
+    def __init__(self, path, import_from=None, default_factory=default_data,
+                 durability='batched', commit_window=COMMIT_WINDOW):
+        super().__init__(durability, commit_window)
+        self.path = path
+        self.import_from = import_from
+        self.default_factory = default_factory
+        self._writer = None
+        self._next_seq = 0
+
+    # ------------------------------------------
+    # الاتصال
+    # ------------------------------------------
+    def _writer_conn(self):
+        if self._writer is None:
+            self._writer = connect(self.path)
+            # في batched/async الدفعة كلها معاملة واحدة؛ FULL يضمن fsync عند الـ commit
+            self._writer.execute('PRAGMA synchronous=FULL')
+            self._writer.executescript(SCHEMA)
+        return self._writer
+
+    # ------------------------------------------
+    # التحميل
+    # ------------------------------------------
+    def load(self):
+        with self.lock:
+            conn = self._writer_conn()
+            if conn.execute("SELECT value FROM meta WHERE key = 'initialized'").fetchone() is None:
+                self._import_locked(self._initial_data())
+            self._next_seq = conn.execute('SELECT COALESCE(MAX(seq), 0) FROM orders').fetchone()[0]
+            data = _read_all(conn)
+            self.loaded = True
+        return data
+
+    def _initial_data(self):
+        """بيانات قاعدة جديدة: ملف JSON الحالي (مع سجله) إن وُجد، قراءة فقط"""
+        if self.import_from and (os.path.exists(self.import_from)
+                                 or os.path.exists(self.import_from + JOURNAL_SUFFIX)):
+            data = read_data(self.import_from, self.default_factory)
+            print(f'📥 استيراد {len(data.get("orders", []))} طلب من {self.import_from} إلى {self.path}')
+            return data
+        return self.default_factory()
+
+    def write_snapshot(self, data):
+        with self.lock:
+            self._drain_locked()
+            self._import_locked(data)
+
+    def _import_locked(self, data):
+        conn = self._writer_conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM orders')
+            conn.execute('DELETE FROM order_items')
+            conn.execute('DELETE FROM tables')
+            self._next_seq = 0
+            for order in reversed(data.get('orders', [])):
+                self._put_order(conn, order, created=True)
+            self._set_tables(conn, data.get('tables', []))
+            conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('initialized', '1')")
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    # ------------------------------------------
+    # الكتابة
+    # ------------------------------------------
+    def _write_locked(self, batch):
+        """تطبيق كل التعديلات في الدفعة داخل معاملة واحدة"""
+        conn = self._writer_conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for changes in batch:
+                for change in changes:
+                    self._apply(conn, change)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _apply(self, conn, change):
+        op = change.get('op')
+        if op == 'order.create':
+            self._put_order(conn, change['order'], created=True)
+        elif op == 'order.update':
+            self._put_order(conn, change['order'])
+        elif op == 'order.delete':
+            conn.execute('DELETE FROM orders WHERE id = ?', (change.get('id'),))
+            conn.execute('DELETE FROM order_items WHERE order_id = ?', (change.get('id'),))
+        elif op == 'table.update':
+            table = change['table']
+            updated = conn.execute(
+                'UPDATE tables SET status = ?, current_order = ?, data = ? WHERE id = ?',
+                (table.get('status'), table.get('currentOrder'), _dumps(table), table.get('id'))).rowcount
+            if not updated:
+                position = conn.execute('SELECT COALESCE(MAX(position), 0) + 1 FROM tables').fetchone()[0]
+                self._insert_table(conn, table, position)
+        elif op == 'tables.set':
+            conn.execute('DELETE FROM tables')
+            self._set_tables(conn, change.get('tables', []))
+
+    def _put_order(self, conn, order, created=False):
+        """إدراج/استبدال طلب وأصنافه؛ الطلب الجديد يأخذ تسلسلاً جديداً (الأحدث أولاً)"""
+        order_id = order.get('id')
+        seq = None
+        if not created:
+            row = conn.execute('SELECT seq FROM orders WHERE id = ?', (order_id,)).fetchone()
+            seq = row[0] if row else None
+        if seq is None:
+            self._next_seq += 1
+            seq = self._next_seq
+        conn.execute(
+            'INSERT OR REPLACE INTO orders(id, seq, table_id, status, created_at, total, data) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (order_id, seq, order.get('tableId'), order.get('status'), order.get('createdAt'),
+             order.get('total'), _dumps(order)))
+        conn.execute('DELETE FROM order_items WHERE order_id = ?', (order_id,))
+        conn.executemany(
+            'INSERT INTO order_items(order_id, position, item_id, name, category, price, quantity) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [(order_id, i, item.get('id'), item.get('name'), item.get('category'),
+              item.get('price'), item.get('quantity', 1))
+             for i, item in enumerate(order.get('items') or []) if isinstance(item, dict)])
+
+    def _set_tables(self, conn, tables):
+        for position, table in enumerate(tables, 1):
+            self._insert_table(conn, table, position)
+
+    @staticmethod
+    def _insert_table(conn, table, position):
+        conn.execute(
+            'INSERT OR REPLACE INTO tables(id, position, status, current_order, data) VALUES (?, ?, ?, ?, ?)',
+            (table.get('id'), position, table.get('status'), table.get('currentOrder'), _dumps(table)))
+
+    def close(self):
+        self._stop_flusher()
+        with self.lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def get_stats(self):
+        stats = super().get_stats()
+        stats['path'] = self.path
+        return stats
+
+
+def import_json(json_path, db_path):
+    """استيراد لمرة واحدة: يستبدل محتوى قاعدة sqlite ببيانات ملف JSON (مع سجله)"""
+    storage = SQLiteStorage(db_path)
+    data = read_data(json_path)
+    with storage.lock:
+        storage._import_locked(data)
+    storage.close()
+    return len(data.get('orders', []))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4 or sys.argv[1] != 'import':
+        print('الاستخدام: python sqlite_storage.py import <restaurant_data.json> <restaurant_data.db>')
+        sys.exit(1)
+    count = import_json(sys.argv[2], sys.argv[3])
+    print(f'✅ تم استيراد {count} طلب إلى {sys.argv[3]}')
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+كاش الملفات الثابتة في الذاكرة مع ضغط مسبق
+
+- المفتاح: المسار + (mtime, الحجم) - أي تعديل على القرص يُبطل المدخل تلقائياً
+- يحفظ البايتات الخام + نسخة gzip (و brotli إن توفرت المكتبة) محسوبة مرة واحدة
+- ETag قوي + Last-Modified لدعم ردود 304
+- حد أقصى لحجم الذاكرة مع حذف الأقدم استخداماً (LRU)
+- الملفات الكبيرة أو غير القابلة للضغط لا تدخل الكاش: تُبث من القرص (sendfile) مع دعم Range
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+try:
+    import brotli  # اختياري
+except ImportError:
+    brotli = None
+
+MAX_CACHE_BYTES = 64 * 1024 * 1024  # 64MB
+MAX_ENTRY_BYTES = 4 * 1024 * 1024  # الملفات الأكبر لا تُحفظ في الذاكرة
+GZIP_LEVEL = 9  # الضغط يتم مرة واحدة فقط لكل نسخة من الملف
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+STREAM_CHUNK_SIZE = 64 * 1024  # حجم القطعة عند عدم توفر sendfile
+
+
+def is_compressible(content_type):
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def file_etag(stat):
+    """ETag للملفات المبثوثة من القرص دون قراءتها: mtime + الحجم"""
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def accepts_encoding(accept_encoding, coding):
+    """هل يقبل العميل الترميز؟ (تحليل Accept-Encoding مع قيم q: 'br;q=0' تعني الرفض)"""
+    qualities = {}
+    for token in (accept_encoding or '').split(','):
+        name, _, params = token.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities[name] = q
+    return qualities.get(coding, qualities.get('*', 0.0)) > 0
+
+
+def parse_range(header, size):
+    """تحليل ترويسة Range لنطاق واحد: (start, end) شاملاً
+
+    يُرجع None إذا لم يوجد نطاق صالح للاستخدام (نرسل الملف كاملاً)،
+    و False إذا كان النطاق خارج حجم الملف (416).
+    """
+    if not header or not header.startswith('bytes='):
+        return None
+    spec = header[6:].strip()
+    if ',' in spec:
+        return None  # النطاقات المتعددة غير مدعومة - نرسل الملف كاملاً
+    start, sep, end = spec.partition('-')
+    if not sep:
+        return None
+    try:
+        if not start:
+            # آخر N بايت
+            length = int(end)
+            if length <= 0:
+                return False
+            return max(0, size - length), size - 1
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+class StaticAsset:
+    __slots__ = ('raw', 'gzip', 'br', 'etag', 'last_modified', 'mtime', 'size', 'content_type', 'key')
+
+    def __init__(self, raw, content_type, mtime, key, min_compress_size):
+        self.raw = raw
+        self.content_type = content_type
+        self.mtime = mtime
+        self.size = len(raw)
+        self.key = key
+        self.etag = '"' + hashlib.sha1(raw).hexdigest()[:20] + '"'
+        self.last_modified = formatdate(mtime, usegmt=True)
+        self.gzip = None
+        self.br = None
+        if is_compressible(content_type) and len(raw) >= min_compress_size:
+            compressed = gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0)
+            if len(compressed) < len(raw):
+                self.gzip = compressed
+            if brotli is not None:
+                compressed = brotli.compress(raw)
+                if len(compressed) < len(raw):
+                    self.br = compressed
+
+    @property
+    def memory(self):
+        return self.size + len(self.gzip or b'') + len(self.br or b'')
+
+    def select(self, accept_encoding):
+        """اختيار أفضل ترميز يقبله العميل: (البايتات، الترميز، ETag)"""
+        if self.br is not None and accepts_encoding(accept_encoding, 'br'):
+            return self.br, 'br', self.etag[:-1] + '-br"'
+        if self.gzip is not None and accepts_encoding(accept_encoding, 'gzip'):
+            return self.gzip, 'gzip', self.etag[:-1] + '-gz"'
+        return self.raw, None, self.etag
+
+    def not_modified(self, if_none_match, if_modified_since):
+        """هل نسخة العميل ما زالت صالحة (304)؟"""
+        if if_none_match:
+            base = self.etag[1:-1]
+            for tag in if_none_match.split(','):
+                tag = tag.strip()
+                if tag.startswith('W/'):
+                    tag = tag[2:]
+                if tag == '*' or tag.strip('"') in (base, base + '-gz', base + '-br'):
+                    return True
+            return False
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(self.mtime) <= since
+        return False
+
+
+class StaticAssetCache:
+    def __init__(self, max_bytes=MAX_CACHE_BYTES, max_entry_bytes=MAX_ENTRY_BYTES, min_compress_size=1024):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.min_compress_size = min_compress_size
+        self.entries = OrderedDict()  # path -> StaticAsset
+        self.memory = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, file_path, content_type, stat=None):
+        """إرجاع الملف من الذاكرة، أو قراءته وضغطه إذا تغيّر أو لم يكن محفوظاً
+
+        يُرجع None للملفات الأكبر من max_entry_bytes (تُخدم مباشرة من القرص).
+        """
+        stat = stat or os.stat(file_path)
+        if stat.st_size > self.max_entry_bytes:
+            return None
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            asset = self.entries.get(file_path)
+            if asset is not None:
+                if asset.key == key:
+                    self.entries.move_to_end(file_path)
+                    self.hits += 1
+                    return asset
+                # الملف تغيّر على القرص
+                self._remove(file_path)
+                self.invalidations += 1
+            self.misses += 1
+
+        # القراءة والضغط خارج القفل
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        asset = StaticAsset(raw, content_type, stat.st_mtime, key, self.min_compress_size)
+
+        with self.lock:
+            if file_path in self.entries:
+                self._remove(file_path)
+            self.entries[file_path] = asset
+            self.memory += asset.memory
+            while self.memory > self.max_bytes and len(self.entries) > 1:
+                self._remove(next(iter(self.entries)))
+        return asset
+
+    def _remove(self, file_path):
+        asset = self.entries.pop(file_path)
+        self.memory -= asset.memory
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.memory = 0
+
+    def get_stats(self):
+        total = self.hits + self.misses
+        return {
+            'files': len(self.entries),
+            'memory_bytes': self.memory,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_rate': f'{(self.hits / total * 100) if total else 0:.1f}%',
+            'brotli': brotli is not None
+        }
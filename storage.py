@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+واجهة التخزين القابلة للاستبدال خلف load_data/save_data
+
+- StorageBackend: الواجهة المشتركة + الكتابة المجمّعة (group commit) وأوضاع المتانة
+- الخلفيات المتاحة:
+    json   -> OrderJournal (لقطة restaurant_data.json + سجل كتابة مسبقة)
+    sqlite -> SQLiteStorage (قاعدة sqlite3 بوضع WAL مع فهارس)
+- create_storage يختار الخلفية حسب الإعدادات، و read_storage يقرأ بياناتها دون تعديل
+
+أوضاع المتانة (durability):
+    immediate -> كتابة + fsync قبل الرد على كل تعديل
+    batched   -> الرد بعد كتابة الدفعة التي تضم التعديل (الافتراضي)
+    async     -> الرد فور دخول التعديل للطابور؛ الدفعة تُكتب في الخلفية
+"""
+
+import threading
+import time
+from collections import deque
+
+DURABILITY_MODES = ('immediate', 'batched', 'async')
+COMMIT_WINDOW = 0.002  # ثواني لتجميع التعديلات المتزامنة في كتابة واحدة
+STORAGE_BACKENDS = ('json', 'sqlite')
+FAILED_BATCHES = 256  # عدد نطاقات الدفعات الفاشلة المحفوظة لـ wait
+
+
+class StorageError(RuntimeError):
+    """فشل حفظ تعديلات معاملة؛ المعاملة أُلغيت في الذاكرة أيضاً (انظر order_store.Transaction)"""
+
+
+class StorageBackend:
+    """الواجهة المشتركة لكل خلفيات التخزين
+
+    على الخلفية تنفيذ load و write_snapshot و _write_locked، ويمكنها تخصيص
+    _encode (يُستدعى خارج القفل) و _after_write و close و get_stats.
+    كل التعديلات بصيغة السجل: order.create/order.update/order.delete/table.update/tables.set
+    """
+
+    name = None
+
+    def __init__(self, durability='batched', commit_window=COMMIT_WINDOW):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f'durability must be one of {DURABILITY_MODES}')
+        self.durability = durability
+        self.commit_window = commit_window
+        self.lock = threading.Lock()  # يحمي الكتابة الفعلية
+        self.loaded = False
+        self._stopped = False
+        # طابور الكتابة المجمّعة
+        self._queue = []  # عناصر مرمّزة بانتظار الكتابة
+        self._queued_records = 0
+        self._enqueued = 0  # رقم آخر دفعة دخلت الطابور
+        self._flushed = 0  # رقم آخر دفعة كُتبت
+        self._failed = deque(maxlen=FAILED_BATCHES)  # (أول دفعة، آخر دفعة، الخطأ) لكل كتابة فاشلة
+        self._queue_cond = threading.Condition()
+        self._flusher = None
+        # إحصائيات الكتابة
+        self.flushes = 0
+        self.flushed_records = 0
+        self.flush_time = 0.0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    # ------------------------------------------
+    # ما تنفذه كل خلفية
+    # ------------------------------------------
+    def load(self):
+        """إرجاع البيانات كاملة بصيغة restaurant_data.json"""
+        raise NotImplementedError
+
+    def write_snapshot(self, data):
+        """استبدال كل البيانات المحفوظة بـ data"""
+        raise NotImplementedError
+
+    def _encode(self, changes):
+        return changes
+
+    def _write_locked(self, batch):
+        """كتابة قائمة عناصر مرمّزة بشكل دائم (المستدعي يحجز self.lock)"""
+        raise NotImplementedError
+
+    def _after_write(self, records):
+        """يُستدعى بعد كل كتابة ناجحة تحت self.lock"""
+
+    # ------------------------------------------
+    # الكتابة المجمّعة
+    # ------------------------------------------
+    def append(self, changes):
+        """حفظ تعديلات حسب وضع المتانة"""
+        self.wait(self.enqueue(changes))
+
+    def enqueue(self, changes):
+        """إدخال التعديلات في طابور الكتابة وإرجاع رقم الدفعة لاستخدامه مع wait
+
+        في وضع immediate تُكتب التعديلات مباشرة ويُرجع 0.
+        """
+        item = self._encode(changes)
+        if self.durability == 'immediate':
+            with self.lock:
+                started = time.perf_counter()
+                self._write_locked([item])
+                self._record_flush(started, len(changes))
+                self._after_write(len(changes))
+            return 0
+
+        with self._queue_cond:
+            self._queue.append(item)
+            self._queued_records += len(changes)
+            self._enqueued += 1
+            self._start_flusher()
+            self._queue_cond.notify_all()
+            return self._enqueued
+
+    def wait(self, ticket):
+        """في وضع batched: الانتظار حتى تُكتب الدفعة ticket"""
+        if not ticket or self.durability != 'batched':
+            return
+        with self._queue_cond:
+            while self._flushed < ticket:
+                self._queue_cond.wait()
+            # خطأ كتابة لاحقة ناجحة لا يخفي فشل دفعة هذا الطلب (والعكس)
+            for first, last, error in self._failed:
+                if first <= ticket <= last:
+                    raise error
+
+    def flush(self):
+        """كتابة الطابور فوراً (قبل لقطة أو عند الإغلاق)"""
+        with self.lock:
+            self._drain_locked()
+
+    def _record_flush(self, started, records):
+        elapsed = time.perf_counter() - started
+        self.flushes += 1
+        self.flushed_records += records
+        self.flush_time += elapsed
+        self.last_flush_ms = elapsed * 1000
+        self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+
+    def _drain_locked(self):
+        """كتابة كل ما في الطابور بعملية واحدة (المستدعي يحجز self.lock)"""
+        with self._queue_cond:
+            batch, self._queue = self._queue, []
+            records, self._queued_records = self._queued_records, 0
+            first, ticket = self._flushed + 1, self._enqueued
+        if not batch:
+            return
+        started = time.perf_counter()
+        error = None
+        try:
+            self._write_locked(batch)
+            self._record_flush(started, records)
+            self._after_write(records)
+        except Exception as e:
+            error = e
+            print(f'⚠️ خطأ في كتابة البيانات ({self.name}): {e}')
+        with self._queue_cond:
+            self._flushed = ticket
+            if error is not None:
+                self._failed.append((first, ticket, error))
+            self._queue_cond.notify_all()
+
+    def _start_flusher(self):
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name=f'{self.name}-flusher', daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            with self._queue_cond:
+                while not self._queue and not self._stopped:
+                    self._queue_cond.wait()
+                if self._stopped and not self._queue:
+                    return
+            # نافذة قصيرة لتجميع التعديلات المتزامنة في كتابة واحدة
+            if self.commit_window:
+                time.sleep(self.commit_window)
+            with self.lock:
+                self._drain_locked()
+
+    def _stop_flusher(self):
+        self._stopped = True
+        with self._queue_cond:
+            self._queue_cond.notify_all()
+        self.flush()
+
+    def close(self):
+        self._stop_flusher()
+
+    def get_stats(self):
+        return {
+            'backend': self.name,
+            'durability': self.durability,
+            'queue_depth': self._queued_records,
+            'flushes': self.flushes,
+            'records_per_flush': round(self.flushed_records / self.flushes, 2) if self.flushes else 0,
+            'flush_latency_ms': {
+                'last': round(self.last_flush_ms, 3),
+                'avg': round(self.flush_time / self.flushes * 1000, 3) if self.flushes else 0,
+                'max': round(self.max_flush_ms, 3)
+            }
+        }
+
+
+def create_storage(backend, data_file, sqlite_file=None, **options):
+    """إنشاء خلفية التخزين المختارة في الإعدادات"""
+    if backend == 'json':
+        from journal import OrderJournal
+        return OrderJournal(data_file, **options)
+    if backend == 'sqlite':
+        from sqlite_storage import SQLiteStorage
+        return SQLiteStorage(sqlite_file, import_from=data_file, **options)
+    raise ValueError(f'storage backend must be one of {STORAGE_BACKENDS}')
+
+
+def read_storage(backend, data_file, sqlite_file=None):
+    """قراءة فقط لبيانات الخلفية المختارة (أدوات سطر الأوامر أثناء عمل السيرفر)
+
+    لا تُنشئ StorageBackend: إغلاقه يضغط السجل ويحذفه من تحت السيرفر الحي.
+    """
+    if backend == 'json':
+        from journal import read_data
+        return read_data(data_file)
+    if backend == 'sqlite':
+        from sqlite_storage import read_database
+        return read_database(sqlite_file, import_from=data_file)
+    raise ValueError(f'storage backend must be one of {STORAGE_BACKENDS}')
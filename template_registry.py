@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+كتالوج القوالب في الذاكرة لـ /api/templates
+
+- يُبنى مرة واحدة: templates.json + categories.json + template.json لكل مجلد قالب
+- التحديث بالاستطلاع (polling): فحص mtime/الحجم للملفات والمجلد كل poll_interval ثانية
+  على الأكثر، ويُعاد تحليل الملفات المتغيرة فقط
+- أي تغيير يرفع version (يُستخدم كـ ETag)؛ بدون تغيير لا قراءة ولا تحليل ولا ترميز
+"""
+
+import json
+import os
+import threading
+import time
+
+POLL_INTERVAL = 2.0  # ثواني بين فحوص mtime
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class TemplateRegistry:
+    def __init__(self, templates_dir, poll_interval=POLL_INTERVAL):
+        self.templates_dir = templates_dir
+        self.templates_file = os.path.join(templates_dir, 'templates.json')
+        self.categories_file = os.path.join(templates_dir, 'categories.json')
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.version = 0
+        self._catalog = None
+        self._checked = 0.0
+        self._dir_sig = None
+        self._entries = []  # مجلدات القوالب (من آخر listdir)
+        self._files = {}  # path -> (signature, parsed) لكل ملف JSON محمّل
+        self.refreshes = 0
+        self.reparsed = 0
+
+    # ------------------------------------------
+    # القراءة
+    # ------------------------------------------
+    def catalog(self):
+        """الكتالوج المدمج الحالي (بعد فحص التغييرات إن حان وقته)"""
+        self.poll()
+        return self._catalog
+
+    def current_version(self):
+        self.poll()
+        return self.version
+
+    def poll(self, force=False):
+        if not force and self._catalog is not None and time.monotonic() - self._checked < self.poll_interval:
+            return False
+        with self.lock:
+            if not force and self._catalog is not None and time.monotonic() - self._checked < self.poll_interval:
+                return False
+            changed = self._refresh_locked()
+            self._checked = time.monotonic()
+            return changed
+
+    # ------------------------------------------
+    # التحديث التدريجي
+    # ------------------------------------------
+    def _load(self, path, changed):
+        """محتوى ملف JSON؛ يُعاد تحليله فقط إذا تغيّر توقيعه"""
+        sig = _signature(path)
+        cached = self._files.get(path)
+        if cached is not None and cached[0] == sig:
+            return cached[1]
+        parsed = None
+        if sig is not None:
+            try:
+                parsed = _read_json(path)
+            except (json.JSONDecodeError, OSError, ValueError):
+                parsed = None
+            self.reparsed += 1
+        self._files[path] = (sig, parsed)
+        changed.append(path)
+        return parsed
+
+    def _refresh_locked(self):
+        changed = []
+        # إضافة/حذف مجلد قالب يغيّر mtime المجلد الأب فقط: listdir عند تغيّره
+        dir_sig = _signature(self.templates_dir)
+        if dir_sig != self._dir_sig:
+            self._dir_sig = dir_sig
+            entries = []
+            if os.path.isdir(self.templates_dir):
+                for entry in sorted(os.listdir(self.templates_dir)):
+                    if os.path.isdir(os.path.join(self.templates_dir, entry)):
+                        entries.append(entry)
+            if entries != self._entries:
+                self._entries = entries
+                changed.append(self.templates_dir)
+
+        templates_data = self._load(self.templates_file, changed)
+        categories = self._load(self.categories_file, changed)
+        discovered = {}
+        paths = set()
+        for entry in self._entries:
+            path = os.path.join(self.templates_dir, entry, 'template.json')
+            paths.add(path)
+            tpl = self._load(path, changed)
+            if isinstance(tpl, dict) and tpl.get('id'):
+                discovered[str(tpl['id'])] = tpl
+        for path in [p for p in self._files if p not in paths
+                     and p not in (self.templates_file, self.categories_file)]:
+            del self._files[path]  # مجلد قالب حُذف
+
+        if not changed and self._catalog is not None:
+            return False
+        self._catalog = self._merge(templates_data, categories, discovered)
+        self.version += 1
+        self.refreshes += 1
+        return True
+
+    @staticmethod
+    def _merge(templates_data, categories, discovered):
+        templates_data = templates_data if isinstance(templates_data, dict) else {}
+        templates_list = list(templates_data.get('templates', []) or [])
+        # الأقسام من ملف مستقل إن وجد (الأولوية له)
+        categories_list = list(templates_data.get('categories', []) or [])
+        if isinstance(categories, list):
+            categories_list = categories
+
+        # template.json داخل كل قالب يستبدل نفس المعرف، والجديد يُضاف
+        merged = []
+        seen_ids = set()
+        for tpl in templates_list:
+            tpl_id = tpl.get('id') if isinstance(tpl, dict) else None
+            if tpl_id and str(tpl_id) in discovered:
+                merged.append(discovered[str(tpl_id)])
+            else:
+                merged.append(tpl)
+            if tpl_id:
+                seen_ids.add(str(tpl_id))
+        for tpl_id, tpl in discovered.items():
+            if tpl_id not in seen_ids:
+                merged.append(tpl)
+                seen_ids.add(tpl_id)
+        return {'success': True, 'templates': merged, 'categories': categories_list}
+
+    def get_stats(self):
+        return {
+            'version': self.version,
+            'templates': len(self._catalog['templates']) if self._catalog else 0,
+            'refreshes': self.refreshes,
+            'reparsed': self.reparsed,
+            'watched_files': len(self._files)
+        }
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+تقسيم بيانات الطلبات والطاولات حسب المطعم (multi-tenant)
+
+- لكل مطعم شريحة مستقلة: OrderStore + ملف/سجل (tenants/<id>/) + قفل + كاش ردود
+- كتابات مطعم مشغول لا تنتظر قفل أو ملف أو طابور كتابة مطعم آخر
+- المطاعم المعروفة فقط (known): غيرها UnknownTenant (404) دون إنشاء أي شيء على القرص
+- القراءة لا تُنشئ مجلداً ولا ملفات: مطعم معروف بلا بيانات بعد يُقرأ كبيانات افتراضية،
+  والمجلد والسجل يُنشآن مع أول كتابة
+- الشريحة تُحمَّل عند أول طلب لها فقط، وتُغلق (لقطة نهائية) بعد مدة خمول
+- عدد الشرائح المحمّلة محدود؛ الأقدم استخداماً من الخاملة يُغلق أولاً
+- إعادة فتح شريحة أثناء إغلاقها تنتظر انتهاء الإغلاق (لا تُقرأ بيانات ناقصة)
+- مع --workers السجل كله في المالك: لا نسخ للشرائح في العمال، فقراءات المطاعم
+  تمر بالمالك ولا تتدرج مع عدد العمال
+"""
+
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from journal import default_data
+from order_store import OrderStore
+from storage import StorageError
+
+TENANT_ID_RE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$')
+IDLE_TIMEOUT = 600  # ثواني خمول قبل إغلاق الشريحة
+MAX_LOADED = 100  # أقصى عدد شرائح في الذاكرة
+SWEEP_INTERVAL = 30  # ثواني بين فحوص الخمول
+
+
+def valid_tenant_id(tenant_id):
+    return bool(tenant_id) and TENANT_ID_RE.match(tenant_id) is not None
+
+
+class UnknownTenant(LookupError):
+    """معرّف مطعم غير مُجهَّز (ليس في قائمة المطاعم المعروفة)"""
+
+
+class Tenant:
+    """شريحة مطعم واحد"""
+
+    def __init__(self, tenant_id, directory, storage_factory, cache_factory):
+        self.id = tenant_id
+        self.directory = directory
+        self.storage_factory = storage_factory
+        self.store = OrderStore()
+        self.store.on_commit = self._save
+        self.storage = None
+        self.responses = cache_factory()  # كاش ردود JSON خاص بالمطعم
+        self.lock = threading.Lock()  # إدخال التعديلات في طابور الكتابة (مثل data_lock)
+        self.load_lock = threading.Lock()
+        self.active = 0  # طلبات جارية (لا يُغلق أثناءها)
+        self.last_used = time.monotonic()
+        self.loaded_at = None
+        self.closed = threading.Event()
+
+    def ensure_loaded(self, create=False):
+        """تحميل الشريحة؛ create=False (قراءة) لا يُنشئ المجلد ولا خلفية التخزين إن لم توجد"""
+        if self.storage is not None or (self.store.loaded and not create):
+            return
+        with self.load_lock:
+            if self.storage is not None or (self.store.loaded and not create):
+                return
+            if not create and not os.path.isdir(self.directory):
+                self.store.load(default_data())
+            else:
+                os.makedirs(self.directory, exist_ok=True)
+                storage = self.storage_factory(self.directory)
+                self.store.load(storage.load())
+                self.storage = storage
+            self.loaded_at = time.time()
+
+    def _save(self, changes, version):
+        """on_commit: السجل الخاص بالمطعم (group commit مستقل لكل شريحة)؛ الفشل يُلغي المعاملة"""
+        try:
+            with self.lock:
+                ticket = self.storage.enqueue(changes)
+            self.storage.wait(ticket)
+        except Exception as e:
+            print(f'⚠️ خطأ في حفظ بيانات المطعم {self.id}: {e}')
+            raise StorageError(str(e)) from e
+
+    def close(self):
+        try:
+            if self.storage is not None:
+                self.storage.close()
+        finally:
+            self.closed.set()
+
+    def get_stats(self):
+        return {
+            'orders': len(self.store),
+            'version': self.store.version,
+            'active': self.active,
+            'idle': round(time.monotonic() - self.last_used, 1),
+            'cache': self.responses.get_stats()
+        }
+
+
+class TenantRegistry:
+    def __init__(self, root, storage_factory, cache_factory, known, idle_timeout=IDLE_TIMEOUT,
+                 max_loaded=MAX_LOADED, sweep_interval=SWEEP_INTERVAL):
+        self.root = root
+        self.storage_factory = storage_factory  # fn(directory) -> StorageBackend
+        self.known = known  # fn(tenant_id) -> bool: مطعم مُجهَّز يُسمح بفتح بياناته
+        self.cache_factory = cache_factory
+        self.idle_timeout = idle_timeout
+        self.max_loaded = max_loaded
+        self.sweep_interval = sweep_interval
+        self.lock = threading.Lock()  # القاموس فقط؛ التحميل والكتابة خارجه
+        self.tenants = {}
+        self._closing = {}  # id -> Tenant يُغلق الآن
+        self.loads = 0
+        self.evictions = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    # ------------------------------------------
+    # الوصول
+    # ------------------------------------------
+    def is_known(self, tenant_id):
+        return valid_tenant_id(tenant_id) and self.known(tenant_id)
+
+    @contextmanager
+    def use(self, tenant_id, create=False):
+        """الشريحة محمّلة ومحجوزة من الإغلاق طوال الكتلة؛ create=True للكتابة (تُنشئ المجلد)"""
+        if not self.is_known(tenant_id):
+            raise UnknownTenant(tenant_id)
+        with self.lock:
+            tenant = self.tenants.get(tenant_id)
+            if tenant is None:
+                tenant = self.tenants[tenant_id] = Tenant(
+                    tenant_id, os.path.join(self.root, tenant_id), self.storage_factory, self.cache_factory)
+                self.loads += 1
+            previous = self._closing.get(tenant_id)
+            tenant.active += 1
+            tenant.last_used = time.monotonic()
+            overflow = len(self.tenants) > self.max_loaded
+        try:
+            if previous is not None:
+                previous.closed.wait()
+            tenant.ensure_loaded(create)
+            yield tenant
+        except BaseException:
+            if not tenant.store.loaded:
+                # فشل التحميل: لا تبقى شريحة فارغة في القاموس
+                with self.lock:
+                    if self.tenants.get(tenant_id) is tenant and tenant.active == 1:
+                        del self.tenants[tenant_id]
+            raise
+        finally:
+            with self.lock:
+                tenant.active -= 1
+                tenant.last_used = time.monotonic()
+            if overflow:
+                self.evict_idle()
+
+    # ------------------------------------------
+    # الإغلاق
+    # ------------------------------------------
+    def evict_idle(self, now=None):
+        """إغلاق الشرائح الخاملة (وما زاد عن max_loaded من الأقدم استخداماً)"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            idle = sorted((t for t in self.tenants.values() if t.active == 0 and t.store.loaded),
+                          key=lambda t: t.last_used)
+            excess = len(self.tenants) - self.max_loaded
+            victims = []
+            for tenant in idle:
+                if now - tenant.last_used >= self.idle_timeout or len(victims) < excess:
+                    victims.append(tenant)
+            for tenant in victims:
+                del self.tenants[tenant.id]
+                self._closing[tenant.id] = tenant
+            self.evictions += len(victims)
+        for tenant in victims:
+            try:
+                tenant.close()
+            except (IOError, OSError) as e:
+                print(f'⚠️ خطأ في إغلاق بيانات المطعم {tenant.id}: {e}')
+            finally:
+                with self.lock:
+                    if self._closing.get(tenant.id) is tenant:
+                        del self._closing[tenant.id]
+        return len(victims)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='tenant-sweeper', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.sweep_interval):
+            self.evict_idle()
+
+    def close(self):
+        """إيقاف الفحص وإغلاق كل الشرائح (لقطة نهائية لكل مطعم)"""
+        self._stopped.set()
+        with self.lock:
+            tenants, self.tenants = list(self.tenants.values()), {}
+        for tenant in tenants:
+            if tenant.store.loaded:
+                tenant.close()
+
+    def get_stats(self):
+        with self.lock:
+            loaded = {t.id: t.get_stats() for t in self.tenants.values()}
+        return {'loaded': loaded, 'loads': self.loads, 'evictions': self.evictions,
+                'max_loaded': self.max_loaded, 'idle_timeout': self.idle_timeout}
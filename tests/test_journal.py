@@ -0,0 +1,127 @@
+"""سجل الكتابة المسبقة: إعادة التشغيل والضغط بعد انقطاع أثناء الكتابة"""
+
+import json
+import os
+
+import pytest
+
+import journal
+from journal import OrderJournal, default_data, encode_record, read_data, write_snapshot_file
+
+
+def order(order_id, status='pending', table_id=1):
+    return {'id': order_id, 'tableId': table_id, 'status': status, 'items': [], 'total': 0}
+
+
+def create(order_id, **fields):
+    return {'op': 'order.create', 'order': order(order_id, **fields)}
+
+
+def write_journal(path, changes, tail=''):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(''.join(encode_record(c) for c in changes) + tail)
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    return str(tmp_path / 'restaurant_data.json')
+
+
+def open_journal(path, **options):
+    options.setdefault('compact_interval', 3600)
+    return OrderJournal(path, **options)
+
+
+def test_replay_applies_changes_over_snapshot():
+    data = {'orders': [order(2), order(1)], 'tables': [{'id': 1, 'status': 'available'}]}
+    journal.replay(data, [
+        create(3),
+        {'op': 'order.update', 'order': order(1, status='completed')},
+        {'op': 'order.delete', 'id': 2},
+        {'op': 'table.update', 'table': {'id': 1, 'status': 'pending'}},
+    ])
+    assert [o['id'] for o in data['orders']] == [3, 1]
+    assert data['orders'][1]['status'] == 'completed'
+    assert data['tables'] == [{'id': 1, 'status': 'pending'}]
+
+
+def test_load_ignores_torn_last_line(data_file):
+    """انقطاع أثناء write: السطر الأخير ناقص، وما قبله يُستعاد كاملاً"""
+    write_snapshot_file(data_file, default_data(2))
+    write_journal(data_file + journal.JOURNAL_SUFFIX, [create(1), create(2)], tail='{"op":"order.cre')
+    store = open_journal(data_file)
+    try:
+        data = store.load()
+    finally:
+        store.close()
+    assert [o['id'] for o in data['orders']] == [2, 1]
+
+
+def test_load_replays_rotated_segment_then_journal(data_file):
+    """انقطاع أثناء الضغط: الجزء المُدوَّر لم يُدمج بعد في اللقطة"""
+    write_snapshot_file(data_file, default_data(1))
+    journal_path = data_file + journal.JOURNAL_SUFFIX
+    write_journal(journal_path + '.old', [create(1), create(2)])
+    write_journal(journal_path, [{'op': 'order.delete', 'id': 1}, create(3)])
+    store = open_journal(data_file)
+    try:
+        data = store.load()
+        assert [o['id'] for o in data['orders']] == [3, 2]
+        assert store.pending == 4
+    finally:
+        store.close()
+    # الإغلاق يدمج الجزء المُدوَّر في اللقطة؛ السجل الحالي يبقى لإعادة التشغيل التالية
+    assert not os.path.exists(journal_path + '.old')
+    with open(data_file, encoding='utf-8') as f:
+        assert [o['id'] for o in json.load(f)['orders']] == [2, 1]
+    assert [o['id'] for o in read_data(data_file)['orders']] == [3, 2]
+
+
+def test_compact_finishes_leftover_segment_before_rotating(data_file):
+    journal_path = data_file + journal.JOURNAL_SUFFIX
+    write_journal(journal_path + '.old', [create(1)])
+    store = open_journal(data_file, durability='immediate')
+    try:
+        store.load()
+        store.append([create(2)])
+        assert store.compact()  # يدمج الجزء القديم فقط؛ السجل الحالي يبقى
+        assert not os.path.exists(journal_path + '.old')
+        assert os.path.exists(journal_path)
+        assert store.compact()  # ثم يدوّر السجل الحالي
+        assert not store.compact()
+    finally:
+        store.close()
+    assert [o['id'] for o in read_data(data_file)['orders']] == [2, 1]
+
+
+def test_failed_write_truncates_partial_batch(data_file, monkeypatch):
+    """دفعة فشل fsync لها تُقص: السجل التالي لا يلتصق بسطر مقطوع"""
+    store = open_journal(data_file, durability='immediate')
+    store.load()
+    store.append([create(1)])
+    journal_path = data_file + journal.JOURNAL_SUFFIX
+    size = os.path.getsize(journal_path)
+
+    def broken_fsync(fd):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(journal.os, 'fsync', broken_fsync)
+    with pytest.raises(OSError):
+        store.append([create(2)])
+    monkeypatch.undo()
+    assert os.path.getsize(journal_path) == size
+
+    store.append([create(3)])
+    assert [o['id'] for o in read_data(data_file)['orders']] == [3, 1]
+    store.close()
+
+
+def test_write_snapshot_drops_journal(data_file):
+    store = open_journal(data_file, durability='immediate')
+    store.load()
+    store.append([create(1)])
+    store.write_snapshot({'orders': [order(5)], 'tables': []})
+    assert not os.path.exists(data_file + journal.JOURNAL_SUFFIX)
+    assert store.pending == 0
+    store.close()
+    assert [o['id'] for o in read_data(data_file)['orders']] == [5]
@@ -0,0 +1,257 @@
+"""مخزن الطلبات: الفهارس، since، ترقيم الصفحات بالمؤشر، والمعاملات"""
+
+import threading
+
+import pytest
+
+import order_store
+from journal import default_data
+from order_store import OrderStore, VersionConflict
+
+
+def order(order_id, table_id=1, status='pending', created='2024-05-01T12:00:00.000Z'):
+    return {'id': order_id, 'tableId': table_id, 'status': status, 'createdAt': created, 'items': []}
+
+
+@pytest.fixture
+def store():
+    return OrderStore(default_data(4))
+
+
+def ids(orders):
+    return [o['id'] for o in orders]
+
+
+# ------------------------------------------
+# الفهارس
+# ------------------------------------------
+def test_indexes_follow_status_and_deletes(store):
+    for i in range(1, 5):
+        store.add_order(order(i, table_id=i % 2 + 1))
+    store.update_status(2, 'preparing')
+    store.delete_order(3)
+    assert ids(store.list_orders()) == [4, 2, 1]
+    assert ids(store.orders_by_status('pending')) == [4, 1]
+    assert ids(store.orders_by_status('preparing')) == [2]
+    assert ids(store.orders_by_table(2)) == [1]
+    assert store.get_table(1) == {'id': 1, 'status': 'occupied', 'currentOrder': 4}
+
+
+def test_load_keeps_newest_first(store):
+    store.load({'orders': [order(3), order(2), order(1)], 'tables': []})
+    assert ids(store.list_orders()) == [3, 2, 1]
+    assert store.to_data()['orders'][0]['id'] == 3
+
+
+# ------------------------------------------
+# ترقيم الصفحات
+# ------------------------------------------
+def test_cursor_pages_are_stable_across_inserts_and_deletes(store):
+    for i in range(1, 11):
+        store.add_order(order(i))
+    page, cursor = store.query_orders(limit=4)
+    assert ids(page) == [10, 9, 8, 7]
+    # طلب جديد وحذف من الصفحة التالية لا يكرران ولا يتخطيان أي طلب
+    store.add_order(order(11))
+    store.delete_order(5)
+    page, cursor = store.query_orders(limit=4, cursor=cursor)
+    assert ids(page) == [6, 4, 3, 2]
+    page, cursor = store.query_orders(limit=4, cursor=cursor)
+    assert ids(page) == [1]
+    assert cursor is None
+
+
+def test_filtered_query_pages_by_status_table_and_date(store):
+    for i in range(1, 9):
+        store.add_order(order(i, table_id=i % 2, status=('pending', 'completed')[i % 3 == 0],
+                              created=f'2024-05-0{i}T10:00:00.000Z'))
+    page, cursor = store.query_orders(statuses=['pending'], table_id=0, limit=2)
+    assert ids(page) == [8, 4]
+    page, cursor = store.query_orders(statuses=['pending'], table_id=0, limit=2, cursor=cursor)
+    assert ids(page) == [2]
+    assert cursor is None
+    page, _ = store.query_orders(created_from='2024-05-03', created_to='2024-05-05T23:59:59.999Z')
+    assert ids(page) == [5, 4, 3]
+
+
+def test_query_accepts_millisecond_timestamps(store):
+    store.add_order(order(1, created=1714564800000))  # 2024-05-01T12:00:00Z
+    store.add_order(order(2, created='not a date'))
+    page, _ = store.query_orders(created_from='2024-05-01', created_to='2024-05-02')
+    assert ids(page) == [1]
+
+
+# ------------------------------------------
+# since
+# ------------------------------------------
+def test_changes_since_returns_only_newer_changes(store):
+    store.add_order(order(1))
+    store.add_order(order(2))
+    since = store.version
+    store.update_status(1, 'preparing')
+    store.delete_order(2)
+    store.add_order(order(3, table_id=2))
+    delta = store.changes_since(since)
+    assert delta['reset'] is False
+    assert delta['version'] == store.version
+    assert ids(delta['orders']) == [3, 1]
+    assert delta['deleted'] == [2]
+    assert 'tables' in delta
+
+    delta = store.changes_since(store.version)
+    assert delta == {'version': store.version, 'reset': False, 'orders': [], 'deleted': []}
+
+
+def test_changes_since_resets_for_unknown_or_expired_versions(store, monkeypatch):
+    store.add_order(order(1))
+    assert store.changes_since(store.version + 5)['reset'] is True
+    # بعد تجاوز عدد المحذوفات المحفوظة لا يمكن الإجابة عن الإصدارات الأقدم
+    monkeypatch.setattr(order_store, 'MAX_TOMBSTONES', 2)
+    since = store.version
+    for i in range(2, 6):
+        store.add_order(order(i))
+        store.delete_order(i)
+    delta = store.changes_since(since)
+    assert delta['reset'] is True
+    assert ids(delta['orders']) == [1]
+    assert store.changes_since(store.version - 1)['deleted'] == [5]
+
+
+# ------------------------------------------
+# المعاملات
+# ------------------------------------------
+class Recorder:
+    """on_commit يسجل (التعديلات، الإصدار)؛ fail_next يُفشل الاستدعاء التالي مرة واحدة"""
+
+    def __init__(self):
+        self.commits = []
+        self.fail_next = False
+
+    def __call__(self, changes, version):
+        if self.fail_next:
+            self.fail_next = False
+            raise OSError('disk full')
+        self.commits.append((list(changes), version))
+
+
+@pytest.fixture
+def recorder(store):
+    store.on_commit = Recorder()
+    return store.on_commit
+
+
+def test_no_op_transactions_take_no_version(store, recorder):
+    store.add_order(order(1))
+    version = store.version
+    assert store.delete_order(99) == []
+    assert store.update_table(99, {'status': 'occupied'}) == []
+    assert store.update_status(99, 'completed') == []
+    with store.transaction(orders=[98]) as txn:
+        txn.delete_order(98)
+    assert store.version == version
+    assert len(recorder.commits) == 1
+
+
+def test_unchanged_table_is_not_written(store, recorder):
+    store.add_order(order(1))
+    changes = store.update_status(1, 'pending')
+    assert [c['op'] for c in changes] == ['order.update']
+
+
+def test_versions_increase_by_one_per_commit(store, recorder):
+    store.add_order(order(1))
+    store.update_status(1, 'preparing')
+    store.set_table_count(2)
+    assert [version for _, version in recorder.commits] == [1, 2, 3]
+    assert store.order_version(1) == 2
+    assert recorder.commits[-1][0] == [{'op': 'tables.set', 'tables': store.list_tables()}]
+
+
+def test_concurrent_writers_on_one_order_commit_in_version_order(store, recorder):
+    store.add_order(dict(order(1), count=0))
+    bump = lambda o: dict(o, count=o['count'] + 1)
+
+    def writer():
+        for _ in range(50):
+            store.update_order(1, bump)
+
+    threads = [threading.Thread(target=writer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.get_order(1)['count'] == 400
+    # on_commit يُستدعى والأقفال محجوزة: السجل يرى تعديلات الطلب بترتيب إصداراتها
+    counts = [changes[0]['order']['count'] for changes, _ in recorder.commits]
+    versions = [version for _, version in recorder.commits]
+    assert counts == list(range(401))
+    assert versions == sorted(versions) and len(set(versions)) == len(versions)
+
+
+def test_stale_expected_version_raises_conflict(store, recorder):
+    store.add_order(order(1))
+    expected = store.order_version(1)
+    store.update_status(1, 'preparing', expected_version=expected)
+    with pytest.raises(VersionConflict) as info:
+        store.update_status(1, 'completed', expected_version=expected)
+    assert info.value.actual == store.order_version(1)
+    assert store.get_order(1)['status'] == 'preparing'
+
+
+def test_exception_in_transaction_discards_staged_changes(store, recorder):
+    version = store.version
+    with pytest.raises(RuntimeError):
+        with store.transaction(orders=[1], tables=[1]) as txn:
+            txn.put_order(order(1), created=True)
+            txn.put_table({'id': 1, 'status': 'pending', 'currentOrder': 1})
+            raise RuntimeError('abort')
+    assert store.get_order(1) is None
+    assert store.version == version
+    assert recorder.commits == []
+
+
+def test_failed_commit_is_rolled_back_with_a_new_version(store, recorder):
+    store.add_order(order(1))
+    table = store.get_table(2)
+    recorder.fail_next = True
+    with pytest.raises(OSError):
+        store.add_order(order(2, table_id=2))
+    assert store.get_order(2) is None
+    assert store.get_table(2) == table
+    assert ids(store.list_orders()) == [1]
+    # المعاملة المعاكسة تأخذ الإصدار التالي وتصل للسجل/البث كأي معاملة
+    undo, version = recorder.commits[-1]
+    assert version == store.version == 3
+    assert undo == [{'op': 'order.delete', 'id': 2}, {'op': 'table.update', 'table': table}]
+    assert store.changes_since(1)['deleted'] == [2]
+
+
+def test_failed_update_restores_previous_order(store, recorder):
+    store.add_order(order(1))
+    before = store.get_order(1)
+    recorder.fail_next = True
+    with pytest.raises(OSError):
+        store.update_status(1, 'completed')
+    assert store.get_order(1) is before
+    assert ids(store.orders_by_status('pending')) == [1]
+    assert store.get_table(1)['currentOrder'] == 1
+
+
+def test_failed_table_count_restores_all_tables(store, recorder):
+    tables = store.list_tables()
+    recorder.fail_next = True
+    with pytest.raises(OSError):
+        store.set_table_count(2)
+    assert store.list_tables() == tables
+
+
+def test_replica_copies_source_versions(store, recorder):
+    store.add_order(order(1))
+    store.update_status(1, 'preparing')
+    replica = OrderStore(default_data(4))
+    for changes, version in recorder.commits:
+        replica.apply_changes(changes, version)
+    assert replica.version == store.version
+    assert replica.list_orders() == store.list_orders()
+    assert replica.list_tables() == store.list_tables()
+    assert replica.order_version(1) == store.order_version(1)
@@ -0,0 +1,110 @@
+"""الكتابة المجمّعة (group commit): تجميع الدفعات وإبلاغ كل دفعة بخطئها"""
+
+import threading
+
+import pytest
+
+from storage import StorageBackend
+
+BAD = {'op': 'bad'}
+
+
+class MemoryStorage(StorageBackend):
+    """خلفية في الذاكرة تفشل كتابة أي دفعة فيها BAD"""
+
+    name = 'memory'
+
+    def __init__(self, durability='batched', commit_window=0):
+        super().__init__(durability, commit_window)
+        self.batches = []
+
+    def _write_locked(self, batch):
+        if any(BAD in changes for changes in batch):
+            raise OSError('disk full')
+        self.batches.append(batch)
+
+
+@pytest.fixture
+def storage():
+    backend = MemoryStorage()
+    yield backend
+    backend.close()
+
+
+def change(i):
+    return {'op': 'order.create', 'order': {'id': i}}
+
+
+def test_concurrent_changes_share_one_write(storage):
+    # الكاتب محجوز: كل ما يدخل الطابور الآن يُكتب معاً عند تحريره
+    with storage.lock:
+        tickets = [storage.enqueue([change(i)]) for i in range(5)]
+    for ticket in tickets:
+        storage.wait(ticket)
+    assert storage.batches == [[[change(i)] for i in range(5)]]
+    assert storage.get_stats()['records_per_flush'] == 5
+
+
+def test_failure_is_reported_to_its_own_batch_only(storage):
+    good = storage.enqueue([change(1)])
+    storage.wait(good)
+    bad = storage.enqueue([BAD])
+    with pytest.raises(OSError):
+        storage.wait(bad)
+    later = storage.enqueue([change(2)])
+    storage.wait(later)  # نجاح لاحق لا يتأثر بالفشل السابق
+    storage.wait(good)  # ولا الفشل يُنسب لدفعة سابقة ناجحة
+    with pytest.raises(OSError):
+        storage.wait(bad)  # والفشل لا يختفي بنجاح لاحق
+
+
+def test_every_ticket_in_a_failed_batch_sees_the_error(storage):
+    with storage.lock:
+        tickets = [storage.enqueue([change(1)]), storage.enqueue([BAD]), storage.enqueue([change(2)])]
+    for ticket in tickets:
+        with pytest.raises(OSError):
+            storage.wait(ticket)
+    assert storage.batches == []
+
+
+def test_waiters_from_many_threads_are_all_released(storage):
+    errors = []
+
+    def writer(i):
+        try:
+            storage.append([BAD] if i % 4 == 0 else [change(i)])
+        except OSError:
+            errors.append(i)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(32)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert not any(thread.is_alive() for thread in threads)
+    written = {c[0]['order']['id'] for batch in storage.batches for c in batch}
+    # كل طلب فشل كان في دفعة فاشلة، وكل طلب نجح كُتب فعلاً
+    assert written.isdisjoint(errors)
+    assert written | set(errors) == set(range(32))
+
+
+def test_immediate_mode_raises_from_enqueue():
+    backend = MemoryStorage(durability='immediate')
+    assert backend.enqueue([change(1)]) == 0
+    with pytest.raises(OSError):
+        backend.enqueue([BAD])
+    assert backend.batches == [[[change(1)]]]
+
+
+def test_async_mode_does_not_wait():
+    backend = MemoryStorage(durability='async')
+    with backend.lock:
+        ticket = backend.enqueue([BAD])
+        backend.wait(ticket)  # لا ينتظر الكتابة ولا يرى خطأها
+    backend.close()
+    assert backend.batches == []
+
+
+def test_unknown_durability_is_rejected():
+    with pytest.raises(ValueError):
+        MemoryStorage(durability='never')
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+وضع العمليات المتعددة (pre-fork) مع مالك واحد للكتابة
+
+- العملية الأم (المالك) تفتح socket الاستماع وتحمّل المخزن، ثم تنشئ N عمليات
+  عاملة بـ fork ترث الـ socket ونسخة من المخزن (copy-on-write)
+- العمال يخدمون HTTP ويقرؤون من نسختهم المحلية: json.dumps و gzip وتحليل
+  الطلبات على كل الأنوية بدلاً من نواة واحدة (GIL)
+- كل تعديل يُرسل للمالك عبر Pipe محلي؛ المالك وحده يكتب السجل/الملف وينفذ النشر
+- المالك يبث التعديلات لكل العمال بترتيب الإصدار، فتتطابق النسخ مع المخزن الأصلي
+- الرد على العامل لا يُعاد للعميل قبل أن تصل تعديلاته لنسخة العامل (قراءة ما كتبه)
+- عامل ينتهي بشكل غير متوقع يُستبدل بـ fork جديد من حالة المالك الحالية
+"""
+
+import itertools
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pipe
+
+OWNER_THREADS = 32  # عمليات كتابة متزامنة في المالك (تتجمع في group commit)
+CATCH_UP_TIMEOUT = 5  # أقصى انتظار لوصول تعديلات الرد لنسخة العامل (ثواني)
+RESTART_DELAY = 1  # ثواني قبل استبدال عامل انتهى
+SUPERVISE_INTERVAL = 0.5  # ثواني بين فحوص العمال
+
+
+def can_fork():
+    return hasattr(os, 'fork')
+
+
+class _Link:
+    """طرف المالك لقناة عامل واحد"""
+
+    __slots__ = ('pid', 'conn', 'send_lock', 'calls')
+
+    def __init__(self, pid, conn):
+        self.pid = pid
+        self.conn = conn
+        self.send_lock = threading.Lock()
+        self.calls = 0
+
+    def send(self, message):
+        with self.send_lock:
+            self.conn.send(message)
+
+
+class StateOwner:
+    """العملية المالكة: تنفذ عمليات العمال وتبث التعديلات لنسخهم"""
+
+    def __init__(self, ops, version, quiesce, threads=OWNER_THREADS):
+        self.ops = ops  # name -> fn(*args)
+        self.quiesce = quiesce  # () -> context manager يحجز الأقفال المشتركة (لـ fork آمن)
+        self.lock = threading.Lock()
+        self.links = {}  # pid -> _Link
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='owner')
+        self._next_version = version + 1
+        self._pending = {}  # version -> changes (وصلت قبل إصدار أقدم)
+        self._local = threading.local()
+        self._stopping = False
+        self.published = 0
+        self.restarts = 0
+
+    # ------------------------------------------
+    # إنشاء العمال
+    # ------------------------------------------
+    def fork_worker(self, run_worker):
+        """fork عامل جديد؛ في العامل تُستدعى run_worker(link) ولا تعود
+
+        quiesce يحجز كل الأقفال التي يستخدمها العامل: fork ينسخ الأقفال بحالتها،
+        وقفل يحجزه خيط آخر في المالك يبقى محجوزاً للأبد في العامل.
+        """
+        with self.quiesce(), self.lock:
+            parent_conn, child_conn = Pipe()
+            pid = os.fork()
+            if pid:
+                child_conn.close()
+                link = self.links[pid] = _Link(pid, parent_conn)
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            parent_conn.close()
+            for other in self.links.values():
+                other.conn.close()
+            self.links = {}
+            code = 0
+            try:
+                run_worker(WorkerLink(child_conn))
+            except KeyboardInterrupt:
+                pass
+            except BaseException as e:
+                print(f'⚠️ العامل {os.getpid()} توقف: {e}')
+                code = 1
+            finally:
+                os._exit(code)
+        threading.Thread(target=self._serve_link, args=(link,), name=f'owner-link-{pid}', daemon=True).start()
+        return pid
+
+    def spawn(self, run_worker, count):
+        """إنشاء العمال الأوائل؛ تُستدعى قبل بدء الخيوط الخلفية في المالك"""
+        for _ in range(count):
+            self.fork_worker(run_worker)
+
+    def supervise(self, run_worker):
+        """مراقبة العمال واستبدال من ينتهي (حتى stop)
+
+        المراقبة بـ WNOHANG لكل عامل فقط: waitpid(-1) كان سيحصد عمليات firebase
+        الفرعية التي ينتظرها طابور النشر.
+        """
+        while not self._stopping:
+            time.sleep(SUPERVISE_INTERVAL)
+            with self.lock:
+                pids = list(self.links)
+            for pid in pids:
+                try:
+                    done, status = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done, status = pid, None
+                if not done or self._stopping:
+                    continue
+                with self.lock:
+                    self.links.pop(pid, None)
+                print(f'⚠️ العامل {pid} انتهى (status={status})، إنشاء بديل')
+                self.restarts += 1
+                time.sleep(RESTART_DELAY)
+                self.fork_worker(run_worker)
+
+    def stop(self):
+        self._stopping = True
+        with self.lock:
+            pids = list(self.links)
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+        for pid in pids:
+            try:
+                os.waitpid(pid, 0)
+            except OSError:
+                pass
+        self.executor.shutdown(wait=True)
+
+    # ------------------------------------------
+    # تنفيذ عمليات العمال
+    # ------------------------------------------
+    def _serve_link(self, link):
+        while True:
+            try:
+                _, call_id, op, args = link.conn.recv()
+            except (EOFError, OSError):
+                return  # العامل انتهى؛ supervise يستبدله
+            link.calls += 1
+            self.executor.submit(self._execute, link, call_id, op, args)
+
+    def _execute(self, link, call_id, op, args):
+        self._local.version = None
+        try:
+            value, ok = self.ops[op](*args), True
+        except Exception as e:
+            value, ok = e, False
+        try:
+            link.send(('reply', call_id, ok, value, self._local.version))
+        except (OSError, ValueError):
+            pass  # العامل انتهى
+        except Exception:
+            # استثناء لا يمكن تسلسله (pickle)
+            try:
+                link.send(('reply', call_id, False, RuntimeError(str(value)), self._local.version))
+            except (OSError, ValueError):
+                pass
+
+    # ------------------------------------------
+    # البث
+    # ------------------------------------------
+    def publish(self, changes, version):
+        """يُستدعى من on_commit في المالك؛ يُرسل التعديلات للعمال بترتيب الإصدار
+
+        معاملات على كيانات مختلفة قد تصل هنا بغير ترتيب إصداراتها، فتُحجز حتى
+        يصل الإصدار الأقدم (المخزن يرفع الإصدار بواحد لكل معاملة).
+        """
+        self._local.version = version
+        with self.lock:
+            self._pending[version] = changes
+            while self._next_version in self._pending:
+                batch = self._pending.pop(self._next_version)
+                self._send_all(('changes', self._next_version, batch))
+                self._next_version += 1
+                self.published += 1
+
+    def broadcast(self, kind, payload):
+        """رسالة لكل العمال خارج تسلسل التعديلات (مثل أساس التحليلات بعد إعادة البناء)"""
+        with self.lock:
+            self._send_all((kind, payload))
+
+    def _send_all(self, message):
+        for link in list(self.links.values()):
+            try:
+                link.send(message)
+            except (OSError, ValueError):
+                pass  # العامل انتهى؛ supervise يزيله
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'workers': {pid: {'calls': link.calls} for pid, link in self.links.items()},
+                'published': self.published,
+                'version': self._next_version - 1,
+                'pending': len(self._pending),
+                'restarts': self.restarts
+            }
+
+
+class WorkerLink:
+    """طرف العامل: استدعاء عمليات المالك وتطبيق التعديلات المبثوثة على النسخة المحلية"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.send_lock = threading.Lock()
+        self.cond = threading.Condition()
+        self.version = 0  # آخر إصدار طُبّق على النسخة المحلية
+        self.replies = {}  # call_id -> (ok, value, version)
+        self._ids = itertools.count(1)
+        self.on_changes = None  # fn(changes, version)
+        self.on_message = None  # fn(kind, payload)
+        self.on_lost = None  # fn() عند انقطاع المالك
+        self.lost = False
+        self.calls = 0
+        self.applied = 0
+
+    def start(self, version):
+        self.version = version
+        threading.Thread(target=self._run, name='worker-link', daemon=True).start()
+
+    def call(self, op, *args):
+        """تنفيذ عملية في المالك؛ تعود بعد أن تصل تعديلاتها للنسخة المحلية"""
+        call_id = next(self._ids)
+        with self.cond:
+            if self.lost:
+                raise ConnectionError('state owner is gone')
+            self.replies[call_id] = None
+        with self.send_lock:
+            self.conn.send(('call', call_id, op, args))
+        self.calls += 1
+        with self.cond:
+            while self.replies[call_id] is None and not self.lost:
+                self.cond.wait()
+            reply = self.replies.pop(call_id)
+            if reply is None:
+                raise ConnectionError('state owner is gone')
+            ok, value, version = reply
+            if version is not None:
+                self.cond.wait_for(lambda: self.version >= version or self.lost, CATCH_UP_TIMEOUT)
+        if not ok:
+            raise value
+        return value
+
+    def _run(self):
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            kind = message[0]
+            if kind == 'reply':
+                _, call_id, ok, value, version = message
+                with self.cond:
+                    self.replies[call_id] = (ok, value, version)
+                    self.cond.notify_all()
+            elif kind == 'changes':
+                _, version, changes = message
+                try:
+                    self.on_changes(changes, version)
+                except Exception as e:
+                    print(f'⚠️ خطأ في تطبيق التعديلات ({version}): {e}')
+                with self.cond:
+                    self.version = version
+                    self.applied += 1
+                    self.cond.notify_all()
+            elif self.on_message is not None:
+                self.on_message(kind, message[1])
+        with self.cond:
+            self.lost = True
+            self.cond.notify_all()
+        if self.on_lost is not None:
+            self.on_lost()
+
+    def get_stats(self):
+        return {'pid': os.getpid(), 'version': self.version, 'calls': self.calls, 'applied': self.applied}